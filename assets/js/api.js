@@ -1,6 +1,57 @@
 class ApiService {
     constructor(csrfToken) {
         this.csrfToken = csrfToken;
+        this.eventSource = null;
+        this.changeHandlers = new Set();
+    }
+
+    // Формирование строки запроса из параметров (пустые значения пропускаются)
+    buildQuery(params = {}) {
+        const query = new URLSearchParams();
+        for (const [key, value] of Object.entries(params)) {
+            if (value !== undefined && value !== null && value !== '') {
+                query.append(key, value);
+            }
+        }
+        const queryString = query.toString();
+        return queryString ? `?${queryString}` : '';
+    }
+
+    // Доступен ли поток событий: только при запуске сервера под ASGI, под WSGI
+    // соединение заняло бы обработчик сервера. Проверяется один раз за страницу
+    eventsSupported() {
+        if (!this.eventsCheck) {
+            this.eventsCheck = fetch('/api/events/?check=1')
+                .then(response => response.ok)
+                .catch(() => false);
+        }
+        return this.eventsCheck;
+    }
+
+    // Подписка на события изменений списков. Один поток SSE на все списки страницы,
+    // handler({ kind, action, id, fields }) получает события, reset приходит с action 'reset'.
+    // Без потока (сервер под WSGI) списки обновляются только по действиям пользователя.
+    // Возвращает функцию отписки
+    subscribeChanges(handler) {
+        this.changeHandlers.add(handler);
+        this.eventsSupported().then(supported => {
+            if (!supported || this.eventSource || this.changeHandlers.size === 0) return;
+            this.eventSource = new EventSource('/api/events/');
+            this.eventSource.addEventListener('change', (e) => {
+                const event = JSON.parse(e.data);
+                this.changeHandlers.forEach(h => h(event));
+            });
+            this.eventSource.addEventListener('reset', () => {
+                this.changeHandlers.forEach(h => h({ action: 'reset' }));
+            });
+        });
+        return () => {
+            this.changeHandlers.delete(handler);
+            if (this.changeHandlers.size === 0 && this.eventSource) {
+                this.eventSource.close();
+                this.eventSource = null;
+            }
+        };
     }
 
     // Отправка отчета
@@ -16,11 +67,21 @@ class ApiService {
         return await response.json();
     }
 
-    async getReports(service, type = null, limit = 1, skip = 0) {
-        let url = `/api/reports/?service=${encodeURIComponent(service)}&limit=${limit}&skip=${skip}`;
+    // Получение отчетов с keyset-пагинацией: options.after / options.before - курсоры,
+    // options.withCount - запросить точное количество отчетов
+    async getReports(service, type = null, limit = 1, options = {}) {
+        let url = `/api/reports/?service=${encodeURIComponent(service)}&limit=${limit}`;
         if (type) {
             url += `&type=${type}`;
         }
+        if (options.after) {
+            url += `&after=${encodeURIComponent(options.after)}`;
+        } else if (options.before) {
+            url += `&before=${encodeURIComponent(options.before)}`;
+        }
+        if (options.withCount) {
+            url += '&count=1';
+        }
         const response = await fetch(url);
         const data = await response.json();
 
@@ -32,22 +93,27 @@ class ApiService {
         }
     }
 
-    // Получение только последних отчетов (для первоначальной загрузки)
+    // Получение последних отчетов каждого типа и их количества одним запросом
     async getLatestReports(service) {
-        try {
-            const [dailyResponse, weeklyResponse] = await Promise.all([
-                this.getReports(service, 'daily', 1, 0),
-                this.getReports(service, 'weekly', 1, 0)
-            ]);
-
-            return {
-                daily: dailyResponse,
-                weekly: weeklyResponse
-            };
-        } catch (error) {
-            console.error('Ошибка загрузки последних отчетов:', error);
-            throw error;
+        const response = await fetch(`/api/reports/get/?service=${encodeURIComponent(service)}`);
+        const data = await response.json();
+
+        if (data.status !== 'success') {
+            throw new Error(data.message || 'Ошибка загрузки последних отчетов');
         }
+
+        const latest = data.latest[service] || {};
+        const totals = data.totals[service] || {};
+        return {
+            daily: { report: latest.daily || null, total: totals.daily || 0 },
+            weekly: { report: latest.weekly || null, total: totals.weekly || 0 }
+        };
+    }
+
+    // Получение планов, утечек, замечаний и КСС службы за год одним запросом
+    async getDashboard(department, year) {
+        const response = await fetch(`/api/dashboard/?department=${encodeURIComponent(department)}&year=${year}`);
+        return await response.json();
     }
 
     // Получение планов
@@ -87,8 +153,9 @@ class ApiService {
         return await response.json();
     }
 
-    async getProtocols() {
-        const response = await fetch('/api/protocols/');
+    // params: department, done, date_from, date_to, page_size, cursor
+    async getProtocols(params = {}) {
+        const response = await fetch(`/api/protocols/${this.buildQuery(params)}`);
         return await response.json();
     }
 
@@ -140,8 +207,9 @@ class ApiService {
         return await response.json();
     }
 
-    async getOrders() {
-        const response = await fetch('/api/orders/');
+    // params: department, done, date_from, date_to, page_size, cursor
+    async getOrders(params = {}) {
+        const response = await fetch(`/api/orders/${this.buildQuery(params)}`);
         return await response.json();
     }
 
@@ -210,8 +278,9 @@ class ApiService {
         return data;
     }
 
-    async getFaults() {
-        const response = await fetch('/api/faults/');
+    // params: department, done, date_from, date_to, page_size, cursor
+    async getFaults(params = {}) {
+        const response = await fetch(`/api/faults/${this.buildQuery(params)}`);
         return await response.json();
     }
 
@@ -249,8 +318,9 @@ class ApiService {
         return await response.json();
     }
 
-    async getReliabilityItems() {
-        const response = await fetch('/api/reliability/');
+    // params: department, done, date_from, date_to, page_size, cursor
+    async getReliabilityItems(params = {}) {
+        const response = await fetch(`/api/reliability/${this.buildQuery(params)}`);
         return await response.json();
     }
 
@@ -305,6 +375,14 @@ class ApiService {
         return await response.json();
     }
 
+    // Счетчики замечаний по службам и типам (открытые, просроченные, закрытые)
+    async getFaultStats(department) {
+        const response = await fetch(`/api/faults/stats/${this.buildQuery({ department })}`);
+        return await response.json();
+    }
+
+    // Импорт выполняется в фоне: ответ содержит job_id для getImportJob.
+    // Поле sheets в formData - имена листов через запятую (по умолчанию все листы)
     async uploadReliabilityExcel(formData) {
         const response = await fetch('/api/reliability/upload-excel/', {
             method: 'POST',
@@ -315,6 +393,87 @@ class ApiService {
         });
         return await response.json();
     }
+
+    // Ход импорта: job_status (pending/running/done/failed), rows_processed,
+    // total_rows, counts, errors, eta_seconds
+    async getImportJob(jobId) {
+        const response = await fetch(`/api/import-jobs/${jobId}/`);
+        return await response.json();
+    }
+
+    // Ожидает завершения импорта, onProgress получает каждый промежуточный ответ
+    async waitImportJob(jobId, onProgress, interval = 1000) {
+        for (;;) {
+            const job = await this.getImportJob(jobId);
+            if (job.status !== 'success' || job.job_status === 'done' || job.job_status === 'failed') {
+                return job;
+            }
+            if (onProgress) onProgress(job);
+            await new Promise(resolve => setTimeout(resolve, interval));
+        }
+    }
+
+    // Групповые операции: items - [{ kind, id }], типы можно смешивать.
+    // Ответ содержит результат по каждой записи (done/archived, not_found, invalid)
+    async bulkMarkDone(items, service, doneDate = new Date().toISOString()) {
+        const response = await fetch('/api/items/bulk/done/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': this.csrfToken,
+            },
+            body: JSON.stringify({ items, service, done_date: doneDate })
+        });
+        return await response.json();
+    }
+
+    async bulkArchive(items) {
+        const response = await fetch('/api/items/bulk/archive/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': this.csrfToken,
+            },
+            body: JSON.stringify({ items })
+        });
+        return await response.json();
+    }
+
+    // Просроченные службой протоколы, распоряжения, мероприятия и замечания.
+    // params: page_size; следующая страница одного типа - kind и cursor из next_cursor[kind]
+    async getOverdue(department, params = {}) {
+        const response = await fetch(`/api/overdue/${this.buildQuery({ department, ...params })}`);
+        return await response.json();
+    }
+
+    // Полнотекстовый поиск по всем спискам: params - archived, department, kinds, page_size, cursor
+    async searchItems(q, params = {}) {
+        const response = await fetch(`/api/search/${this.buildQuery({ q, ...params })}`);
+        return await response.json();
+    }
+
+    // Невыполненные службой протоколы, распоряжения и мероприятия по надёжности.
+    // params: page_size; следующая страница одного типа - kind и cursor из next_cursor[kind]
+    async getPending(department, params = {}) {
+        const response = await fetch(`/api/pending/${this.buildQuery({ department, ...params })}`);
+        return await response.json();
+    }
+
+    // Архив мероприятий: kind - protocols, orders, faults, reliability
+    async getArchive(kind, params = {}) {
+        const response = await fetch(`/api/archive/${kind}/${this.buildQuery(params)}`);
+        return await response.json();
+    }
+
+    async restoreFromArchive(kind, id) {
+        const response = await fetch(`/api/archive/${kind}/${id}/restore/`, {
+            method: 'POST',
+            headers: {
+                'X-CSRFToken': this.csrfToken,
+            }
+        });
+        return await response.json();
+    }
 }
 
 // Экспортируем класс для использования в других файлах
@@ -16,6 +16,7 @@ export default class BaseManager {
         this.currentSort = 'date';
         this.currentSortDirection = 'desc';
         this.currentFilter = 'all';
+        this.pageSize = 50; // Записей списка на страницу ("Показать ещё" подгружает следующую)
     }
 
     // Общие методы для загрузки шаблонов
@@ -268,4 +269,191 @@ export default class BaseManager {
             return false;
         }
     }
+
+    // Панель архива под списком: подгружает архив страницами, админ может вернуть запись
+    initArchivePanel(listContainer, kind, isAdmin, currentUserDepartment, describeItem, onRestore) {
+        if (!listContainer || listContainer.nextElementSibling?.classList.contains('archive-panel')) return;
+
+        const panel = document.createElement('div');
+        panel.className = 'archive-panel';
+        panel.innerHTML = `
+            <button type="button" class="archive-toggle-btn">Архив</button>
+            <div class="archive-list" style="display: none;"></div>
+            <button type="button" class="archive-more-btn" style="display: none;">Показать ещё</button>
+        `;
+        listContainer.after(panel);
+
+        const toggleBtn = panel.querySelector('.archive-toggle-btn');
+        const list = panel.querySelector('.archive-list');
+        const moreBtn = panel.querySelector('.archive-more-btn');
+        const params = isAdmin ? {} : { department: currentUserDepartment };
+        let cursor = null;
+
+        const loadPage = async (reset = false) => {
+            if (reset) {
+                cursor = null;
+                list.innerHTML = '<div class="loading">Загрузка архива...</div>';
+            }
+            try {
+                const result = await this.api.getArchive(kind, cursor ? { ...params, cursor } : params);
+                if (result.status !== 'success') {
+                    throw new Error(result.message || 'Ошибка загрузки архива');
+                }
+                const html = result.items.map(item => `
+                    <div class="archive-item" data-id="${item._id}">
+                        <div class="archive-item-text">${describeItem(item)}</div>
+                        <div class="archive-item-date">В архиве с ${new Date(item.archived_at).toLocaleDateString('ru-RU')}</div>
+                        ${isAdmin ? '<button type="button" class="restore-btn">Вернуть</button>' : ''}
+                    </div>
+                `).join('');
+                if (reset) list.innerHTML = html || '<div class="no-data">Архив пуст</div>';
+                else list.insertAdjacentHTML('beforeend', html);
+
+                cursor = result.next_cursor;
+                moreBtn.style.display = result.has_more ? '' : 'none';
+            } catch (error) {
+                console.error('Ошибка загрузки архива:', error);
+                list.innerHTML = `<div class="error">${error.message}</div>`;
+            }
+        };
+
+        toggleBtn.addEventListener('click', () => {
+            const opened = list.style.display === 'none';
+            list.style.display = opened ? '' : 'none';
+            if (opened) loadPage(true);
+            else moreBtn.style.display = 'none';
+        });
+        moreBtn.addEventListener('click', () => loadPage());
+
+        list.addEventListener('click', async (e) => {
+            const restoreBtn = e.target.closest('.restore-btn');
+            if (!restoreBtn) return;
+            const item = restoreBtn.closest('.archive-item');
+            try {
+                const result = await this.api.restoreFromArchive(kind, item.dataset.id);
+                if (result.status !== 'success') {
+                    throw new Error(result.message || 'Ошибка возврата из архива');
+                }
+                item.remove();
+                this.showNotification('✓ Запись возвращена из архива', 'success');
+                if (onRestore) await onRestore();
+            } catch (error) {
+                console.error('Ошибка:', error);
+                this.showNotification(error.message || 'Ошибка возврата из архива', 'error');
+            }
+        });
+    }
+
+    // Запоминает загруженные записи списка, чтобы события сервера можно было применить на месте;
+    // append - дополнить уже загруженные записями следующей страницы
+    rememberItems(items, append = false) {
+        if (!append || !this.liveItems) this.liveItems = new Map();
+        items.forEach(item => this.liveItems.set(item._id, item));
+    }
+
+    // Применяет изменение к загруженной записи и возвращает ее (null - записи нет в списке)
+    updateLiveItem(id, fields) {
+        const previous = this.liveItems?.get(id);
+        if (!previous) return null;
+        const item = { ...previous, ...fields };
+        // Отметки выполнения приходят по одной службе - дополняем, а не заменяем
+        if (fields.done) {
+            item.done = { ...(previous.done || {}), ...fields.done };
+        }
+        this.liveItems.set(id, item);
+        return item;
+    }
+
+    // Кнопка "Показать ещё" под списком: следующая страница запрашивается по next_cursor.
+    // options: fetchPage(cursor) - запрос страницы, itemsOf(result) - записи из ответа,
+    // render(item) - HTML записи, bind(element) - обработчики кнопок,
+    // visible(item) - показывать ли запись, listSelector - куда добавлять записи
+    initLoadMore(container, result, options) {
+        const { fetchPage, itemsOf, render, bind, visible = () => true, listSelector } = options;
+        container.querySelector(':scope > .load-more-btn')?.remove();
+        if (!result.has_more || !result.next_cursor) return;
+
+        const moreBtn = document.createElement('button');
+        moreBtn.type = 'button';
+        moreBtn.className = 'load-more-btn';
+        moreBtn.textContent = 'Показать ещё';
+        container.append(moreBtn);
+
+        moreBtn.addEventListener('click', async () => {
+            moreBtn.classList.add('loading');
+            try {
+                const page = await fetchPage(result.next_cursor);
+                if (page.status !== 'success') {
+                    throw new Error(page.message || 'Ошибка загрузки списка');
+                }
+                const items = itemsOf(page) || [];
+                this.rememberItems(items, true);
+
+                const wrapper = document.createElement('div');
+                wrapper.innerHTML = items.filter(visible).map(render).join('');
+                bind(wrapper);
+                const list = (listSelector && container.querySelector(listSelector)) || container;
+                list.append(...wrapper.children);
+
+                this.initLoadMore(container, page, options);
+            } catch (error) {
+                console.error('Ошибка загрузки следующей страницы:', error);
+                this.showNotification(error.message || 'Ошибка загрузки списка', 'error');
+                moreBtn.classList.remove('loading');
+            }
+        });
+    }
+
+    // Живые обновления списка: события сервера правят записи на месте, без перезагрузки.
+    // options: itemSelector - селектор элемента записи, listSelector - куда добавлять новые,
+    // render(item) - HTML записи, bind(element) - обработчики кнопок,
+    // visible(item) - показывать ли запись, reload() - полная перезагрузка после потери событий
+    initLiveUpdates(kind, container, { itemSelector, listSelector, render, bind, visible = () => true, reload }) {
+        if (this.unsubscribeChanges) this.unsubscribeChanges();
+        this.liveItems = this.liveItems || new Map();
+
+        this.unsubscribeChanges = this.api.subscribeChanges(event => {
+            if (event.action === 'reset') {
+                reload();
+                return;
+            }
+            if (event.kind !== kind) return;
+
+            const element = container.querySelector(`${itemSelector}[data-id="${event.id}"]`);
+            if (event.action === 'archived') {
+                this.liveItems.delete(event.id);
+                element?.remove();
+                return;
+            }
+
+            let item;
+            if (event.action === 'created' || event.action === 'restored') {
+                item = { ...event.fields, _id: event.id };
+            } else {
+                item = this.updateLiveItem(event.id, event.fields);
+                if (!item) return; // Записи нет в загруженном списке
+            }
+
+            if (!visible(item)) {
+                this.liveItems.delete(event.id);
+                element?.remove();
+                return;
+            }
+            this.liveItems.set(event.id, item);
+
+            const wrapper = document.createElement('div');
+            wrapper.innerHTML = render(item).trim();
+            bind(wrapper);
+            const newElement = wrapper.firstElementChild;
+
+            if (element) {
+                element.replaceWith(newElement);
+            } else {
+                container.querySelector('.no-data')?.remove();
+                const first = container.querySelector(itemSelector);
+                if (first) first.before(newElement);
+                else ((listSelector && container.querySelector(listSelector)) || container).append(newElement);
+            }
+        });
+    }
 }
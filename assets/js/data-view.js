@@ -2,10 +2,13 @@ export default class DataViewManager {
     constructor(apiService, appContainer) {
         this.api = apiService;
         this.appContainer = appContainer;
+        // reports - окно предзагруженных отчетов (от новых к старым),
+        // hasOlder/hasNewer - есть ли отчеты за пределами окна
         this.currentReports = {
-            daily: { reports: [], currentIndex: 0, total: 0, service: '' },
-            weekly: { reports: [], currentIndex: 0, total: 0, service: '' }
+            daily: { reports: [], currentIndex: 0, total: 0, hasOlder: false, hasNewer: false, service: '' },
+            weekly: { reports: [], currentIndex: 0, total: 0, hasOlder: false, hasNewer: false, service: '' }
         };
+        this.prefetchSize = 10;
     }
 
     async render() {
@@ -72,26 +75,21 @@ export default class DataViewManager {
         dataDisplay.innerHTML = '<div class="loading">Загрузка данных...</div>';
 
         try {
-            // Загружаем только последние отчеты каждого типа
-            const [dailyResponse, weeklyResponse] = await Promise.all([
-                this.api.getReports(service, 'daily', 1, 0),
-                this.api.getReports(service, 'weekly', 1, 0)
-            ]);
-
-            // Инициализируем структуру данных
-            this.currentReports.daily = {
-                reports: dailyResponse.reports || [],
-                currentIndex: 0,
-                total: dailyResponse.total_count || 0,
-                service: service
-            };
-
-            this.currentReports.weekly = {
-                reports: weeklyResponse.reports || [],
-                currentIndex: 0,
-                total: weeklyResponse.total_count || 0,
-                service: service
-            };
+            // Загружаем последние отчеты каждого типа и их количество одним запросом,
+            // более старые отчеты подгружаются окнами при навигации
+            const latest = await this.api.getLatestReports(service);
+
+            ['daily', 'weekly'].forEach(reportType => {
+                const { report, total } = latest[reportType];
+                this.currentReports[reportType] = {
+                    reports: report ? [report] : [],
+                    currentIndex: 0,
+                    total: total,
+                    hasOlder: total > 1,
+                    hasNewer: false,
+                    service: service
+                };
+            });
 
             await this.renderServiceData();
         } catch (error) {
@@ -120,25 +118,21 @@ export default class DataViewManager {
             const currentQuarter = Math.floor(now.getMonth() / 3) + 1;
             const isLES = currentDepartment === 'ЛЭС';
 
-            // Загружаем дополнительные данные
-            const [plansResponse, leaksResponse, remarksResponse, kssResponse] = await Promise.all([
-                this.api.getPlans(currentDepartment, currentYear),
-                this.api.getLeaks(currentDepartment, currentYear),
-                this.api.getRemarks(currentDepartment, currentYear),
-                isLES ? this.api.getKss(currentYear) : Promise.resolve({status: 'success', total: 0})
-            ]);
+            // Загружаем дополнительные данные одним запросом
+            const dashboard = await this.api.getDashboard(currentDepartment, currentYear);
+            const isLoaded = dashboard.status === 'success';
 
-            const plans = plansResponse.status === 'success' ? plansResponse.plans : null;
-            const leaks = leaksResponse.status === 'success' ? leaksResponse : {total: 0, done: 0};
-            const remarks = remarksResponse.status === 'success' ? remarksResponse.remarks : [];
-            const kssTotal = kssResponse && kssResponse.status === 'success' ? kssResponse.total : 0;
+            const plans = isLoaded ? dashboard.plans : null;
+            const leaks = isLoaded ? dashboard.leaks : {total: 0, done: 0};
+            const remarks = isLoaded ? dashboard.remarks : [];
+            const kssTotal = isLoaded && isLES ? dashboard.kss.total : 0;
 
             let html = '';
 
             // Рендерим ежедневный отчет если есть
             if (this.currentReports.daily.reports.length > 0) {
                 html += this.renderReport(
-                    this.currentReports.daily.reports[0],
+                    this.currentReports.daily.reports[this.currentReports.daily.currentIndex],
                     'daily',
                     { plans, leaks, remarks, kssTotal, currentQuarter, currentDepartment }
                 );
@@ -149,7 +143,7 @@ export default class DataViewManager {
             // Рендерим еженедельный отчет если есть
             if (this.currentReports.weekly.reports.length > 0) {
                 html += this.renderReport(
-                    this.currentReports.weekly.reports[0],
+                    this.currentReports.weekly.reports[this.currentReports.weekly.currentIndex],
                     'weekly',
                     { plans, leaks, remarks, kssTotal, currentQuarter, currentDepartment }
                 );
@@ -280,37 +274,47 @@ export default class DataViewManager {
 
     updateNavigationButtons() {
         Object.keys(this.currentReports).forEach(reportType => {
-            const reportInfo = this.currentReports[reportType] || { currentIndex: 0, total: 0 };
+            const reportInfo = this.currentReports[reportType] || { reports: [], currentIndex: 0 };
             const prevButton = document.querySelector(`.nav-arrow.prev-arrow[data-type="${reportType}"]`);
             const nextButton = document.querySelector(`.nav-arrow.next-arrow[data-type="${reportType}"]`);
 
             if (prevButton) {
-                prevButton.disabled = reportInfo.currentIndex >= reportInfo.total - 1;
+                prevButton.disabled = reportInfo.currentIndex >= reportInfo.reports.length - 1 && !reportInfo.hasOlder;
             }
             if (nextButton) {
-                nextButton.disabled = reportInfo.currentIndex <= 0;
+                nextButton.disabled = reportInfo.currentIndex <= 0 && !reportInfo.hasNewer;
             }
         });
     }
 
     async navigateReport(reportType, direction) {
         // Безопасное получение reportInfo
-        const reportInfo = this.currentReports[reportType] || { currentIndex: 0, total: 0, service: '' };
+        const reportInfo = this.currentReports[reportType] || { reports: [], currentIndex: 0, service: '' };
 
         if (!reportInfo.service) {
             console.error('Service not defined for report type:', reportType);
             return;
         }
 
-        let newIndex = reportInfo.currentIndex;
-        let skip = 0;
+        const lastIndex = reportInfo.reports.length - 1;
 
-        if (direction === 'next' && newIndex > 0) {
-            newIndex--;
-            skip = newIndex;
-        } else if (direction === 'prev' && newIndex < reportInfo.total - 1) {
-            newIndex++;
-            skip = newIndex;
+        // Внутри предзагруженного окна переходим без запроса к серверу
+        if (direction === 'next' && reportInfo.currentIndex > 0) {
+            reportInfo.currentIndex--;
+            await this.renderServiceData();
+            return;
+        }
+        if (direction === 'prev' && reportInfo.currentIndex < lastIndex) {
+            reportInfo.currentIndex++;
+            await this.renderServiceData();
+            return;
+        }
+
+        let options;
+        if (direction === 'next' && reportInfo.hasNewer) {
+            options = { before: reportInfo.reports[0].cursor };
+        } else if (direction === 'prev' && reportInfo.hasOlder) {
+            options = { after: reportInfo.reports[lastIndex].cursor };
         } else {
             return; // Достигнуты границы
         }
@@ -323,22 +327,29 @@ export default class DataViewManager {
                 loadingSection.innerHTML = '<div class="loading">Загрузка...</div>';
             }
 
-            // Загружаем конкретный отчет
+            // Загружаем следующее окно отчетов по курсору
             const response = await this.api.getReports(
                 reportInfo.service,
                 reportType,
-                1,
-                skip
+                this.prefetchSize,
+                options
             );
 
-            if (response.status === 'success') {
-                // Обновляем данные
-                this.currentReports[reportType].reports = response.reports || [];
-                this.currentReports[reportType].currentIndex = skip;
-
-                // Перерисовываем данные
-                await this.renderServiceData();
+            if (response.status === 'success' && response.reports && response.reports.length > 0) {
+                reportInfo.reports = response.reports;
+                if (options.after) {
+                    reportInfo.currentIndex = 0;
+                    reportInfo.hasOlder = Boolean(response.has_more);
+                    reportInfo.hasNewer = true;
+                } else {
+                    reportInfo.currentIndex = response.reports.length - 1;
+                    reportInfo.hasNewer = Boolean(response.has_more);
+                    reportInfo.hasOlder = true;
+                }
             }
+
+            // Перерисовываем данные
+            await this.renderServiceData();
         } catch (error) {
             console.error('Ошибка навигации:', error);
             alert('Ошибка загрузки отчета: ' + error.message);
@@ -73,15 +73,30 @@ export default class FaultsManager extends BaseManager {
         }
 
         this.loadFaults(faultsList, isAdmin, currentUserDepartment);
+        this.initArchivePanel(faultsList, 'faults', isAdmin, currentUserDepartment,
+            item => `${item.type} (${item.department}): ${item.text}`,
+            () => this.loadFaults(faultsList, isAdmin, currentUserDepartment));
+        this.initLiveUpdates('faults', faultsList, {
+            itemSelector: '.fault-item',
+            listSelector: '.faults-container',
+            render: item => this.renderFaultItem(item, isAdmin, currentUserDepartment),
+            bind: element => this.initFaultActions(element, isAdmin, currentUserDepartment),
+            visible: item => (isAdmin || item.department === currentUserDepartment) &&
+                (this.currentFilter === 'all' || item.type === this.currentFilter),
+            reload: () => this.loadFaults(faultsList, isAdmin, currentUserDepartment)
+        });
     }
 
     async loadFaults(container, isAdmin, currentUserDepartment) {
         container.innerHTML = '<div class="loading">Загрузка данных...</div>';
 
         try {
-            const result = await this.api.getFaults();
+            const params = { page_size: this.pageSize };
+            if (!isAdmin) params.department = currentUserDepartment;
+            const result = await this.api.getFaults(params);
 
             if (result.status === 'success') {
+                this.rememberItems(result.faults || []);
                 if (result.faults && result.faults.length > 0) {
                     let filteredFaults = result.faults.filter(fault => !fault.archived);
 
@@ -122,6 +137,16 @@ export default class FaultsManager extends BaseManager {
                         this.loadFaults(container, isAdmin, currentUserDepartment)
                     );
                     this.initFaultActions(container, isAdmin, currentUserDepartment);
+                    this.initLoadMore(container, result, {
+                        fetchPage: cursor => this.api.getFaults({ ...params, cursor }),
+                        itemsOf: page => this.sortItems(page.faults || []),
+                        render: fault => this.renderFaultItem(fault, isAdmin, currentUserDepartment),
+                        bind: element => this.initFaultActions(element, isAdmin, currentUserDepartment),
+                        visible: fault => !fault.archived &&
+                            (isAdmin || fault.department === currentUserDepartment) &&
+                            (this.currentFilter === 'all' || fault.type === this.currentFilter),
+                        listSelector: '.faults-container'
+                    });
                 } else {
                     container.innerHTML = `
                         <div class="controls-container">
@@ -224,7 +249,10 @@ export default class FaultsManager extends BaseManager {
                 );
 
                 if (success) {
-                    const fault = await this.getFaultById(faultId);
+                    const fault = this.updateLiveItem(faultId, {
+                        is_done: true,
+                        date_done: new Date().toISOString()
+                    });
                     if (fault) {
                         const faultHtml = this.renderFaultItem(fault, isAdmin, currentUserDepartment);
                         faultItem.outerHTML = faultHtml;
@@ -234,14 +262,4 @@ export default class FaultsManager extends BaseManager {
             });
         });
     }
-
-    async getFaultById(faultId) {
-        try {
-            const result = await this.api.getFaults();
-            return result.faults?.find(f => f._id === faultId) || null;
-        } catch (error) {
-            console.error('Ошибка получения замечания:', error);
-            return null;
-        }
-    }
 }
@@ -83,15 +83,28 @@ export default class OrdersManager extends BaseManager {
         }
 
         this.loadOrders(ordersList, isAdmin, currentUserDepartment);
+        this.initArchivePanel(ordersList, 'orders', isAdmin, currentUserDepartment,
+            item => `№${item.num}: ${item.text}`,
+            () => this.loadOrders(ordersList, isAdmin, currentUserDepartment));
+        this.initLiveUpdates('orders', ordersList, {
+            itemSelector: '.order-item',
+            render: item => this.renderOrderItem(item, isAdmin, currentUserDepartment),
+            bind: element => this.initOrderActions(element, isAdmin, currentUserDepartment),
+            visible: item => isAdmin || (item.departments || []).includes(currentUserDepartment),
+            reload: () => this.loadOrders(ordersList, isAdmin, currentUserDepartment)
+        });
     }
 
     async loadOrders(container, isAdmin, currentUserDepartment) {
         container.innerHTML = '<div class="loading">Загрузка данных...</div>';
 
         try {
-            const result = await this.api.getOrders();
+            const params = { page_size: this.pageSize };
+            if (!isAdmin) params.department = currentUserDepartment;
+            const result = await this.api.getOrders(params);
 
             if (result.status === 'success') {
+                this.rememberItems(result.orders || []);
                 if (result.orders && result.orders.length > 0) {
                     let html = '';
 
@@ -110,6 +123,14 @@ export default class OrdersManager extends BaseManager {
                         (html || '<div class="no-data">Нет активных распоряжений</div>');
 
                     this.initOrderActions(container, isAdmin, currentUserDepartment);
+                    this.initLoadMore(container, result, {
+                        fetchPage: cursor => this.api.getOrders({ ...params, cursor }),
+                        itemsOf: page => page.orders,
+                        render: order => this.renderOrderItem(order, isAdmin, currentUserDepartment),
+                        bind: element => this.initOrderActions(element, isAdmin, currentUserDepartment),
+                        visible: order => !order.archived &&
+                            (isAdmin || (order.departments || []).includes(currentUserDepartment))
+                    });
                 } else {
                     container.innerHTML = '<h3>Список распоряжений (приказов)</h3><div class="no-data">Нет активных распоряжений</div>';
                 }
@@ -245,7 +266,9 @@ export default class OrdersManager extends BaseManager {
                     if (result.status === 'success') {
                         this.showNotification('✓ Распоряжение отмечено выполненным', 'success');
                         // Обновляем отображение распоряжения
-                        const order = await this.getOrderById(orderId);
+                        const order = this.updateLiveItem(orderId, {
+                            done: { [currentUserDepartment]: new Date().toISOString() }
+                        });
                         if (order) {
                             const orderHtml = this.renderOrderItem(order, isAdmin, currentUserDepartment);
                             orderItem.outerHTML = orderHtml;
@@ -261,19 +284,6 @@ export default class OrdersManager extends BaseManager {
         });
     }
 
-    async getOrderById(orderId) {
-        try {
-            const result = await this.api.getOrders();
-            if (result.status === 'success' && result.orders) {
-                return result.orders.find(o => o._id === orderId);
-            }
-            return null;
-        } catch (error) {
-            console.error('Ошибка получения распоряжения:', error);
-            return null;
-        }
-    }
-
     showNotification(message, type = 'success') {
         const notification = document.createElement('div');
         notification.className = `notification ${type}-notification`;
@@ -88,15 +88,28 @@ export default class ProtocolsManager extends BaseManager {
         }
 
         this.loadProtocols(protocolsList, isAdmin, currentUserDepartment);
+        this.initArchivePanel(protocolsList, 'protocols', isAdmin, currentUserDepartment,
+            item => `№${item.protocol_num} ${item.protocol_name || ''}: ${item.text}`,
+            () => this.loadProtocols(protocolsList, isAdmin, currentUserDepartment));
+        this.initLiveUpdates('protocols', protocolsList, {
+            itemSelector: '.protocol-item',
+            render: item => this.renderProtocolItem(item, isAdmin, currentUserDepartment),
+            bind: element => this.initProtocolActions(element, isAdmin, currentUserDepartment),
+            visible: item => isAdmin || (item.departments || []).includes(currentUserDepartment),
+            reload: () => this.loadProtocols(protocolsList, isAdmin, currentUserDepartment)
+        });
     }
 
     async loadProtocols(container, isAdmin, currentUserDepartment) {
         container.innerHTML = '<div class="loading">Загрузка данных...</div>';
 
         try {
-            const result = await this.api.getProtocols();
+            const params = { page_size: this.pageSize };
+            if (!isAdmin) params.department = currentUserDepartment;
+            const result = await this.api.getProtocols(params);
 
             if (result.status === 'success') {
+                this.rememberItems(result.protocols || []);
                 if (result.protocols && result.protocols.length > 0) {
                     let html = '';
 
@@ -115,6 +128,14 @@ export default class ProtocolsManager extends BaseManager {
                         (html || '<div class="no-data">Нет активных протоколов</div>');
 
                     this.initProtocolActions(container, isAdmin, currentUserDepartment);
+                    this.initLoadMore(container, result, {
+                        fetchPage: cursor => this.api.getProtocols({ ...params, cursor }),
+                        itemsOf: page => page.protocols,
+                        render: protocol => this.renderProtocolItem(protocol, isAdmin, currentUserDepartment),
+                        bind: element => this.initProtocolActions(element, isAdmin, currentUserDepartment),
+                        visible: protocol => !protocol.archived &&
+                            (isAdmin || (protocol.departments || []).includes(currentUserDepartment))
+                    });
                 } else {
                     container.innerHTML = '<h3>Список протоколов</h3><div class="no-data">Нет активных протоколов</div>';
                 }
@@ -238,7 +259,9 @@ export default class ProtocolsManager extends BaseManager {
                     if (result.status === 'success') {
                         this.showNotification('✓ Протокол отмечен выполненным', 'success');
                         // Обновляем отображение протокола
-                        const protocol = await this.getProtocolById(protocolId);
+                        const protocol = this.updateLiveItem(protocolId, {
+                            done: { [currentUserDepartment]: new Date().toISOString() }
+                        });
                         if (protocol) {
                             const protocolHtml = this.renderProtocolItem(protocol, isAdmin, currentUserDepartment);
                             protocolItem.outerHTML = protocolHtml;
@@ -256,7 +279,7 @@ export default class ProtocolsManager extends BaseManager {
         container.querySelectorAll('.edit-btn').forEach(btn => {
             btn.addEventListener('click', async () => {
                 const protocolId = btn.dataset.id;
-                const protocol = await this.getProtocolById(protocolId);
+                const protocol = this.liveItems?.get(protocolId);
                 if (protocol) {
                     this.fillEditForm(protocol);
                 }
@@ -281,19 +304,6 @@ export default class ProtocolsManager extends BaseManager {
         form.querySelector('button[type="submit"]').textContent = 'Сохранить изменения';
     }
 
-    async getProtocolById(protocolId) {
-        try {
-            const result = await this.api.getProtocols();
-            if (result.status === 'success' && result.protocols) {
-                return result.protocols.find(p => p._id === protocolId);
-            }
-            return null;
-        } catch (error) {
-            console.error('Ошибка получения протокола:', error);
-            return null;
-        }
-    }
-
     showNotification(message, type = 'success') {
         const notification = document.createElement('div');
         notification.className = `notification ${type}-notification`;
@@ -79,15 +79,28 @@ export default class ReliabilityManager extends BaseManager {
         }
 
         this.loadReliabilityItems(reliabilityList, isAdmin, currentUserDepartment);
+        this.initArchivePanel(reliabilityList, 'reliability', isAdmin, currentUserDepartment,
+            item => `${item.name} (срок: ${item.date})`,
+            () => this.loadReliabilityItems(reliabilityList, isAdmin, currentUserDepartment));
+        this.initLiveUpdates('reliability', reliabilityList, {
+            itemSelector: '.reliability-item',
+            render: item => this.renderReliabilityItem(item, isAdmin, currentUserDepartment),
+            bind: element => this.initReliabilityActions(element, isAdmin, currentUserDepartment),
+            visible: item => isAdmin || (item.departments || []).includes(currentUserDepartment),
+            reload: () => this.loadReliabilityItems(reliabilityList, isAdmin, currentUserDepartment)
+        });
     }
 
     async loadReliabilityItems(container, isAdmin, currentUserDepartment) {
         container.innerHTML = '<div class="loading">Загрузка данных...</div>';
 
         try {
-            const result = await this.api.getReliabilityItems();
+            const params = { page_size: this.pageSize };
+            if (!isAdmin) params.department = currentUserDepartment;
+            const result = await this.api.getReliabilityItems(params);
 
             if (result.status === 'success') {
+                this.rememberItems(result.items || []);
                 if (result.items && result.items.length > 0) {
                     let html = '';
 
@@ -106,6 +119,14 @@ export default class ReliabilityManager extends BaseManager {
                         (html || '<div class="no-data">Нет мероприятий</div>');
 
                     this.initReliabilityActions(container, isAdmin, currentUserDepartment);
+                    this.initLoadMore(container, result, {
+                        fetchPage: cursor => this.api.getReliabilityItems({ ...params, cursor }),
+                        itemsOf: page => page.items,
+                        render: item => this.renderReliabilityItem(item, isAdmin, currentUserDepartment),
+                        bind: element => this.initReliabilityActions(element, isAdmin, currentUserDepartment),
+                        visible: item => !item.archived &&
+                            (isAdmin || (item.departments || []).includes(currentUserDepartment))
+                    });
                 } else {
                     container.innerHTML = '<h3>Мероприятия по надёжности</h3><div class="no-data">Нет мероприятий</div>';
                 }
@@ -229,7 +250,9 @@ export default class ReliabilityManager extends BaseManager {
                     if (result.status === 'success') {
                         this.showNotification('✓ Мероприятие отмечено выполненным', 'success');
                         // Обновляем отображение мероприятия
-                        const item = await this.getReliabilityById(itemId);
+                        const item = this.updateLiveItem(itemId, {
+                            done: { [currentUserDepartment]: new Date().toISOString() }
+                        });
                         if (item) {
                             const itemHtml = this.renderReliabilityItem(item, isAdmin, currentUserDepartment);
                             itemElement.outerHTML = itemHtml;
@@ -247,19 +270,6 @@ export default class ReliabilityManager extends BaseManager {
         });
     }
 
-    async getReliabilityById(itemId) {
-        try {
-            const result = await this.api.getReliabilityItems();
-            if (result.status === 'success' && result.items) {
-                return result.items.find(o => o._id === itemId);
-            }
-            return null;
-        } catch (error) {
-            console.error('Ошибка получения распоряжения:', error);
-            return null;
-        }
-    }
-
     showNotification(message, type = 'success') {
         const notification = document.createElement('div');
         notification.className = `notification ${type}-notification`;
@@ -287,9 +297,19 @@ export default class ReliabilityManager extends BaseManager {
 
             try {
                 this.showNotification('Загрузка файла...', 'info');
-                const result = await this.api.uploadReliabilityExcel(formData);
+                const upload = await this.api.uploadReliabilityExcel(formData);
+                if (upload.status !== 'success') {
+                    throw new Error(upload.message);
+                }
+
+                const result = await this.api.waitImportJob(upload.job_id, job => {
+                    if (!job.rows_processed) return;
+                    const total = job.total_rows ? ` из ${job.total_rows}` : '';
+                    const eta = job.eta_seconds ? `, осталось ~${job.eta_seconds} с` : '';
+                    this.showNotification(`Импорт: обработано строк ${job.rows_processed}${total}${eta}`, 'info');
+                });
 
-                if (result.status === 'success') {
+                if (result.job_status === 'done') {
                     this.showNotification(result.message, 'success');
                     // Перезагружаем список мероприятий
                     const reliabilityList = document.getElementById("reliabilityList");
@@ -2,6 +2,7 @@
 ASGI config for report_webapp project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The live list updates stream (/api/events/) is only served under ASGI.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -0,0 +1,116 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from bson import ObjectId
+from django.conf import settings
+
+# Маркер в очереди клиента: события потеряны, клиенту нужно перезагрузить списки
+RESET = object()
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f'{type(value).__name__} не сериализуется в JSON')
+
+
+class Subscription:
+    """Очередь событий одного клиента, привязанная к его циклу событий"""
+
+    def __init__(self, broadcaster, loop):
+        self.broadcaster = broadcaster
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+
+    def put(self, event):
+        """Передает событие из любого потока"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Цикл уже закрыт - клиент отключился
+            self.close()
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Клиент не успевает читать: сбрасываем очередь, он перезагрузит списки целиком
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+
+    async def get(self, timeout):
+        """Следующее событие (id, kind, data), RESET или None по истечении timeout"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+
+class Broadcaster:
+    """
+    Рассылка событий подписчикам в пределах процесса.
+    Публикация возможна из любого потока (синхронные представления, обработчик задач),
+    последние события хранятся для переподключения по Last-Event-ID
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._history = deque(maxlen=settings.EVENTS_HISTORY_SIZE)
+        # Номера событий начинаются с текущего времени в мс, чтобы не повторяться после перезапуска
+        self._first_id = int(time.time() * 1000)
+        self._ids = itertools.count(self._first_id)
+
+    def publish(self, kind, data):
+        payload = json.dumps(data, default=_json_default, ensure_ascii=False)
+        with self._lock:
+            event = (next(self._ids), kind, payload)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def subscribe(self, last_event_id=None):
+        """Подписка в текущем цикле событий; пропущенные после last_event_id события попадут в очередь"""
+        subscription = Subscription(self, asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(subscription)
+            if last_event_id is not None:
+                # Номер, с которого история полна: первое хранимое событие или первый номер процесса
+                oldest = self._history[0][0] if self._history else self._first_id
+                latest = self._history[-1][0] if self._history else self._first_id - 1
+                # Следующего за last_event_id события нет в истории (вытеснено или выдано
+                # до перезапуска процесса) либо номер из будущего - только полная перезагрузка
+                if last_event_id < oldest - 1 or last_event_id > latest:
+                    missed = [RESET]
+                else:
+                    missed = [event for event in self._history if event[0] > last_event_id]
+                for event in missed:
+                    subscription._put(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+broadcaster = Broadcaster()
+
+
+def publish_change(kind, action, item_id, fields=None):
+    """Событие изменения записи списка: created, updated, done, archived, restored"""
+    data = {'kind': kind, 'action': action, 'id': item_id}
+    if fields is not None:
+        data['fields'] = fields
+    broadcaster.publish(kind, data)
@@ -0,0 +1,214 @@
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+from report_webapp.utils import (reports, plans, kss, remarks, leaks,
+                                 protocols, orders, users, faults,
+                                 reliability, rollups, jobs, reqs,
+                                 protocols_archive, orders_archive,
+                                 faults_archive, reliability_archive)
+
+
+def text_index(weights):
+    """Полнотекстовый индекс на русском для поиска /api/search/ (один на коллекцию)"""
+    return IndexModel([(field, TEXT) for field in weights], name='text_search',
+                      weights=weights, default_language='russian')
+
+
+# Поля поиска с весами: номер и название важнее текста
+PROTOCOLS_TEXT = text_index({'protocol_num': 10, 'protocol_name': 5, 'text': 1})
+ORDERS_TEXT = text_index({'num': 10, 'text': 1})
+FAULTS_TEXT = text_index({'text': 1})
+RELIABILITY_TEXT = text_index({'name': 5, 'note': 1})
+
+# Реестр индексов: коллекция -> список индексов, которыми управляет приложение.
+# Имена индексов задаются явно, по ним ensure_indexes сравнивает
+# объявленное состояние с тем, что уже есть в базе.
+INDEXES = [
+    (reports, [
+        # История отчетов службы: find({department, type}).sort([(datetime, -1), (_id, -1)])
+        IndexModel([('department', ASCENDING), ('type', ASCENDING),
+                    ('datetime', DESCENDING), ('_id', DESCENDING)],
+                   name='department_type_datetime'),
+        # Выгрузка и аналитика: диапазон дат по службам
+        IndexModel([('department', ASCENDING), ('datetime', ASCENDING)],
+                   name='department_datetime'),
+    ]),
+    (protocols, [
+        IndexModel([('issue_date', DESCENDING), ('_id', DESCENDING)], name='issue_date'),
+        IndexModel([('departments', ASCENDING), ('issue_date', DESCENDING), ('_id', DESCENDING)],
+                   name='departments_issue_date'),
+        # Невыполненные (и просроченные) службой: completion: {$elemMatch: {department, done_at: null}}
+        IndexModel([('completion.department', ASCENDING), ('completion.done_at', ASCENDING),
+                    ('deadline_at', ASCENDING)],
+                   name='completion_department_done_at_deadline_at'),
+        PROTOCOLS_TEXT,
+    ]),
+    (orders, [
+        IndexModel([('issue_date', DESCENDING), ('_id', DESCENDING)], name='issue_date'),
+        IndexModel([('departments', ASCENDING), ('issue_date', DESCENDING), ('_id', DESCENDING)],
+                   name='departments_issue_date'),
+        IndexModel([('completion.department', ASCENDING), ('completion.done_at', ASCENDING),
+                    ('deadline_at', ASCENDING)],
+                   name='completion_department_done_at_deadline_at'),
+        ORDERS_TEXT,
+    ]),
+    (faults, [
+        IndexModel([('date', ASCENDING), ('_id', ASCENDING)], name='date'),
+        IndexModel([('department', ASCENDING), ('date', ASCENDING), ('_id', ASCENDING)],
+                   name='department_date'),
+        IndexModel([('department', ASCENDING), ('type', ASCENDING)],
+                   name='department_type'),
+        FAULTS_TEXT,
+    ]),
+    (reliability, [
+        # Список мероприятий по сроку реализации
+        IndexModel([('deadline_at', ASCENDING), ('_id', ASCENDING)], name='deadline_at'),
+        IndexModel([('departments', ASCENDING), ('deadline_at', ASCENDING), ('_id', ASCENDING)],
+                   name='departments_deadline_at'),
+        IndexModel([('completion.department', ASCENDING), ('completion.done_at', ASCENDING),
+                    ('deadline_at', ASCENDING)],
+                   name='completion_department_done_at_deadline_at'),
+        # Дубликаты при импорте из Excel: наименование и срок без учета регистра и пробелов.
+        # У документов без ключа (до backfill_reliability_keys) уникальность не проверяется
+        IndexModel([('dedup_key', ASCENDING)], name='dedup_key', unique=True,
+                   partialFilterExpression={'dedup_key': {'$exists': True}}),
+        RELIABILITY_TEXT,
+    ]),
+    (protocols_archive, [
+        # Просмотр архива: новые в архиве сверху
+        IndexModel([('archived_at', DESCENDING), ('_id', DESCENDING)], name='archived_at'),
+        IndexModel([('departments', ASCENDING), ('archived_at', DESCENDING), ('_id', DESCENDING)],
+                   name='departments_archived_at'),
+        PROTOCOLS_TEXT,
+    ]),
+    (orders_archive, [
+        IndexModel([('archived_at', DESCENDING), ('_id', DESCENDING)], name='archived_at'),
+        IndexModel([('departments', ASCENDING), ('archived_at', DESCENDING), ('_id', DESCENDING)],
+                   name='departments_archived_at'),
+        ORDERS_TEXT,
+    ]),
+    (faults_archive, [
+        IndexModel([('archived_at', DESCENDING), ('_id', DESCENDING)], name='archived_at'),
+        IndexModel([('department', ASCENDING), ('archived_at', DESCENDING), ('_id', DESCENDING)],
+                   name='department_archived_at'),
+        FAULTS_TEXT,
+    ]),
+    (reliability_archive, [
+        IndexModel([('archived_at', DESCENDING), ('_id', DESCENDING)], name='archived_at'),
+        IndexModel([('departments', ASCENDING), ('archived_at', DESCENDING), ('_id', DESCENDING)],
+                   name='departments_archived_at'),
+        # Проверка повторов при импорте и добавлении: архивная копия тоже считается существующей
+        IndexModel([('dedup_key', ASCENDING)], name='dedup_key'),
+        RELIABILITY_TEXT,
+    ]),
+    (remarks, [
+        IndexModel([('year', ASCENDING), ('department', ASCENDING), ('value', ASCENDING)],
+                   name='year_department_value'),
+    ]),
+    (plans, [
+        IndexModel([('year', ASCENDING), ('department', ASCENDING), ('value', ASCENDING)],
+                   name='year_department_value'),
+    ]),
+    (leaks, [
+        IndexModel([('year', ASCENDING), ('department', ASCENDING)],
+                   name='year_department'),
+    ]),
+    (kss, [
+        IndexModel([('year', ASCENDING)], name='year'),
+    ]),
+    (rollups, [
+        IndexModel([('department', ASCENDING), ('year', ASCENDING), ('quarter', ASCENDING)],
+                   name='department_year_quarter', unique=True),
+    ]),
+    (jobs, [
+        # Выбор следующей задачи и возврат зависших
+        IndexModel([('status', ASCENDING), ('run_at', ASCENDING)], name='status_run_at'),
+        IndexModel([('status', ASCENDING), ('created_at', ASCENDING)], name='status_created_at'),
+        # Выполненные задачи удаляются через неделю
+        IndexModel([('finished_at', ASCENDING)], name='finished_at_ttl',
+                   expireAfterSeconds=7 * 24 * 3600,
+                   partialFilterExpression={'status': 'done'}),
+    ]),
+    (users, [
+        # Вход в систему: users.find_one({'department': ...})
+        IndexModel([('department', ASCENDING)], name='department'),
+    ]),
+    (reqs, [
+        # Заявки бота: выборки по статусу с сортировкой по времени заявки
+        IndexModel([('status', ASCENDING), ('req_type', ASCENDING), ('request_datetime', ASCENDING)],
+                   name='status_req_type_request_datetime'),
+        IndexModel([('status', ASCENDING), ('is_complete', ASCENDING), ('request_datetime', ASCENDING)],
+                   name='status_is_complete_request_datetime'),
+    ]),
+]
+
+# Опции индекса, которые учитываются при сравнении с существующим индексом
+COMPARED_OPTIONS = ('unique', 'sparse', 'partialFilterExpression',
+                    'expireAfterSeconds', 'weights', 'default_language',
+                    'collation')
+
+
+def _normalize(value):
+    if hasattr(value, 'items'):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _index_spec(document):
+    """Приводит описание индекса к виду, пригодному для сравнения"""
+    key = [(field, _normalize(direction)) for field, direction in dict(document['key']).items()]
+    options = {option: _normalize(document[option]) for option in COMPARED_OPTIONS
+               if document.get(option) not in (None, False)}
+
+    # Текстовый индекс хранится в базе как _fts/_ftsx, поля попадают в weights
+    text_fields = [field for field, direction in key if direction == 'text']
+    if text_fields or ('_fts', 'text') in key:
+        key = [(field, direction) for field, direction in key
+               if direction != 'text' and field not in ('_fts', '_ftsx')]
+        options.setdefault('weights', {field: 1 for field in text_fields})
+        options.setdefault('default_language', 'english')
+    return key, options
+
+
+def ensure_indexes(prune=False, dry_run=False):
+    """
+    Приводит индексы коллекций в соответствие с реестром INDEXES.
+    Возвращает список (коллекция, индекс, действие), где действие одно из:
+    created, recreated, unchanged, dropped.
+    """
+    results = []
+    for collection, models in INDEXES:
+        full_name = collection.full_name
+        existing = collection.index_information()
+        declared = {}
+        for model in models:
+            document = model.document
+            declared[document['name']] = model
+
+        to_create = []
+        for name, model in declared.items():
+            if name not in existing:
+                to_create.append(model)
+                results.append((full_name, name, 'created'))
+                continue
+            if _index_spec(existing[name]) == _index_spec(model.document):
+                results.append((full_name, name, 'unchanged'))
+                continue
+            # Определение изменилось - пересоздаем индекс
+            if not dry_run:
+                collection.drop_index(name)
+            to_create.append(model)
+            results.append((full_name, name, 'recreated'))
+
+        if prune:
+            for name in existing:
+                if name == '_id_' or name in declared:
+                    continue
+                if not dry_run:
+                    collection.drop_index(name)
+                results.append((full_name, name, 'dropped'))
+
+        if to_create and not dry_run:
+            collection.create_indexes(to_create)
+    return results
@@ -0,0 +1,254 @@
+import logging
+import os
+import sys
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from pymongo import ReturnDocument
+
+from report_webapp.utils import jobs
+
+logger = logging.getLogger(__name__)
+
+# Обработчики задач: тип задачи -> функция(payload)
+JOB_HANDLERS = {}
+
+# Очереди обработчика: очередь -> типы задач (None - все остальные типы).
+# Каждую очередь обрабатывает свой поток, чтобы многоминутный импорт Excel
+# не задерживал побочные эффекты отчетов
+DEFAULT_QUEUE = 'default'
+WORKER_QUEUES = {
+    DEFAULT_QUEUE: None,
+    'imports': ['excel_import'],
+}
+
+_wakeup = {queue: threading.Event() for queue in WORKER_QUEUES}
+# Задача, выполняемая в текущем потоке (для отчета о ходе выполнения)
+_current = threading.local()
+_worker_lock = threading.Lock()
+_worker_threads = {}
+
+
+def job_handler(job_type):
+    """Декоратор регистрации обработчика задачи"""
+    def decorator(func):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+
+def enqueue(job_type, payload, session=None, max_attempts=None):
+    """Ставит задачу в очередь, возвращает _id задачи"""
+    now = datetime.now()
+    result = jobs.insert_one({
+        'type': job_type,
+        'payload': payload,
+        'status': 'pending',
+        'attempts': 0,
+        'max_attempts': max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        'created_at': now,
+        'run_at': now,
+    }, session=session)
+    # В транзакции задача станет видна только после фиксации - будим обработчик позже
+    if session is None:
+        notify_worker(job_type)
+    return result.inserted_id
+
+
+def job_queue(job_type):
+    """Очередь, в которой выполняется задача данного типа"""
+    for queue, types in WORKER_QUEUES.items():
+        if types is not None and job_type in types:
+            return queue
+    return DEFAULT_QUEUE
+
+
+def queue_filter(queue):
+    """Условие на тип задачи для очереди (None - задачи всех типов)"""
+    if queue is None:
+        return {}
+    types = WORKER_QUEUES[queue]
+    if types is not None:
+        return {'type': {'$in': types}}
+    others = [job_type for types in WORKER_QUEUES.values() if types for job_type in types]
+    return {'type': {'$nin': others}}
+
+
+def notify_worker(job_type=None):
+    """Будит обработчик очереди задачи (без типа - все очереди), не дожидаясь интервала опроса"""
+    ensure_worker()
+    queues = [job_queue(job_type)] if job_type else list(WORKER_QUEUES)
+    for queue in queues:
+        _wakeup[queue].set()
+
+
+# Зависшая задача: блокировка истекла, обработчик (или весь процесс) прервался
+STALE_ATTEMPTS_LEFT = {'$expr': {'$lt': ['$attempts', '$max_attempts']}}
+STALE_EXHAUSTED = {'$expr': {'$gte': ['$attempts', '$max_attempts']}}
+
+
+def fail_stale_jobs():
+    """
+    Завершает ошибкой зависшие задачи без оставшихся попыток. Задача, уронившая
+    процесс (например, по памяти), иначе перезапускалась бы бесконечно, а задача
+    с одной попыткой (импорт Excel) - повторялась бы вопреки max_attempts
+    """
+    now = datetime.now()
+    result = jobs.update_many(
+        {'status': 'running', 'locked_until': {'$lt': now}, **STALE_EXHAUSTED},
+        {
+            '$set': {'status': 'failed', 'finished_at': now,
+                     'error': {'message': 'Обработчик прервался, попытки исчерпаны', 'at': now}},
+            '$unset': {'locked_until': ''}
+        }
+    )
+    return result.modified_count
+
+
+def claim_job(queue=None):
+    """
+    Забирает следующую задачу очереди (None - любой очереди): готовую к запуску
+    или зависшую у упавшего обработчика (если остались попытки)
+    """
+    now = datetime.now()
+    return jobs.find_one_and_update(
+        {'$or': [
+            {'status': 'pending', 'run_at': {'$lte': now}},
+            {'status': 'running', 'locked_until': {'$lt': now}, **STALE_ATTEMPTS_LEFT},
+        ], **queue_filter(queue)},
+        {
+            '$set': {'status': 'running', 'started_at': now,
+                     'locked_until': now + timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)},
+            '$inc': {'attempts': 1}
+        },
+        sort=[('run_at', 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def current_job_id():
+    """_id задачи, выполняемой в текущем потоке, или None вне обработчика"""
+    return getattr(_current, 'job_id', None)
+
+
+def report_progress(progress):
+    """
+    Сохраняет ход выполнения текущей задачи и продлевает ее блокировку,
+    чтобы долгая задача не считалась зависшей
+    """
+    job_id = current_job_id()
+    if job_id is None:
+        return
+    now = datetime.now()
+    jobs.update_one({'_id': job_id}, {'$set': {
+        'progress': {**progress, 'updated_at': now},
+        'locked_until': now + timedelta(seconds=settings.JOBS_LOCK_TIMEOUT),
+    }})
+
+
+def run_job(job):
+    """
+    Выполняет задачу; при ошибке планирует повтор с экспоненциальной задержкой.
+    Значение, возвращенное обработчиком, сохраняется в поле result
+    """
+    handler = JOB_HANDLERS.get(job['type'])
+    _current.job_id = job['_id']
+    try:
+        if handler is None:
+            raise LookupError(f"Нет обработчика для задачи {job['type']}")
+        result = handler(job['payload'])
+    except Exception as e:
+        now = datetime.now()
+        error = {'message': str(e), 'traceback': traceback.format_exc(), 'at': now}
+        if job['attempts'] < job.get('max_attempts', settings.JOBS_MAX_ATTEMPTS):
+            delay = settings.JOBS_RETRY_DELAY * 2 ** (job['attempts'] - 1)
+            update = {'status': 'pending', 'run_at': now + timedelta(seconds=delay)}
+        else:
+            update = {'status': 'failed', 'finished_at': now}
+        jobs.update_one({'_id': job['_id']}, {'$set': {**update, 'error': error}, '$unset': {'locked_until': ''}})
+        logger.exception('Ошибка выполнения задачи %s (%s)', job['_id'], job['type'])
+        return False
+    finally:
+        _current.job_id = None
+
+    update = {'status': 'done', 'finished_at': datetime.now()}
+    if result is not None:
+        update['result'] = result
+    jobs.update_one({'_id': job['_id']}, {'$set': update, '$unset': {'locked_until': ''}})
+    return True
+
+
+def run_pending(limit=None, queue=None):
+    """
+    Выполняет готовые задачи очереди (None - всех очередей), пока они есть
+    (зависшие без попыток завершаются ошибкой); возвращает число обработанных
+    """
+    fail_stale_jobs()
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_job(queue)
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
+
+
+def worker_loop(stop_event=None, queue=DEFAULT_QUEUE):
+    """Цикл обработчика очереди: выполняет задачи и ждет новых или истечения интервала опроса"""
+    wakeup = _wakeup[queue]
+    while stop_event is None or not stop_event.is_set():
+        try:
+            run_pending(queue=queue)
+        except Exception:
+            logger.exception('Ошибка обработчика очереди задач %s', queue)
+        wakeup.wait(settings.JOBS_POLL_INTERVAL)
+        wakeup.clear()
+
+
+def start_workers():
+    """Запускает по фоновому потоку на каждую очередь (однократно), возвращает потоки"""
+    with _worker_lock:
+        for queue in WORKER_QUEUES:
+            thread = _worker_threads.get(queue)
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(target=worker_loop, kwargs={'queue': queue},
+                                          name=f'jobs-worker-{queue}', daemon=True)
+                thread.start()
+                _worker_threads[queue] = thread
+        return list(_worker_threads.values())
+
+
+def ensure_worker():
+    """Запускает обработчики очередей в текущем процессе, если это разрешено настройками"""
+    if settings.JOBS_WORKER_ENABLED:
+        start_workers()
+
+
+def start_worker_on_startup():
+    """
+    Запускает обработчик при старте веб-процесса: задачи, оставшиеся в очереди после
+    перезапуска (отложенные повторы, зависшие), выполняются, не дожидаясь новой постановки.
+    Из команд manage.py - только в runserver, и не в процессе-наблюдателе автоперезагрузки
+    """
+    argv = sys.argv
+    if argv and os.path.basename(argv[0]) in ('manage.py', 'django-admin', '__main__.py'):
+        if len(argv) < 2 or argv[1] != 'runserver':
+            return
+        if '--noreload' not in argv and os.environ.get('RUN_MAIN') != 'true':
+            return
+    ensure_worker()
+
+
+def queue_stats():
+    """Глубина очереди и отставание обработки"""
+    now = datetime.now()
+    counts = {status: 0 for status in ('pending', 'running', 'done', 'failed')}
+    for item in jobs.aggregate([{'$group': {'_id': '$status', 'count': {'$sum': 1}}}]):
+        counts[item['_id']] = item['count']
+
+    oldest = jobs.find_one({'status': 'pending'}, {'created_at': 1}, sort=[('created_at', 1)])
+    lag = (now - oldest['created_at']).total_seconds() if oldest else 0
+    return {'depth': counts['pending'] + counts['running'], 'counts': counts, 'lag_seconds': lag}
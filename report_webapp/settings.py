@@ -70,6 +70,25 @@ DATABASES = {
 MONGO_URI = "mongodb://localhost:27017/"
 
 
+# Очередь фоновых задач (коллекция jobs)
+JOBS_WORKER_ENABLED = True  # Запускать обработчик в процессе веб-приложения (при старте процесса)
+JOBS_POLL_INTERVAL = 5  # Интервал опроса очереди, секунды
+JOBS_LOCK_TIMEOUT = 300  # Через сколько секунд зависшая задача возвращается в очередь
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 10  # Базовая задержка повтора, секунды (удваивается с каждой попыткой)
+
+# Автоархивирование выполненных записей (manage.py auto_archive)
+AUTO_ARCHIVE_AFTER_DAYS = 30  # Через сколько дней после выполнения запись уходит в архив
+AUTO_ARCHIVE_INTERVAL = 3600  # Интервал запуска во встроенном цикле, секунды
+AUTO_ARCHIVE_BATCH_SIZE = 500
+
+# Поток событий изменений списков (SSE, только под ASGI)
+EVENTS_HISTORY_SIZE = 500  # Сколько последних событий хранится для переподключившихся клиентов
+EVENTS_QUEUE_SIZE = 1000  # Очередь клиента; при переполнении клиент получает reset и перезагружает списки
+EVENTS_HEARTBEAT = 15  # Интервал пустых сообщений, удерживающих соединение, секунды
+EVENTS_RETRY = 5000  # Задержка переподключения клиента, миллисекунды
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -104,4 +123,9 @@ STATICFILES_FINDERS = (
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Фоновый импорт из Excel: загруженные файлы хранятся до завершения задачи
+IMPORT_UPLOAD_DIR = os.path.join(MEDIA_ROOT, 'imports')
+IMPORT_ERRORS_SHOWN = 100  # Сколько отклоненных строк показывать в ходе выполнения
+IMPORT_MAX_WORKERS = min(os.cpu_count() or 1, 4)  # Процессов для параллельного разбора листов
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
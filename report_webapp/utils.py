@@ -1,4 +1,8 @@
-from pymongo import MongoClient
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from pymongo import MongoClient, ReplaceOne, UpdateOne
+from pymongo.errors import PyMongoError
 from django.conf import settings
 
 client = MongoClient(settings.MONGO_URI)
@@ -20,6 +24,161 @@ orders = db['orders']
 users = db['users']
 faults = db['faults']
 reliability = db['reliability']
+rollups = db['rollups']
+
+# Архивные (холодные) коллекции: в основных остаются только активные записи
+protocols_archive = db['protocols_archive']
+orders_archive = db['orders_archive']
+faults_archive = db['faults_archive']
+reliability_archive = db['reliability_archive']
+jobs = db['jobs']
+# Версии списков для условных GET: {'_id': имя списка, 'version': N, 'updated_at': время (UTC)}
+versions = db['versions']
+
+
+# Пул потоков для параллельных запросов к разным коллекциям
+query_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='mongo-query')
+
+# Сколько последних ключей примененных приращений хранится в документе (applied_jobs)
+APPLIED_KEYS_KEPT = 200
+
+_transactions_supported = None
+
+
+def supports_transactions():
+    """Проверяет, поддерживает ли развертывание MongoDB транзакции (replica set или mongos)"""
+    global _transactions_supported
+    if _transactions_supported is None:
+        try:
+            hello = client.admin.command('hello')
+            _transactions_supported = bool(hello.get('setName')) or hello.get('msg') == 'isdbgrid'
+        except PyMongoError:
+            _transactions_supported = False
+    return _transactions_supported
+
+
+def run_in_transaction(callback):
+    """
+    Выполняет callback(session) в транзакции, если она поддерживается,
+    иначе вызывает callback(None) без сессии
+    """
+    if not supports_transactions():
+        return callback(None)
+    with client.start_session() as session:
+        return session.with_transaction(callback)
+
+
+def bulk_write_all(operations, session=None):
+    """Выполняет пакеты операций вида [(коллекция, [операции]), ...] по одному bulk_write на коллекцию"""
+    for collection, requests in operations:
+        if requests:
+            collection.bulk_write(requests, ordered=False, session=session)
+
+
+def applied_once(query, update, applied_key):
+    """
+    Условие и изменение, при которых приращение применяется к документу один раз на ключ
+    (_id задачи): ключ записывается в applied_jobs тем же обновлением, что и $inc,
+    поэтому повтор задачи после частичного сбоя не задвоит счетчики
+    """
+    if applied_key is None:
+        return query, update
+    return (
+        {**query, 'applied_jobs': {'$ne': applied_key}},
+        {**update, '$push': {'applied_jobs': {'$each': [applied_key], '$slice': -APPLIED_KEYS_KEPT}}}
+    )
+
+
+def increment_operations(collection, increments, applied_key=None, upsert=False):
+    """
+    Операции приращения счетчиков по списку [(условие, обновление), ...]
+    в виде [(коллекция, [операции]), ...] для bulk_write_all.
+    С applied_key недостающие документы создаются отдельным пакетом до приращений:
+    upsert с условием по applied_jobs создал бы дубликат уже обновленного документа
+    """
+    if not increments:
+        return []
+    if applied_key is None:
+        return [(collection, [UpdateOne(query, update, upsert=upsert) for query, update in increments])]
+
+    operations = []
+    if upsert:
+        operations.append((collection, [
+            UpdateOne(query, {'$setOnInsert': {'applied_jobs': [], **update.get('$setOnInsert', {})}},
+                      upsert=True)
+            for query, update in increments
+        ]))
+    operations.append((collection, [
+        UpdateOne(*applied_once(query, update, applied_key)) for query, update in increments
+    ]))
+    return operations
+
+
+def move_documents(source, target, query, set_fields=None, unset_fields=None):
+    """
+    Переносит документы из source в target с изменением полей.
+    В транзакции, если она поддерживается; без нее повторный запуск безопасен:
+    документ в target перезаписывается по _id, из source удаляются только перенесенные.
+    Возвращает список _id перенесенных документов
+    """
+    def move(session):
+        documents = list(source.find(query, session=session))
+        if not documents:
+            return []
+        requests = []
+        for document in documents:
+            document.update(set_fields or {})
+            for field in unset_fields or []:
+                document.pop(field, None)
+            requests.append(ReplaceOne({'_id': document['_id']}, document, upsert=True))
+        target.bulk_write(requests, ordered=False, session=session)
+        ids = [document['_id'] for document in documents]
+        source.delete_many({'_id': {'$in': ids}}, session=session)
+        return ids
+
+    return run_in_transaction(move)
+
+
+def backfill_documents(collection, query, projection, update_document, batch_size=1000):
+    """
+    Заполняет поля документов пакетами bulk_write (для команд миграции).
+    update_document(document) возвращает update для UpdateOne или None, если документ пропускается.
+    Возвращает число измененных документов
+    """
+    updated = 0
+    requests = []
+    for document in collection.find(query, projection, batch_size=batch_size):
+        update = update_document(document)
+        if update is None:
+            continue
+        requests.append(UpdateOne({'_id': document['_id']}, update))
+        if len(requests) >= batch_size:
+            updated += collection.bulk_write(requests, ordered=False).modified_count
+            requests = []
+    if requests:
+        updated += collection.bulk_write(requests, ordered=False).modified_count
+    return updated
+
+
+def bump_version(*names, session=None):
+    """Увеличивает версию списков после записи - клиенты получат новый ETag"""
+    for name in names:
+        versions.update_one(
+            {'_id': name},
+            {'$inc': {'version': 1}, '$set': {'updated_at': datetime.now(timezone.utc)}},
+            upsert=True, session=session
+        )
+
+
+def get_version(name):
+    """Текущая версия списка; для списка без записей - нулевая"""
+    return versions.find_one({'_id': name}) or {'_id': name, 'version': 0, 'updated_at': None}
+
+
+def run_concurrently(**queries):
+    """Выполняет независимые запросы параллельно, возвращает {имя: результат}"""
+    futures = {name: query_executor.submit(query) for name, query in queries.items()}
+    return {name: future.result() for name, future in futures.items()}
 
 
 def authenticate_user(department, password):
@@ -44,6 +203,9 @@ def authenticate_user(department, password):
     'created_at': datetime
 }
 
+архивные коллекции protocols_archive, orders_archive, faults_archive, reliability_archive
+хранят документы той же структуры, что и основные, с 'archived': True и 'archived_at'
+
 структура для users:
 {
     '_id': порядковый номер,
@@ -61,6 +223,8 @@ def authenticate_user(department, password):
     'date': требуемая дата исполнения,
     'text': содержание распоряжения,
     'done': {'КС-1,4': дата_выполнения},
+    'completion': [{'department': 'КС-1,4', 'done_at': дата_выполнения или None}],  # по каждой службе из departments
+    'deadline_at': срок исполнения датой (None для периодических сроков),
     'archived': True/False
     'archived_at': datetime
 }
@@ -73,6 +237,8 @@ def authenticate_user(department, password):
     'text': текст мероприятия,
     'departments': [список подразделений (служб) для выполнения протокола совещания]
     'done': {'КС-1,4': дата_выполнения},
+    'completion': [{'department': 'КС-1,4', 'done_at': дата_выполнения или None}],  # по каждой службе из departments
+    'deadline_at': срок исполнения датой (None для периодических сроков),
     'archived': True/False
     'archived_at': datetime
 }
@@ -122,6 +288,33 @@ def authenticate_user(department, password):
     },
 }
 
+структура данных rollups: (квартальные сводки показателей отчетов, обновляются при каждом отчете)
+{
+    '_id': порядковый номер,
+    'department': наименование службы,
+    'year': год (целое число),
+    'quarter': квартал 1-4,
+    'reports': {'daily': количество отчетов, 'weekly': количество отчетов},
+    'metrics': {'apk_total': сумма, 'leak_done': сумма, ...}  # все числовые поля отчетов
+    'updated_at': datetime
+}
+
+структура данных jobs: (очередь фоновых задач)
+{
+    '_id': порядковый номер,
+    'type': тип задачи (например 'report_side_effects'),
+    'payload': параметры задачи,
+    'status': 'pending', 'running', 'done' или 'failed',
+    'attempts': количество попыток,
+    'max_attempts': максимальное количество попыток,
+    'created_at': datetime,
+    'run_at': datetime - не раньше которого запускать,
+    'started_at': datetime,
+    'locked_until': datetime - срок блокировки обработчиком,
+    'finished_at': datetime,
+    'error': {'message': текст ошибки, 'traceback': стек, 'at': datetime}
+}
+
 структура данных reports:
 {
     '_id': порядковый номер,
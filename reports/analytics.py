@@ -0,0 +1,222 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.cache import cache
+
+from report_webapp.utils import reports, faults, faults_archive, get_version, bump_version
+from reports.utils import REPORT_CATEGORIES, REPORT_NUMERIC_FIELDS
+
+
+# Шаги группировки временных рядов
+TREND_UNITS = ('day', 'week', 'month')
+# Кэш закрытых периодов живет до явного сброса, ограничиваем только сроком хранения
+TRENDS_CACHE_TIMEOUT = 7 * 24 * 3600
+# Статистика замечаний: ключ кэша меняется с версией списка, срок нужен только
+# для замечаний, ставших просроченными без записи в базу
+FAULT_STATS_CACHE_TIMEOUT = 60
+
+# Путь к числовому полю в документе отчета: apk_total -> data.apk.apk_total
+METRIC_PATHS = {
+    field: f'data.{category}.{field}'
+    for category, fields in REPORT_CATEGORIES.items()
+    for field in fields if field in REPORT_NUMERIC_FIELDS
+}
+
+
+def trends_cache_key(unit):
+    """
+    Ключ кэша закрытых периодов для шага группировки. Версия в базе общая для всех
+    процессов - сброс после записи отчета в закрытый период виден везде
+    """
+    version = get_version(f'trends:{unit}')['version']
+    return f'trends:{unit}:{version}'
+
+
+def bucket_start(date, unit):
+    """
+    Начало периода (день/неделя с понедельника/месяц). Время отчетов хранится наивным
+    местным (datetime.now() в часовом поясе TIME_ZONE), поэтому пересчет поясов не нужен
+    """
+    start = date.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == 'week':
+        start -= timedelta(days=start.weekday())
+    elif unit == 'month':
+        start = start.replace(day=1)
+    return start
+
+
+def next_bucket(start, unit):
+    """Начало следующего периода"""
+    if unit == 'day':
+        return start + timedelta(days=1)
+    if unit == 'week':
+        return start + timedelta(days=7)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def aggregate_trends(unit, since=None, until=None, departments=None):
+    """
+    Суммы всех числовых показателей по службам и периодам за время [since, until).
+    Возвращает {служба: {начало_периода: {показатель: значение}}}
+    """
+    match = {}
+    if since or until:
+        match['datetime'] = {}
+        if since:
+            match['datetime']['$gte'] = since
+        if until:
+            match['datetime']['$lt'] = until
+    if departments:
+        match['department'] = {'$in': departments}
+    group = {
+        '_id': {
+            'department': '$department',
+            # Без timezone: хранимое наивное время уже местное
+            'bucket': {'$dateTrunc': {
+                'date': '$datetime',
+                'unit': unit,
+                'startOfWeek': 'monday',
+            }},
+        },
+        'reports': {'$sum': 1},
+    }
+    for metric, path in METRIC_PATHS.items():
+        group[metric] = {'$sum': {'$ifNull': [f'${path}', 0]}}
+
+    series = {}
+    for item in reports.aggregate([{'$match': match}, {'$group': group}]):
+        department = item['_id']['department']
+        bucket = item['_id']['bucket']
+        values = {metric: item[metric] for metric in METRIC_PATHS}
+        values['reports'] = item['reports']
+        series.setdefault(department, {})[bucket] = values
+    return series
+
+
+def trends_range(unit, date_from=None, date_to=None):
+    """
+    Границы выборки [since, until) для периодов, начало которых попадает в [date_from, date_to].
+    Период, начавшийся до date_from, в результат не входит, период с началом в date_to - входит целиком
+    """
+    since = until = None
+    if date_from:
+        since = bucket_start(date_from, unit)
+        if since < date_from:
+            since = next_bucket(since, unit)
+    if date_to:
+        until = next_bucket(bucket_start(date_to, unit), unit)
+    return since, until
+
+
+def get_trends(unit, now=None, date_from=None, date_to=None, departments=None):
+    """
+    Временные ряды показателей по службам. Закрытые периоды берутся из кэша,
+    заново агрегируется только история после последнего закрытого периода.
+    Пока кэша нет, запрос с диапазоном дат или службами агрегирует только их
+    """
+    # Время отчетов пишется через datetime.now(), сравниваем по тем же часам
+    now = now or datetime.now()
+    current_start = bucket_start(now, unit)
+    since, until = trends_range(unit, date_from, date_to)
+    key = trends_cache_key(unit)
+    cached = cache.get(key)
+
+    if cached is None and (since or until or departments):
+        return aggregate_trends(unit, since, until, departments)
+
+    if cached is None:
+        closed, closed_until = {}, None
+    else:
+        closed, closed_until = cached['series'], cached['closed_until']
+
+    fresh = aggregate_trends(unit, since=closed_until)
+
+    # Периоды, закрывшиеся с момента прошлого расчета, переносим в кэш
+    series = {department: dict(buckets) for department, buckets in closed.items()}
+    for department, buckets in fresh.items():
+        for bucket, values in buckets.items():
+            series.setdefault(department, {})[bucket] = values
+            if bucket < current_start:
+                closed.setdefault(department, {})[bucket] = values
+    if cached is None or closed_until != current_start:
+        cache.set(key, {'series': closed, 'closed_until': current_start}, TRENDS_CACHE_TIMEOUT)
+
+    return {
+        department: {bucket: values for bucket, values in buckets.items()
+                     if (since is None or bucket >= since) and (until is None or bucket < until)}
+        for department, buckets in series.items()
+        if not departments or department in departments
+    }
+
+
+def invalidate_trends(report_list, now=None):
+    """Сбрасывает кэш закрытых периодов, если отчеты попали в уже закрытый период"""
+    now = now or datetime.now()
+    for unit in TREND_UNITS:
+        current_start = bucket_start(now, unit)
+        if any(_as_local(report_data['datetime']) < current_start for report_data in report_list):
+            bump_version(f'trends:{unit}')
+
+
+def _as_local(date):
+    """Приводит время к наивному местному для сравнения с границами периодов"""
+    if date.tzinfo is not None:
+        return date.astimezone(ZoneInfo(settings.TIME_ZONE)).replace(tzinfo=None)
+    return date
+
+
+def format_bucket(bucket):
+    """Дата начала периода (ГГГГ-ММ-ДД)"""
+    return bucket.date().isoformat()
+
+
+def fault_stats_pipeline(today, department=None):
+    """
+    Счетчики замечаний по службе и типу (активные и архивные) одним $group:
+    открытые, просроченные, закрытые и среднее время устранения в миллисекундах
+    """
+    is_open = {'$ne': ['$is_done', True]}
+    # Фильтр по службе - до объединения и внутри $unionWith: обе коллекции читаются
+    # по индексу department, а не целиком
+    if department:
+        match = {'$match': {'department': department}}
+        pipeline = [match, {'$unionWith': {'coll': faults_archive.name, 'pipeline': [match]}}]
+    else:
+        pipeline = [{'$unionWith': faults_archive.name}]
+    pipeline.append({'$group': {
+        '_id': {'department': '$department', 'type': '$type'},
+        'open': {'$sum': {'$cond': [is_open, 1, 0]}},
+        'overdue': {'$sum': {'$cond': [{'$and': [is_open, {'$lt': ['$date', today]}]}, 1, 0]}},
+        'closed': {'$sum': {'$cond': [is_open, 0, 1]}},
+        # $avg пропускает null - открытые замечания в среднее не входят
+        'close_time': {'$avg': {'$cond': [
+            is_open, None, {'$max': [0, {'$subtract': ['$date_done', '$created_at']}]}
+        ]}},
+    }})
+    return pipeline
+
+
+def get_fault_stats(department=None, now=None):
+    """Статистика замечаний по службам и типам с кратковременным кэшем"""
+    version = get_version('faults')['version']
+    key = f"faults:stats:{version}:{department or ''}"
+    stats = cache.get(key)
+    if stats is not None:
+        return stats
+
+    today = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    stats = []
+    for item in faults.aggregate(fault_stats_pipeline(today, department)):
+        close_time = item['close_time']
+        stats.append({
+            'department': item['_id']['department'],
+            'type': item['_id']['type'],
+            'open': item['open'],
+            'overdue': item['overdue'],
+            'closed': item['closed'],
+            'mean_close_days': round(close_time / 86400000, 1) if close_time is not None else None,
+        })
+    stats.sort(key=lambda row: (row['department'] or '', row['type'] or ''))
+    cache.set(key, stats, FAULT_STATS_CACHE_TIMEOUT)
+    return stats
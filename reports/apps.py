@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reports'
+
+    def ready(self):
+        # Регистрация обработчиков фоновых задач
+        from reports import tasks  # noqa: F401
+        from report_webapp.jobs import start_worker_on_startup
+        start_worker_on_startup()
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from report_webapp.utils import protocols, orders, faults, reliability
+
+
+def completed_items_pipeline(cutoff):
+    """
+    Агрегация выполненных всеми службами записей: в completion есть отметки,
+    нет ни одной невыполненной, и последняя отметка поставлена раньше cutoff
+    """
+    return [
+        {'$match': {
+            'completion.0': {'$exists': True},
+            'completion': {'$not': {'$elemMatch': {'done_at': None}}},
+        }},
+        {'$match': {'$expr': {'$lt': [{'$max': '$completion.done_at'}, cutoff]}}},
+        {'$project': {'_id': 1}},
+    ]
+
+
+def completed_item_ids(kind, cutoff):
+    """Курсор _id выполненных раньше cutoff записей данного типа"""
+    if kind == 'faults':
+        return (item['_id'] for item in faults.find(
+            {'is_done': True, 'date_done': {'$lt': cutoff}}, {'_id': 1}))
+    collection = {'protocols': protocols, 'orders': orders, 'reliability': reliability}[kind]
+    return (item['_id'] for item in collection.aggregate(completed_items_pipeline(cutoff)))
+
+
+def auto_archive(older_than_days, batch_size=500, dry_run=False, now=None):
+    """
+    Переносит в архив записи, выполненные не позднее older_than_days дней назад,
+    пакетами по batch_size. Возвращает {тип: число записей}
+    """
+    from reports.views import ITEM_COLLECTIONS, archive_items
+
+    cutoff = (now or datetime.now()) - timedelta(days=older_than_days)
+    counts = {}
+    for kind in ITEM_COLLECTIONS:
+        # Идентификаторы собираются до переноса, чтобы не читать курсор по изменяемой коллекции
+        ids = list(completed_item_ids(kind, cutoff))
+        archived = 0
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            archived += len(batch) if dry_run else len(archive_items(kind, batch))
+        counts[kind] = archived
+    return counts
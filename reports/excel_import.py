@@ -0,0 +1,394 @@
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from queue import Empty
+
+from django.conf import settings
+from openpyxl import load_workbook
+from pymongo.errors import BulkWriteError
+
+from report_webapp.events import publish_change
+from report_webapp.utils import reliability, reliability_archive, bump_version, run_concurrently
+from reports.utils import (find_header, parse_date_to_dmy, parse_departments,
+                           parse_deadline, completion_entries, reliability_key)
+
+
+# Столбцы плана мероприятий по надежности: (поле, подстроки заголовка).
+# Порядок важен: "наименование/тип оборудования" не должно попасть в name
+RELIABILITY_COLUMNS = [
+    ('name', ('наименование мероприятия',)),
+    ('equipment', ('наименование/тип оборудования', 'оборудование')),
+    ('date', ('сроки реализации', 'периодичность выполнения')),
+    ('departments', ('ответственные',)),
+    ('note', ('примечание',)),
+]
+RELIABILITY_REQUIRED = {
+    'name': 'Наименование мероприятия',
+    'date': 'Сроки реализации',
+    'departments': 'Ответственные',
+}
+# Сколько первых строк файла просматривается в поисках заголовка
+HEADER_SCAN_LIMIT = 50
+# Строк в одной пачке: один $in-запрос на дубликаты и один insert_many
+IMPORT_CHUNK_SIZE = 1000
+DUPLICATE_KEY_ERROR = 11000
+IMPORT_STATUSES = ('imported', 'duplicate', 'rejected')
+
+
+# Импорт из Excel по типу записей: kind -> функция(файл, progress=None, sheets=None)
+IMPORTERS = {}
+
+
+class ImportFormatError(ValueError):
+    """Файл не соответствует ожидаемой таблице (нет заголовка или нужных столбцов)"""
+
+
+def importer(kind):
+    """
+    Декоратор регистрации импорта для фоновой задачи excel_import.
+    Функция получает путь к файлу, progress(строка, всего строк, результат) и имена
+    листов (None - все листы), возвращает строки {'sheet', 'row'} по результату
+    (imported, duplicate, rejected) и список листов sheets
+    """
+    def decorator(func):
+        IMPORTERS[kind] = func
+        return func
+    return decorator
+
+
+def save_upload(uploaded_file):
+    """Сохраняет загруженный файл для фонового импорта, возвращает путь"""
+    os.makedirs(settings.IMPORT_UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(settings.IMPORT_UPLOAD_DIR, f'{uuid.uuid4().hex}.xlsx')
+    with open(path, 'wb') as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+    return path
+
+
+@contextmanager
+def open_workbook(file):
+    """
+    Книга в режиме read_only: строки листов читаются потоково, в памяти только текущая.
+    Книга держит файл открытым до выхода из контекста
+    """
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        yield workbook
+    finally:
+        workbook.close()
+
+
+@contextmanager
+def open_sheet(file, sheet_name=None):
+    """Лист книги в режиме read_only (по умолчанию активный)"""
+    with open_workbook(file) as workbook:
+        yield workbook[sheet_name] if sheet_name else workbook.active
+
+
+@contextmanager
+def open_sheet_rows(file, sheet_name=None):
+    """Потоковое чтение листа: строки - кортежи значений ячеек"""
+    with open_sheet(file, sheet_name) as sheet:
+        yield sheet.iter_rows(values_only=True)
+
+
+def map_columns(header, columns):
+    """Номера столбцов (с 0) по значениям строки заголовков: {поле: индекс}"""
+    mapping = {}
+    for index, value in enumerate(header):
+        if not value:
+            continue
+        text = str(value).lower().strip()
+        for field, patterns in columns:
+            if any(pattern in text for pattern in patterns):
+                mapping[field] = index
+                break
+    return mapping
+
+
+def read_table(rows, columns, required):
+    """
+    Строки таблицы в виде словарей {поле: значение} за один проход по файлу.
+    Первый элемент - номер строки в файле (для сообщений об ошибках)
+    """
+    header_number, header, rows = find_header(rows, scan_limit=HEADER_SCAN_LIMIT)
+    if header_number is None:
+        raise ImportFormatError('Не удалось найти заголовки таблицы в файле')
+
+    mapping = map_columns(header, columns)
+    missing = [title for field, title in required.items() if field not in mapping]
+    if missing:
+        raise ImportFormatError(f"Не найдены необходимые столбцы: {', '.join(missing)}")
+
+    for number, values in enumerate(rows, start=header_number + 1):
+        yield number, {field: values[index] if index < len(values) else None
+                       for field, index in mapping.items()}
+
+
+def reliability_document(record, now=None):
+    """
+    Мероприятие по надежности из строки плана.
+    None - строка без ответственных служб (пропускается)
+    """
+    full_name = str(record['name'])
+    if record.get('equipment'):
+        full_name = f"{record['equipment']}. {full_name}"
+
+    departments = parse_departments(str(record['departments']) if record['departments'] else '')
+    if not departments:
+        return None
+
+    date_str = parse_date_to_dmy(record['date'])
+    note = record.get('note')
+    return {
+        'name': full_name,
+        'date': date_str,
+        'dedup_key': reliability_key(full_name, date_str),
+        'deadline_at': parse_deadline(date_str),
+        'departments': departments,
+        'completion': completion_entries(departments),
+        'note': str(note) if note else '',
+        'archived': False,
+        'created_at': now or datetime.now(),
+        'done': {},
+        'source': 'excel_import'
+    }
+
+
+def reliability_rows(rows):
+    """
+    Разбор строк плана: (номер строки, документ, причина отклонения).
+    Пустые строки пропускаются
+    """
+    for number, record in read_table(rows, RELIABILITY_COLUMNS, RELIABILITY_REQUIRED):
+        if not record['name']:
+            # Пустые строки пропускаем молча, заполненные без названия - отклоняем
+            if any(value not in (None, '') for value in record.values()):
+                yield number, None, 'Не указано наименование мероприятия'
+            continue
+
+        document = reliability_document(record)
+        if document is None:
+            yield number, None, 'Не указаны ответственные службы'
+            continue
+        yield number, document, None
+
+
+def parse_reliability_sheet(path, sheet_name, queue):
+    """
+    Разбор листа в процессе пула. Строки передаются в queue пачками по IMPORT_CHUNK_SIZE:
+    ('rows', лист, [(номер строки, документ, причина), ...]), в конце - ('done', лист, ошибка формата).
+    Очередь ограничена, поэтому разбор ждет, пока основной процесс запишет прежние пачки,
+    и в памяти процесса не больше одной пачки. Лист без таблицы плана не прерывает импорт остальных
+    """
+    error = None
+    try:
+        with open_sheet_rows(path, sheet_name) as rows:
+            batch = []
+            for row in reliability_rows(rows):
+                batch.append(row)
+                if len(batch) >= IMPORT_CHUNK_SIZE:
+                    queue.put(('rows', sheet_name, batch))
+                    batch = []
+            if batch:
+                queue.put(('rows', sheet_name, batch))
+    except ImportFormatError as e:
+        error = str(e)
+    except Exception as e:
+        queue.put(('failed', sheet_name, f'{type(e).__name__}: {e}'))
+        return
+    queue.put(('done', sheet_name, error))
+
+
+def parse_sheets_parallel(path, sheet_names):
+    """
+    Разбор листов в пуле процессов. Выдает сообщения parse_reliability_sheet по мере готовности:
+    пачки разных листов чередуются, итог ('done', лист, ошибка) - после последней пачки листа.
+    Время разбора книги - примерно время самого большого листа
+    """
+    workers = min(len(sheet_names), settings.IMPORT_MAX_WORKERS)
+    # spawn: обработчик задач работает в потоке веб-процесса, fork при живых потоках небезопасен
+    context = multiprocessing.get_context('spawn')
+    manager = context.Manager()
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    try:
+        # По две пачки на процесс: запись не простаивает, память ограничена
+        queue = manager.Queue(maxsize=workers * 2)
+        futures = [pool.submit(parse_reliability_sheet, path, name, queue) for name in sheet_names]
+        pending = len(sheet_names)
+        while pending:
+            try:
+                message = queue.get(timeout=1)
+            except Empty:
+                # Процесс пула завершился аварийно, не отправив итог листа
+                for future in futures:
+                    if future.done() and future.exception():
+                        raise future.exception()
+                continue
+            kind, sheet_name, data = message
+            if kind == 'failed':
+                raise RuntimeError(f'Ошибка разбора листа {sheet_name}: {data}')
+            if kind == 'done':
+                pending -= 1
+            yield message
+    finally:
+        # Сначала очередь: если чтение прервано, процессы, ждущие места в ней, получат ошибку и завершатся
+        manager.shutdown()
+        pool.shutdown(cancel_futures=True)
+
+
+def select_sheets(workbook, sheets=None):
+    """Имена листов для импорта: выбранные или все листы с данными (не диаграммы)"""
+    available = [sheet.title for sheet in workbook.worksheets]
+    if not sheets:
+        return available
+    missing = [name for name in sheets if name not in available]
+    if missing:
+        raise ImportFormatError(f"В файле нет листов: {', '.join(missing)}")
+    return [name for name in available if name in sheets]
+
+
+@importer('reliability')
+def import_reliability(file, progress=None, sheets=None):
+    """
+    Импорт плана мероприятий по надежности из Excel (все листы или выбранные).
+    Один лист читается потоково; несколько листов разбираются параллельно в пуле
+    процессов, их строки приходят пачками и записываются с общей проверкой дубликатов.
+    Возвращает строки по результату: {'imported': [{'sheet', 'row'}, ...], 'duplicate': [...],
+    'rejected': [{'sheet', 'row', 'reason'}, ...], 'sheets': [{'sheet', 'rows', 'error'}, ...]}
+    """
+    with open_workbook(file) as workbook:
+        sheet_names = select_sheets(workbook, sheets)
+        # Число строк берется из размеров листа, записанных в файле (может отсутствовать)
+        totals = [workbook[name].max_row for name in sheet_names]
+    total = sum(totals) if None not in totals else None
+
+    result = {'imported': [], 'duplicate': [], 'rejected': [], 'sheets': []}
+    chunk = []
+    processed = 0
+
+    def write(sheet_name, parsed, offset=None):
+        """
+        Записывает разобранные строки листа пачками, возвращает номер последней строки.
+        offset - строк файла до листа для хода выполнения (None - ход сообщает вызывающий)
+        """
+        nonlocal chunk
+        number = 0
+        for number, document, reason in parsed:
+            if progress and offset is not None and (offset + number) % IMPORT_CHUNK_SIZE == 0:
+                progress(offset + number, total, result)
+            if document is None:
+                result['rejected'].append({'sheet': sheet_name, 'row': number, 'reason': reason})
+                continue
+            chunk.append((sheet_name, number, document))
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                insert_reliability_chunk(chunk, result)
+                chunk = []
+        return number
+
+    parallel = (len(sheet_names) > 1 and settings.IMPORT_MAX_WORKERS > 1
+                and isinstance(file, (str, os.PathLike)))
+    if not parallel:
+        # Потоковое чтение в текущем процессе: в памяти только текущая строка и пачка записи
+        for sheet_name in sheet_names:
+            with open_sheet_rows(file, sheet_name) as rows:
+                try:
+                    number = write(sheet_name, reliability_rows(rows), processed)
+                except ImportFormatError as e:
+                    if len(sheet_names) == 1:
+                        raise
+                    result['sheets'].append({'sheet': sheet_name, 'rows': 0, 'error': str(e)})
+                    continue
+            processed += number
+            result['sheets'].append({'sheet': sheet_name, 'rows': number, 'error': None})
+    else:
+        # Пачки строк листов приходят из пула по мере разбора, запись и проверка
+        # дубликатов общие - в этом процессе; ход выполнения - после каждой пачки
+        last_rows = {}
+        for kind, sheet_name, data in parse_sheets_parallel(file, sheet_names):
+            if kind == 'rows':
+                last_rows[sheet_name] = write(sheet_name, data)
+                if progress:
+                    progress(sum(last_rows.values()), total, result)
+            elif data:
+                result['sheets'].append({'sheet': sheet_name, 'rows': 0, 'error': data})
+            else:
+                result['sheets'].append({'sheet': sheet_name, 'rows': last_rows.get(sheet_name, 0), 'error': None})
+        processed = sum(last_rows.values())
+        result['sheets'].sort(key=lambda sheet: sheet_names.index(sheet['sheet']))
+
+    if chunk:
+        insert_reliability_chunk(chunk, result)
+    if not any(sheet['error'] is None for sheet in result['sheets']):
+        raise ImportFormatError('; '.join(f"{sheet['sheet']}: {sheet['error']}" for sheet in result['sheets'])
+                                or 'В файле нет листов с таблицей')
+    if progress:
+        progress(processed, processed, result)
+    return result
+
+
+def import_counts(result):
+    """Количество строк по результату импорта"""
+    return {status: len(result[status]) for status in IMPORT_STATUSES}
+
+
+def existing_reliability_keys(keys):
+    """
+    Ключи dedup_key, уже занятые мероприятиями в основной коллекции или в архиве.
+    Уникальный индекс есть только у основной: без проверки архива запись повторно
+    импортировалась бы, а возврат архивной копии упирался бы в индекс
+    """
+    keys = list(keys)
+    found = run_concurrently(**{
+        collection.name: lambda collection=collection: [
+            document['dedup_key'] for document in
+            collection.find({'dedup_key': {'$in': keys}}, {'_id': 0, 'dedup_key': 1})
+        ]
+        for collection in (reliability, reliability_archive)
+    })
+    return {key for collection_keys in found.values() for key in collection_keys}
+
+
+def insert_reliability_chunk(chunk, result):
+    """
+    Вставляет пачку мероприятий [(лист, номер строки, документ), ...].
+    Уже существующие (в том числе в архиве) отсеиваются запросом по dedup_key, повторы
+    внутри пачки - по набору ключей; одновременный импорт того же файла ловит уникальный индекс
+    """
+    existing = existing_reliability_keys({document['dedup_key'] for _, _, document in chunk})
+
+    new = []
+    for sheet_name, number, document in chunk:
+        if document['dedup_key'] in existing:
+            result['duplicate'].append({'sheet': sheet_name, 'row': number})
+            continue
+        existing.add(document['dedup_key'])
+        new.append((sheet_name, number, document))
+    if not new:
+        return
+
+    errors = {}
+    try:
+        reliability.insert_many([document for _, _, document in new], ordered=False)
+    except BulkWriteError as e:
+        errors = {error['index']: error for error in e.details['writeErrors']}
+
+    inserted = []
+    for index, (sheet_name, number, document) in enumerate(new):
+        error = errors.get(index)
+        if error is None:
+            result['imported'].append({'sheet': sheet_name, 'row': number})
+            inserted.append(document)
+        elif error['code'] == DUPLICATE_KEY_ERROR:
+            result['duplicate'].append({'sheet': sheet_name, 'row': number})
+        else:
+            result['rejected'].append({'sheet': sheet_name, 'row': number, 'reason': error['errmsg']})
+
+    if inserted:
+        bump_version('reliability')
+        for document in inserted:
+            publish_change('reliability', 'created', str(document['_id']), document)
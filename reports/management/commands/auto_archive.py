@@ -0,0 +1,43 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from reports.archiving import auto_archive
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Переносит в архив записи, выполненные всеми службами (замечания - устраненные)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.AUTO_ARCHIVE_AFTER_DAYS,
+                            help='Сколько дней должно пройти после выполнения')
+        parser.add_argument('--batch-size', type=int, default=settings.AUTO_ARCHIVE_BATCH_SIZE,
+                            help='Количество записей, переносимых за один раз')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только посчитать записи, ничего не переносить')
+        parser.add_argument('--loop', action='store_true',
+                            help='Запускаться повторно каждые AUTO_ARCHIVE_INTERVAL секунд (вместо cron)')
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.run_once(options)
+            return
+
+        self.stdout.write('Автоархивирование запущено')
+        while True:
+            try:
+                self.run_once(options)
+            except Exception:
+                # Ошибка одного прохода не останавливает цикл
+                logger.exception('Ошибка автоархивирования')
+            time.sleep(settings.AUTO_ARCHIVE_INTERVAL)
+
+    def run_once(self, options):
+        counts = auto_archive(options['days'], options['batch_size'], options['dry_run'])
+        action = 'к переносу' if options['dry_run'] else 'перенесено в архив'
+        for kind, count in counts.items():
+            self.stdout.write(self.style.SUCCESS(f'{kind}: {action} {count}'))
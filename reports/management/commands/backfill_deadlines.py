@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from report_webapp.utils import (protocols, orders, reliability,
+                                 protocols_archive, orders_archive, reliability_archive,
+                                 backfill_documents, bump_version)
+from reports.utils import parse_deadline
+
+
+class Command(BaseCommand):
+    help = 'Заполняет deadline_at (срок датой) из текстовых сроков протоколов, распоряжений и мероприятий'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Количество документов в одном bulk_write')
+        parser.add_argument('--all', action='store_true',
+                            help='Пересчитать deadline_at и у документов, где он уже есть')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        query = {} if options['all'] else {'deadline_at': {'$exists': False}}
+
+        # Текстовый срок хранится в deadline, у мероприятий по надежности - в date
+        sources = [('protocols', protocols, 'deadline'), ('orders', orders, 'deadline'),
+                   ('reliability', reliability, 'date'), ('protocols', protocols_archive, 'deadline'),
+                   ('orders', orders_archive, 'deadline'), ('reliability', reliability_archive, 'date')]
+        changed = set()
+        for kind, collection, field in sources:
+            periodic = 0
+
+            def set_deadline(document):
+                nonlocal periodic
+                deadline_at = parse_deadline(document.get(field))
+                periodic += deadline_at is None
+                return {'$set': {'deadline_at': deadline_at}}
+
+            updated = backfill_documents(collection, query, {field: 1}, set_deadline, batch_size)
+            if updated:
+                changed.add(kind)
+            self.stdout.write(self.style.SUCCESS(
+                f'{collection.name}: обновлено {updated}, без срока {periodic}'
+            ))
+
+        # Списки изменились в обход представлений - клиенты должны получить новый ETag
+        if changed:
+            bump_version(*changed)
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from report_webapp.utils import reliability, reliability_archive, backfill_documents
+from reports.utils import reliability_key
+
+
+class Command(BaseCommand):
+    help = ('Заполняет dedup_key (ключ уникальности наименование + срок) у мероприятий по надежности. '
+            'Запускать до ensure_indexes: повторам ключ не присваивается, они выводятся списком')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Количество документов в одном bulk_write')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # Уникальность проверяется только в основной коллекции, архиву ключ нужен для восстановления
+        for collection, unique in ((reliability, True), (reliability_archive, False)):
+            taken = set()
+            if unique:
+                taken = {document['dedup_key'] for document in
+                         collection.find({'dedup_key': {'$exists': True}}, {'_id': 0, 'dedup_key': 1})}
+
+            duplicates = []
+
+            def set_key(document):
+                key = reliability_key(document.get('name'), document.get('date'))
+                if unique:
+                    if key in taken:
+                        duplicates.append(document['_id'])
+                        return None
+                    taken.add(key)
+                return {'$set': {'dedup_key': key}}
+
+            updated = backfill_documents(collection, {'dedup_key': {'$exists': False}},
+                                         {'name': 1, 'date': 1}, set_key, batch_size)
+
+            self.stdout.write(self.style.SUCCESS(f'{collection.name}: обновлено {updated}'))
+            if duplicates:
+                self.stdout.write(self.style.WARNING(
+                    f'{collection.name}: повторы без ключа ({len(duplicates)}): '
+                    + ', '.join(str(_id) for _id in duplicates)
+                ))
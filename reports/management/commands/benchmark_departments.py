@@ -0,0 +1,131 @@
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+from reports.utils import parse_departments, _parse_departments
+
+
+# Типичные значения столбца "Ответственные" в планах мероприятий
+SAMPLES = [
+    'Начальник ГКС',
+    'Начальники КС',
+    'Начальник КС-1,4, начальник КС-2,3',
+    'Начальник КС-5,6; начальник КС-7,8; начальник КС-9,10',
+    'Начальник службы ЛЭС',
+    'Начальник службы ЭВС, начальник службы АиМО',
+    'Начальник службы СЗК, начальник службы Связь',
+    'Начальник службы ВПО',
+    'Инженер по ремонту',
+    'Инженера по ремонту, начальник КС-2,3',
+    'Инженер ЭОГО (техдиагностика)',
+    'Все типы ГПА',
+    'Начальники КС, инженер по ремонту',
+    'ЛЭС, СЗК',
+    'АиМО, ЭВС, Связь',
+    'Ремонтная бригада',
+    'СЭУ',
+]
+
+
+def parse_departments_legacy(text):
+    """Прежний разбор: отдельный re.search на каждое упоминание, общие упоминания дважды"""
+    if not text:
+        return []
+
+    text = text.lower().strip()
+    departments = set()
+
+    kcs_patterns = {
+        'кс-1,4': ['КС-1,4'],
+        'кс-2,3': ['КС-2,3'],
+        'кс-5,6': ['КС-5,6'],
+        'кс-7,8': ['КС-7,8'],
+        'кс-9,10': ['КС-9,10'],
+    }
+    for pattern, kcs in kcs_patterns.items():
+        if re.search(r'\b' + re.escape(pattern) + r'\b', text):
+            departments.update(kcs)
+
+    general_patterns = {
+        'начальник гкс': ['ГКС'],
+        'начальники кс': ['КС-1,4', 'КС-2,3', 'КС-5,6', 'КС-7,8', 'КС-9,10'],
+        'начальник службы аимо': ['АиМО'],
+        'начальник службы эвс': ['ЭВС'],
+        'начальник службы лэс': ['ЛЭС'],
+        'начальник службы сзк': ['СЗК'],
+        'начальник службы связь': ['Связь'],
+        'начальник службы впо': ['ВПО'],
+        'инженер': ['ГКС'],
+        'эого': ['ГКС'],
+        'техдиагностик': ['ГКС'],
+        'аимо': ['АиМО'],
+        'эвс': ['ЭВС'],
+        'лэс': ['ЛЭС'],
+        'сзк': ['СЗК'],
+        'связь': ['Связь'],
+        'впо': ['ВПО'],
+    }
+    for pattern, depts in general_patterns.items():
+        if re.search(r'\b' + re.escape(pattern) + r'\b', text):
+            departments.update(depts)
+
+    if 'все типы гпа' in text and not departments:
+        departments.update(['КС-1,4', 'КС-2,3', 'КС-5,6', 'КС-7,8', 'КС-9,10', 'ГКС'])
+
+    has_specific_kcs = any(dept.startswith('КС-') for dept in departments)
+    has_general_kcs = any('начальники кс' in pattern for pattern in general_patterns
+                          if re.search(r'\b' + re.escape(pattern) + r'\b', text))
+    if not has_specific_kcs and not has_general_kcs:
+        if any(word in text for word in ['ремонт', 'инженер', 'эого', 'техдиагност', 'гкс']):
+            departments.add('ГКС')
+
+    return list(departments)
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает прежний и скомпилированный разбор столбца "Ответственные" (время на строку)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000,
+                            help='Количество разбираемых строк')
+        parser.add_argument('--distinct', type=int, default=500,
+                            help='Количество разных строк (повторы попадают в кэш разбора)')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rows, distinct = options['rows'], options['distinct']
+        generator = random.Random(options['seed'])
+        # Разные строки получаются сочетанием типичных значений и номера пункта
+        values = [f'{generator.choice(SAMPLES)}, {generator.choice(SAMPLES).lower()} (п. {number})'
+                  for number in range(distinct)]
+        texts = [generator.choice(values) for _ in range(rows)]
+
+        mismatches = [text for text in values
+                      if set(parse_departments(text)) != set(parse_departments_legacy(text))]
+        if mismatches:
+            self.stdout.write(self.style.WARNING(f'Расхождения с прежним разбором: {len(mismatches)}'))
+            for text in mismatches[:10]:
+                self.stdout.write(f'  {text}: {parse_departments_legacy(text)} -> {parse_departments(text)}')
+
+        _parse_departments.cache_clear()
+        for title, parse in (('прежний', parse_departments_legacy),
+                             ('скомпилированный', parse_departments)):
+            started = time.perf_counter()
+            for text in texts:
+                parse(text)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f'{title}: {rows} строк за {elapsed:.3f} с, {elapsed / rows * 1e6:.1f} мкс на строку'
+            ))
+
+        # Без кэша - каждая строка разбирается заново
+        started = time.perf_counter()
+        for text in texts:
+            _parse_departments.__wrapped__(text.lower().strip())
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'скомпилированный без кэша: {elapsed / rows * 1e6:.1f} мкс на строку'
+        ))
+        self.stdout.write(str(_parse_departments.cache_info()))
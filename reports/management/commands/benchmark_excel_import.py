@@ -0,0 +1,139 @@
+import os
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from openpyxl import Workbook, load_workbook
+
+from reports.excel_import import (RELIABILITY_COLUMNS, RELIABILITY_REQUIRED,
+                                  open_sheet_rows, open_workbook, read_table, reliability_document,
+                                  reliability_rows, select_sheets, parse_sheets_parallel)
+from reports.utils import find_header_row
+
+
+DEPARTMENTS = ['ЛЭС', 'СЗК', 'АВС', 'ЭВС', 'СЭУ', 'КИПиА']
+
+
+def generate_workbook(path, rows, sheets=1):
+    """План мероприятий: на каждом листе шапка документа, строка заголовков и rows строк"""
+    workbook = Workbook(write_only=True)
+    for sheet_number in range(1, sheets + 1):
+        sheet = workbook.create_sheet('План' if sheets == 1 else f'Квартал {sheet_number}')
+        sheet.append(['План мероприятий по повышению надежности'])
+        sheet.append([])
+        sheet.append(['№ п/п', 'Наименование/тип оборудования', 'Наименование мероприятия',
+                      'Сроки реализации', 'Ответственные', 'Примечание'])
+        for number in range(1, rows + 1):
+            sheet.append([
+                number,
+                f'Оборудование {number % 300}',
+                f'Мероприятие {sheet_number}-{number}',
+                f'{number % 28 + 1:02d}.{number % 12 + 1:02d}.2026',
+                ', '.join(DEPARTMENTS[number % len(DEPARTMENTS):][:2]),
+                'примечание' if number % 3 else None,
+            ])
+    workbook.save(path)
+
+
+def read_legacy(path):
+    """Прежний способ: книга целиком в памяти, обращение к ячейкам через sheet.cell"""
+    sheet = load_workbook(path, data_only=True).active
+    header_row = find_header_row(sheet)
+    headers = {}
+    for col in range(1, sheet.max_column + 1):
+        value = sheet.cell(row=header_row, column=col).value
+        if value:
+            text = str(value).lower().strip()
+            for field, patterns in RELIABILITY_COLUMNS:
+                if any(pattern in text for pattern in patterns):
+                    headers[field] = col
+                    break
+    count = 0
+    for row in range(header_row + 1, sheet.max_row + 1):
+        record = {field: sheet.cell(row=row, column=col).value for field, col in headers.items()}
+        if record['name'] and reliability_document(record) is not None:
+            count += 1
+    return count
+
+
+def read_streaming(path):
+    """Потоковое чтение read_only + iter_rows(values_only=True)"""
+    count = 0
+    with open_sheet_rows(path) as rows:
+        for _, record in read_table(rows, RELIABILITY_COLUMNS, RELIABILITY_REQUIRED):
+            if record['name'] and reliability_document(record) is not None:
+                count += 1
+    return count
+
+
+def read_sheets_sequential(path):
+    """Все листы по очереди в текущем процессе"""
+    with open_workbook(path) as workbook:
+        sheet_names = select_sheets(workbook)
+    count = 0
+    for name in sheet_names:
+        with open_sheet_rows(path, name) as rows:
+            count += sum(1 for _, document, _ in reliability_rows(rows) if document)
+    return count
+
+
+def read_sheets_parallel(path):
+    """Все листы параллельно в пуле процессов, строки приходят пачками (пик памяти - только текущего процесса)"""
+    with open_workbook(path) as workbook:
+        sheet_names = select_sheets(workbook)
+    return sum(sum(1 for _, document, _ in data if document)
+               for kind, _, data in parse_sheets_parallel(path, sheet_names) if kind == 'rows')
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает прежнее и потоковое чтение плана мероприятий из Excel (время и пик памяти), '
+            'для нескольких листов - последовательный и параллельный разбор')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=50000,
+                            help='Количество строк на листе в сгенерированном файле')
+        parser.add_argument('--sheets', type=int, default=1,
+                            help='Количество листов в сгенерированном файле')
+        parser.add_argument('--file', help='Готовый файл вместо сгенерированного')
+        parser.add_argument('--skip-legacy', action='store_true',
+                            help='Не запускать прежний способ чтения')
+
+    def handle(self, *args, **options):
+        path = options['file']
+        generated = path is None
+        if generated:
+            fd, path = tempfile.mkstemp(suffix='.xlsx')
+            os.close(fd)
+            started = time.perf_counter()
+            generate_workbook(path, options['rows'], options['sheets'])
+            self.stdout.write(f"Файл {options['sheets']} x {options['rows']} строк, "
+                              f'{os.path.getsize(path) // 1024} КБ '
+                              f'сгенерирован за {time.perf_counter() - started:.1f} с')
+
+        with open_workbook(path) as workbook:
+            several = len(select_sheets(workbook)) > 1
+        if several:
+            readers = [('листы последовательно', read_sheets_sequential),
+                       ('листы параллельно', read_sheets_parallel)]
+        else:
+            readers = [('потоковое', read_streaming)]
+            if not options['skip_legacy']:
+                readers.insert(0, ('прежнее', read_legacy))
+        try:
+            for title, reader in readers:
+                # Память процессов пула tracemalloc не видит, а замедление исказило бы сравнение времени
+                if not several:
+                    tracemalloc.start()
+                started = time.perf_counter()
+                count = reader(path)
+                elapsed = time.perf_counter() - started
+                message = f'{title}: {count} записей за {elapsed:.1f} с'
+                if not several:
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    message += f', пик памяти {peak / 2 ** 20:.1f} МБ'
+                self.stdout.write(self.style.SUCCESS(message))
+        finally:
+            if generated:
+                os.remove(path)
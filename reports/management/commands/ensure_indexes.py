@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from report_webapp.indexes import ensure_indexes
+
+
+class Command(BaseCommand):
+    help = 'Создает/обновляет индексы MongoDB по реестру report_webapp.indexes.INDEXES'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune', action='store_true',
+                            help='Удалять индексы, которых нет в реестре')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Только показать изменения, ничего не применять')
+
+    def handle(self, *args, **options):
+        results = ensure_indexes(prune=options['prune'], dry_run=options['dry_run'])
+
+        counts = {}
+        for collection, name, action in results:
+            counts[action] = counts.get(action, 0) + 1
+            style = self.style.SUCCESS if action == 'unchanged' else self.style.WARNING
+            self.stdout.write(style(f'{action:<10} {collection}.{name}'))
+
+        summary = ', '.join(f'{action}: {count}' for action, count in sorted(counts.items()))
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(f'{prefix}Итого: {summary or "нет индексов"}')
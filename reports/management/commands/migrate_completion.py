@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from report_webapp.utils import (protocols, orders, reliability,
+                                 protocols_archive, orders_archive, reliability_archive,
+                                 backfill_documents, bump_version)
+from reports.utils import completion_entries
+
+
+def set_completion(document):
+    """Массив completion из списка служб и словаря done документа"""
+    return {'$set': {'completion': completion_entries(document.get('departments') or [],
+                                                      document.get('done'))}}
+
+
+class Command(BaseCommand):
+    help = 'Заполняет массив completion по словарю done у протоколов, распоряжений и мероприятий'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Количество документов в одном bulk_write')
+        parser.add_argument('--all', action='store_true',
+                            help='Пересобрать completion и у документов, где он уже есть')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        query = {} if options['all'] else {'completion': {'$exists': False}}
+
+        sources = [('protocols', protocols), ('orders', orders), ('reliability', reliability),
+                   ('protocols', protocols_archive), ('orders', orders_archive),
+                   ('reliability', reliability_archive)]
+        changed = set()
+        for kind, collection in sources:
+            updated = backfill_documents(collection, query, {'departments': 1, 'done': 1},
+                                         set_completion, batch_size)
+            if updated:
+                changed.add(kind)
+            self.stdout.write(self.style.SUCCESS(f'{collection.name}: обновлено {updated}'))
+
+        # Списки изменились в обход представлений - клиенты должны получить новый ETag
+        if changed:
+            bump_version(*changed)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from reports.views import ITEM_COLLECTIONS
+from report_webapp.utils import move_documents, bump_version
+
+
+class Command(BaseCommand):
+    help = 'Переносит архивированные записи из основных коллекций в архивные'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Количество записей, переносимых за один раз')
+
+    def handle(self, *args, **options):
+        for kind, (collection, archive) in ITEM_COLLECTIONS.items():
+            moved = 0
+            while True:
+                ids = [item['_id'] for item in collection.find(
+                    {'archived': True}, {'_id': 1}).limit(options['batch_size'])]
+                if not ids:
+                    break
+                moved += len(move_documents(collection, archive, {'_id': {'$in': ids}}))
+            if moved:
+                bump_version(kind)
+            self.stdout.write(self.style.SUCCESS(f'{kind}: перенесено в архив {moved}'))
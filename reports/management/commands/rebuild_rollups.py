@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from reports.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает квартальные сводки показателей (rollups) из истории отчетов'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, help='Пересчитать только указанный год')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Размер пакета чтения отчетов и записи сводок')
+
+    def handle(self, *args, **options):
+        processed, written = rebuild_rollups(year=options['year'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано отчетов: {processed}, записано сводок: {written}'
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from report_webapp.jobs import WORKER_QUEUES, run_pending, start_workers, worker_loop
+
+
+class Command(BaseCommand):
+    help = 'Обрабатывает очередь фоновых задач (коллекция jobs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Обработать готовые задачи и завершиться')
+        parser.add_argument('--queue', choices=list(WORKER_QUEUES),
+                            help='Обрабатывать только указанную очередь (по умолчанию - все)')
+
+    def handle(self, *args, **options):
+        queue = options['queue']
+        if options['once']:
+            processed = run_pending(queue=queue)
+            self.stdout.write(self.style.SUCCESS(f'Обработано задач: {processed}'))
+            return
+
+        if queue:
+            self.stdout.write(f'Обработчик очереди задач {queue} запущен')
+            worker_loop(queue=queue)
+            return
+
+        # Каждая очередь - в своем потоке, чтобы импорт не задерживал остальные задачи
+        self.stdout.write('Обработчики очередей задач запущены: ' + ', '.join(WORKER_QUEUES))
+        for thread in start_workers():
+            thread.join()
@@ -0,0 +1,119 @@
+from datetime import datetime
+
+from pymongo import DeleteOne, ReplaceOne
+
+from report_webapp.utils import reports, rollups, increment_operations
+from reports.utils import REPORT_NUMERIC_FIELDS
+
+
+def report_quarter(date):
+    """Номер квартала (1-4) по дате"""
+    return (date.month - 1) // 3 + 1
+
+
+def report_metrics(report_data):
+    """Числовые показатели отчета в виде {поле: значение}"""
+    metrics = {}
+    for category_data in report_data.get('data', {}).values():
+        if not isinstance(category_data, dict):
+            continue
+        for field, value in category_data.items():
+            if field in REPORT_NUMERIC_FIELDS and isinstance(value, int):
+                metrics[field] = value
+    return metrics
+
+
+def rollup_increments(report_list, totals=None):
+    """Суммирует показатели отчетов по ключу (служба, год, квартал)"""
+    totals = {} if totals is None else totals
+    for report_data in report_list:
+        date = report_data['datetime']
+        key = (report_data['department'], date.year, report_quarter(date))
+        rollup = totals.setdefault(key, {'reports': {}, 'metrics': {}})
+        report_type = report_data.get('type')
+        rollup['reports'][report_type] = rollup['reports'].get(report_type, 0) + 1
+        for field, value in report_metrics(report_data).items():
+            rollup['metrics'][field] = rollup['metrics'].get(field, 0) + value
+    return totals
+
+
+def rollup_operations(report_list, applied_key=None):
+    """
+    Операции инкрементального обновления квартальных сводок по отчетам
+    в виде [(коллекция, [операции]), ...]; applied_key - см. increment_operations
+    """
+    now = datetime.now()
+    increments = []
+    for (department, year, quarter), rollup in rollup_increments(report_list).items():
+        counters = {f'reports.{report_type}': count for report_type, count in rollup['reports'].items()}
+        counters.update({f'metrics.{field}': value for field, value in rollup['metrics'].items()})
+        increments.append((
+            {'department': department, 'year': year, 'quarter': quarter},
+            {'$inc': counters, '$set': {'updated_at': now}}
+        ))
+    return increment_operations(rollups, increments, applied_key, upsert=True)
+
+
+def get_rollup(department, year):
+    """Сводка службы за год: показатели по кварталам и итог за год"""
+    quarters = {str(quarter): {'reports': {}, 'metrics': {}} for quarter in range(1, 5)}
+    year_total = {'reports': {}, 'metrics': {}}
+
+    for rollup in rollups.find({'department': department, 'year': year},
+                               {'_id': 0, 'quarter': 1, 'reports': 1, 'metrics': 1}):
+        quarters[str(rollup['quarter'])] = {
+            'reports': rollup.get('reports', {}),
+            'metrics': rollup.get('metrics', {})
+        }
+        for section in ('reports', 'metrics'):
+            for field, value in rollup.get(section, {}).items():
+                year_total[section][field] = year_total[section].get(field, 0) + value
+
+    return {'department': department, 'year': year, 'quarters': quarters, 'total': year_total}
+
+
+def rebuild_rollups(year=None, batch_size=1000):
+    """
+    Пересчитывает сводки из истории reports. Отчеты читаются курсором пакетами
+    по batch_size, в памяти хранятся только счетчики по (служба, год, квартал).
+    Возвращает (число обработанных отчетов, число записанных сводок).
+    """
+    query = {}
+    if year:
+        query['datetime'] = {'$gte': datetime(year, 1, 1), '$lt': datetime(year + 1, 1, 1)}
+
+    totals = {}
+    processed = 0
+    cursor = reports.find(query, {'_id': 0, 'department': 1, 'type': 1, 'datetime': 1, 'data': 1},
+                          batch_size=batch_size)
+    batch = []
+    for report in cursor:
+        batch.append(report)
+        if len(batch) >= batch_size:
+            rollup_increments(batch, totals)
+            processed += len(batch)
+            batch = []
+    rollup_increments(batch, totals)
+    processed += len(batch)
+
+    now = datetime.now()
+    requests = [
+        ReplaceOne(
+            {'department': department, 'year': rollup_year, 'quarter': quarter},
+            {'department': department, 'year': rollup_year, 'quarter': quarter,
+             'reports': rollup['reports'], 'metrics': rollup['metrics'], 'updated_at': now},
+            upsert=True
+        )
+        for (department, rollup_year, quarter), rollup in totals.items()
+    ]
+
+    # Удаляем сводки, для которых в истории больше нет отчетов
+    stale_query = {'year': year} if year else {}
+    existing_keys = set(totals)
+    for rollup in rollups.find(stale_query, {'department': 1, 'year': 1, 'quarter': 1}):
+        if (rollup['department'], rollup['year'], rollup['quarter']) not in existing_keys:
+            requests.append(DeleteOne({'_id': rollup['_id']}))
+
+    for start in range(0, len(requests), batch_size):
+        rollups.bulk_write(requests[start:start + batch_size], ordered=False)
+    return processed, len(totals)
@@ -0,0 +1,56 @@
+from report_webapp.utils import (protocols, orders, faults, reliability,
+                                 protocols_archive, orders_archive,
+                                 faults_archive, reliability_archive,
+                                 run_concurrently)
+
+
+# Источники поиска: тип -> (основная коллекция, архивная коллекция, поле службы)
+SEARCH_SOURCES = {
+    'protocols': (protocols, protocols_archive, 'departments'),
+    'orders': (orders, orders_archive, 'departments'),
+    'faults': (faults, faults_archive, 'department'),
+    'reliability': (reliability, reliability_archive, 'departments'),
+}
+SEARCH_PAGE_SIZE = 20
+SEARCH_PAGE_MAX = 100
+
+
+def search_source(collection, query, limit):
+    """Лучшие по релевантности документы одной коллекции"""
+    score = {'$meta': 'textScore'}
+    return list(
+        collection.find(query, {'score': score, 'completion': 0})
+        .sort([('score', score)])
+        .limit(limit)
+    )
+
+
+def search_items(text, include_archived=False, department=None, kinds=None, offset=0, page_size=SEARCH_PAGE_SIZE):
+    """
+    Полнотекстовый поиск по протоколам, распоряжениям, замечаниям и мероприятиям.
+    Коллекции опрашиваются параллельно, результаты сливаются по textScore.
+    Возвращает (записи страницы с полями kind, archived и score, есть ли продолжение)
+    """
+    # Каждая коллекция отдает не больше, чем нужно для этой страницы общего списка
+    limit = offset + page_size + 1
+    queries = {}
+    for kind, (collection, archive, department_field) in SEARCH_SOURCES.items():
+        if kinds and kind not in kinds:
+            continue
+        query = {'$text': {'$search': text, '$language': 'russian'}}
+        if department:
+            query[department_field] = department
+        queries[kind] = (lambda collection=collection, query=query: search_source(collection, query, limit))
+        if include_archived:
+            queries[f'{kind}:archived'] = (lambda archive=archive, query=query: search_source(archive, query, limit))
+
+    merged = []
+    for name, documents in run_concurrently(**queries).items():
+        kind, _, archived = name.partition(':')
+        for document in documents:
+            document['kind'] = kind
+            document['archived'] = bool(archived)
+            merged.append(document)
+
+    merged.sort(key=lambda document: document['score'], reverse=True)
+    return merged[offset:offset + page_size], len(merged) > offset + page_size
@@ -0,0 +1,61 @@
+import os
+
+from django.conf import settings
+
+from report_webapp.jobs import job_handler, report_progress, current_job_id
+from report_webapp.utils import reports, protocols, run_in_transaction, bulk_write_all
+
+
+@job_handler('report_side_effects')
+def apply_report_side_effects(payload):
+    """
+    Обновление связанных коллекций по сохраненным отчетам и отметка протоколов.
+    payload: {'report_ids': [...], 'protocols': [{'service', 'ids', 'done_date'}, ...]}
+    """
+    from reports.views import (related_collection_operations, protocol_done_operations,
+                               invalidate_dashboards, item_changed)
+
+    # Приращения помечаются _id задачи: при повторе после частичного сбоя
+    # (без транзакций) или перехвата зависшей задачи уже примененные пропускаются
+    report_list = list(reports.find({'_id': {'$in': payload['report_ids']}}))
+    operations = related_collection_operations(report_list, current_job_id()) if report_list else []
+    protocol_updates = [
+        operation
+        for item in payload.get('protocols', []) if item['ids']
+        for operation in protocol_done_operations(item['service'], item['ids'], item['done_date'])
+    ]
+    if protocol_updates:
+        operations.append((protocols, protocol_updates))
+
+    # В транзакции (если поддерживается) приращения одной задачи применяются атомарно
+    run_in_transaction(lambda session: bulk_write_all(operations, session=session))
+    for item in payload.get('protocols', []):
+        if item['ids']:
+            item_changed('protocols', 'done', item['ids'], {'done': {item['service']: item['done_date']}})
+    invalidate_dashboards(report_list)
+
+
+@job_handler('excel_import')
+def run_excel_import(payload):
+    """
+    Импорт сохраненного файла Excel с отчетом о ходе выполнения.
+    payload: {'kind': тип записей, 'path': путь к файлу, 'filename': исходное имя файла,
+              'sheets': имена листов или None - все листы}
+    """
+    from reports.excel_import import IMPORTERS, import_counts
+
+    def progress(row, total, result):
+        report_progress({
+            'row': row,
+            'total': total,
+            'counts': import_counts(result),
+            'errors': result['rejected'][:settings.IMPORT_ERRORS_SHOWN],
+        })
+
+    try:
+        result = IMPORTERS[payload['kind']](payload['path'], progress, payload.get('sheets'))
+    finally:
+        # Повторять импорт не нужно: задача ставится с одной попыткой, файл больше не понадобится
+        if os.path.exists(payload['path']):
+            os.remove(payload['path'])
+    return {'counts': import_counts(result), 'rows': result}
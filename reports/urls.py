@@ -6,11 +6,23 @@ urlpatterns = [
     path('view/', views.view_data, name='view_data'),
     path('api/reports/', views.handle_report, name='handle_report'),
     path('api/reports/get/', views.get_reports, name='get_reports'),
+    path('api/reports/bulk/', views.bulk_reports, name='bulk_reports'),
+    path('api/reports/export/', views.export_reports, name='export_reports'),
     path('api/planning/', views.handle_planning, name='handle_planning'),
     path('api/plans/', views.get_plans, name='get_plans'),
     path('api/leaks/', views.get_leaks, name='get_leaks'),
     path('api/kss/', views.get_kss, name='get_kss'),
     path('api/remarks/', views.get_remarks, name='get_remarks'),
+    path('api/rollups/', views.get_rollups, name='get_rollups'),
+    path('api/dashboard/', views.get_dashboard, name='get_dashboard'),
+    path('api/analytics/trends/', views.get_analytics_trends, name='analytics_trends'),
+    path('api/jobs/stats/', views.get_jobs_stats, name='jobs_stats'),
+    path('api/events/', views.events_stream, name='events_stream'),
+    path('api/pending/', views.get_pending, name='pending'),
+    path('api/overdue/', views.get_overdue, name='overdue'),
+    path('api/search/', views.search, name='search'),
+    path('api/import/<str:kind>/', views.upload_excel, name='upload_excel'),
+    path('api/import-jobs/<str:job_id>/', views.get_import_job, name='import_job'),
     path('api/protocols/', views.handle_protocols, name='protocols'),
     path('api/protocols/<str:protocol_id>/archive/', views.archive_protocol, name='archive_protocol'),
     path('api/protocols/<str:protocol_id>/done/', views.mark_protocol_done, name='mark_protocol_done'),
@@ -18,6 +30,7 @@ urlpatterns = [
     path('api/orders/<str:order_id>/archive/', views.archive_order, name='archive_order'),
     path('api/orders/<str:order_id>/done/', views.mark_order_done, name='mark_order_done'),
     path('api/faults/', views.handle_faults, name='faults'),
+    path('api/faults/stats/', views.get_faults_stats, name='faults_stats'),
     path('api/faults/<str:fault_id>/archive/', views.archive_fault, name='archive_fault'),
     path('api/faults/<str:fault_id>/done/', views.mark_fault_done, name='mark_fault_done'),
     path("api/authenticate/", views.authenticate_view),
@@ -26,4 +39,8 @@ urlpatterns = [
     path('api/reliability/<str:item_id>/archive/', views.archive_reliability, name='archive_reliability'),
     path('api/reliability/<str:item_id>/done/', views.mark_reliability_done, name='mark_reliability_done'),
     path('api/reliability/upload-excel/', views.upload_reliability_excel, name='upload_reliability_excel'),
+    path('api/archive/<str:kind>/', views.browse_archive, name='browse_archive'),
+    path('api/archive/<str:kind>/<str:item_id>/restore/', views.restore_from_archive, name='restore_from_archive'),
+    path('api/items/bulk/done/', views.bulk_mark_done, name='bulk_mark_done'),
+    path('api/items/bulk/archive/', views.bulk_archive, name='bulk_archive'),
 ]
@@ -1,8 +1,42 @@
+import base64
+import binascii
+import hashlib
+import itertools
+import json
 import random
 import string
-from pymongo import MongoClient
-from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from pymongo import MongoClient, UpdateOne, UpdateMany
+from datetime import datetime, timedelta
 import re
+from functools import lru_cache, wraps
+from zoneinfo import ZoneInfo
+
+from report_webapp.utils import get_version, bump_version
+
+
+# Группировка полей отчета по категориям
+REPORT_CATEGORIES = {
+    'apk': ['apk_total', 'apk_done', 'apk_undone', 'apk_reason_undone'],
+    'apk2': ['apk2_total', 'apk2_done', 'apk2_undone', 'apk2_reason_undone'],
+    'leak': ['leak_total', 'leak_done'],
+    'apk4': ['apk4_done', 'apk4_undone', 'apk4_reason_undone'],
+    'ozp': ['ozp_done', 'ozp_undone', 'ozp_reason_undone'],
+    'gaz': ['gaz_done', 'gaz_undone', 'gaz_reason_undone'],
+    'ros': ['ros_done', 'ros_undone', 'ros_reason_undone'],
+    'rp': ['rp_done', 'rp_inwork'],
+    'pat': ['pat_done'],
+    'tu': ['tu_done'],
+    'kss': ['kss_done']
+}
+
+# Числовые поля отчета (все, кроме причин неустранения)
+REPORT_NUMERIC_FIELDS = [field for fields in REPORT_CATEGORIES.values()
+                         for field in fields if 'reason' not in field]
 
 
 def generate_password(length=6):
@@ -46,109 +80,150 @@ def get_user_passwords_sms_text():
     return sms_text
 
 
+ALL_KCS = ['КС-1,4', 'КС-2,3', 'КС-5,6', 'КС-7,8', 'КС-9,10']
+
+# Упоминания служб в столбце "Ответственные" (в нижнем регистре, целыми словами) -> службы
+DEPARTMENT_ALIASES = {
+    # Конкретные КС
+    'кс-1,4': ['КС-1,4'],
+    'кс-2,3': ['КС-2,3'],
+    'кс-5,6': ['КС-5,6'],
+    'кс-7,8': ['КС-7,8'],
+    'кс-9,10': ['КС-9,10'],
+    # Общие упоминания служб
+    'начальник гкс': ['ГКС'],
+    'начальники кс': ALL_KCS,
+    'начальник службы аимо': ['АиМО'],
+    'начальник службы эвс': ['ЭВС'],
+    'начальник службы лэс': ['ЛЭС'],
+    'начальник службы сзк': ['СЗК'],
+    'начальник службы связь': ['Связь'],
+    'начальник службы впо': ['ВПО'],
+    'инженер': ['ГКС'],
+    'эого': ['ГКС'],
+    'техдиагностик': ['ГКС'],
+    'аимо': ['АиМО'],
+    'эвс': ['ЭВС'],
+    'лэс': ['ЛЭС'],
+    'сзк': ['СЗК'],
+    'связь': ['Связь'],
+    'впо': ['ВПО'],
+}
+# Слова (частью слова), по которым ответственным считается ГКС, если КС не упомянуты
+GKS_WORDS = ['ремонт', 'инженер', 'эого', 'техдиагност', 'гкс']
+
+# Все упоминания одним выражением. Поиск внутри просмотра вперед находит совпадения,
+# начинающиеся в каждой позиции, - в том числе вложенные друг в друга, как и отдельный
+# re.search на каждое упоминание. Длинные варианты идут первыми
+DEPARTMENT_PATTERN = re.compile(
+    r'(?=\b(' + '|'.join(re.escape(alias) for alias in sorted(DEPARTMENT_ALIASES, key=len, reverse=True))
+    + r')\b)'
+)
+GKS_WORDS_PATTERN = re.compile('|'.join(re.escape(word) for word in GKS_WORDS))
+# Порядок служб в результате
+DEPARTMENT_ORDER = {department: index for index, department in enumerate(
+    dict.fromkeys(department for departments in DEPARTMENT_ALIASES.values() for department in departments)
+)}
+# Строки "Ответственные" в планах часто повторяются - разбор запоминается
+PARSE_DEPARTMENTS_CACHE_SIZE = 4096
+
+
 def parse_departments(text):
     """Парсит текст с ответственными службами и возвращает список конкретных служб"""
     if not text:
         return []
+    return list(_parse_departments(text.lower().strip()))
 
-    text = text.lower().strip()
-    departments = set()
 
-    # Сначала ищем конкретные упоминания отдельных КС
-    kcs_patterns = {
-        'кс-1,4': ['КС-1,4'],
-        'кс-2,3': ['КС-2,3'],
-        'кс-5,6': ['КС-5,6'],
-        'кс-7,8': ['КС-7,8'],
-        'кс-9,10': ['КС-9,10'],
-    }
-
-    for pattern, kcs in kcs_patterns.items():
-        if re.search(r'\b' + re.escape(pattern) + r'\b', text):
-            departments.update(kcs)
-
-    # Ищем общие упоминания служб
-    general_patterns = {
-        'начальник гкс': ['ГКС'],
-        'начальники кс': ['КС-1,4', 'КС-2,3', 'КС-5,6', 'КС-7,8', 'КС-9,10'],
-        'начальник службы аимо': ['АиМО'],
-        'начальник службы эвс': ['ЭВС'],
-        'начальник службы лэс': ['ЛЭС'],
-        'начальник службы сзк': ['СЗК'],
-        'начальник службы связь': ['Связь'],
-        'начальник службы впо': ['ВПО'],
-        'инженер': ['ГКС'],
-        'эого': ['ГКС'],
-        'техдиагностик': ['ГКС'],
-        'аимо': ['АиМО'],
-        'эвс': ['ЭВС'],
-        'лэс': ['ЛЭС'],
-        'сзк': ['СЗК'],
-        'связь': ['Связь'],
-        'впо': ['ВПО'],
-    }
-
-    for pattern, depts in general_patterns.items():
-        if re.search(r'\b' + re.escape(pattern) + r'\b', text):
-            departments.update(depts)
+@lru_cache(maxsize=PARSE_DEPARTMENTS_CACHE_SIZE)
+def _parse_departments(text):
+    departments = set()
+    for alias in DEPARTMENT_PATTERN.findall(text):
+        departments.update(DEPARTMENT_ALIASES[alias])
 
     # Обработка сложных случаев
     if 'все типы гпа' in text and not departments:
-        departments.update(['КС-1,4', 'КС-2,3', 'КС-5,6', 'КС-7,8', 'КС-9,10', 'ГКС'])
-
-    # Если нашли конкретные КС, но нет общих "начальники кс", то не добавляем все КС
-    has_specific_kcs = any(dept.startswith('КС-') for dept in departments)
-    has_general_kcs = any('начальники кс' in pattern for pattern in general_patterns if re.search(r'\b' + re.escape(pattern) + r'\b', text))
-
-    if not has_specific_kcs and not has_general_kcs:
-        # Если не нашли никаких КС, но есть упоминание ремонта или инженеров - добавляем ГКС
-        if any(word in text for word in ['ремонт', 'инженер', 'эого', 'техдиагност', 'гкс']):
-            departments.add('ГКС')
-
-    return list(departments)
+        departments.update(ALL_KCS + ['ГКС'])
+
+    # Если не нашли никаких КС (в том числе "начальники кс"), но есть упоминание
+    # ремонта или инженеров - добавляем ГКС
+    has_kcs = any(dept.startswith('КС-') for dept in departments)
+    if not has_kcs and GKS_WORDS_PATTERN.search(text):
+        departments.add('ГКС')
+
+    return tuple(sorted(departments, key=DEPARTMENT_ORDER.__getitem__))
+
+
+# Ключевые слова заголовков таблиц в файлах импорта
+HEADER_KEYWORDS = [
+    'наименование мероприятия',
+    'сроки реализации',
+    'ответственные',
+    'примечание',
+    'оборудование',
+    '№ п/п'
+]
+
+
+def find_header(rows, keywords=HEADER_KEYWORDS, min_matches=2, scan_limit=20):
+    """
+    Однопроходный поиск строки заголовков в потоке строк (кортежей значений ячеек).
+    Заголовок - первая из scan_limit строк, где не меньше min_matches ячеек содержат
+    ключевые слова; иначе - первая непустая строка, которая не начинается с номера.
+    Возвращает (номер строки с 1, значения заголовка, итератор строк после заголовка)
+    или (None, None, None), если заголовок не найден
+    """
+    def keyword_count(values):
+        return sum(1 for value in values
+                   if value and any(keyword in str(value).lower() for keyword in keywords))
+
+    def is_fallback(values):
+        # Непустая строка, первая ячейка которой - не просто номер строки
+        first = values[0] if values else None
+        return bool(first) and str(first).strip() != '' and not str(first).strip().isdigit()
+
+    rows = iter(rows)
+    # Строки окна поиска храним, только пока заголовок не найден (не больше scan_limit)
+    scanned = []
+    fallback = None
+    number = 0
+    for values in rows:
+        number += 1
+        if keyword_count(values) >= min_matches:
+            return number, values, rows
+        if fallback is None and is_fallback(values):
+            fallback = number
+        scanned.append(values)
+        if number >= scan_limit:
+            break
+
+    if fallback is not None:
+        return fallback, scanned[fallback - 1], itertools.chain(scanned[fallback:], rows)
+
+    # В окне нет ни заголовка, ни данных - берем первую строку с данными дальше по файлу
+    for values in rows:
+        number += 1
+        if is_fallback(values):
+            return number, values, rows
+    return None, None, None
 
 
 def find_header_row(sheet):
     """Находит строку с заголовками таблицы"""
-    header_keywords = [
-        'наименование мероприятия',
-        'сроки реализации',
-        'ответственные',
-        'примечание',
-        'оборудование',
-        '№ п/п'
-    ]
+    number, _, _ = find_header(sheet.iter_rows(values_only=True))
+    return number
 
-    # Ищем строку, содержащую несколько ключевых слов
-    for row in range(1, min(20, sheet.max_row + 1)):  # Проверяем первые 20 строк
-        keyword_count = 0
-        for col in range(1, sheet.max_column + 1):
-            cell_value = sheet.cell(row=row, column=col).value
-            if cell_value:
-                cell_text = str(cell_value).lower()
-                if any(keyword in cell_text for keyword in header_keywords):
-                    keyword_count += 1
-
-        # Если нашли достаточно ключевых слов, считаем это строкой заголовков
-        if keyword_count >= 2:
-            return row
-
-    # Альтернативный поиск: ищем первую непустую строку с данными
-    for row in range(1, sheet.max_row + 1):
-        has_data = False
-        for col in range(1, sheet.max_column + 1):
-            cell_value = sheet.cell(row=row, column=col).value
-            if cell_value and str(cell_value).strip():
-                has_data = True
-                break
-
-        if has_data:
-            # Проверяем, что это не просто номер строки
-            first_cell = sheet.cell(row=row, column=1).value
-            if first_cell and not str(first_cell).strip().isdigit():
-                return row
-
-    return None
+
+# Форматы дат в сроках и файлах импорта
+DATE_FORMATS = [
+    '%Y-%m-%d',      # 2024-12-31
+    '%d.%m.%Y',      # 31.12.2024
+    '%d/%m/%Y',      # 31/12/2024
+    '%d-%m-%Y',      # 31-12-2024
+    '%Y.%m.%d',      # 2024.12.31
+]
+# Дата внутри текста срока: "до 31.12.2024", "с 01.01.2025 по 31.03.2025"
+DATE_IN_TEXT = re.compile(r'(?<!\d)(\d{1,2})\.(\d{1,2})\.(\d{4})(?!\d)')
 
 
 def parse_date_to_dmy(value):
@@ -165,15 +240,7 @@ def parse_date_to_dmy(value):
         value = value.strip()
 
         # Пробуем разные форматы дат
-        date_formats = [
-            '%Y-%m-%d',      # 2024-12-31
-            '%d.%m.%Y',      # 31.12.2024
-            '%d/%m/%Y',      # 31/12/2024
-            '%d-%m-%Y',      # 31-12-2024
-            '%Y.%m.%d',      # 2024.12.31
-        ]
-
-        for date_format in date_formats:
+        for date_format in DATE_FORMATS:
             try:
                 date_obj = datetime.strptime(value, date_format)
                 return date_obj.strftime('%d.%m.%Y')
@@ -182,3 +249,256 @@ def parse_date_to_dmy(value):
 
     # Если не удалось распарсить как дату, возвращаем как есть (для периодичности типа "Постоянно")
     return str(value)
+
+
+def parse_client_datetime(value):
+    """
+    Время из запроса клиента (ISO, в том числе с Z) в виде, в котором хранятся даты в базе:
+    наивное местное время TIME_ZONE, как у datetime.now()
+    """
+    value = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if value.tzinfo is not None:
+        value = value.astimezone(ZoneInfo(settings.TIME_ZONE)).replace(tzinfo=None)
+    return value
+
+
+def parse_deadline(value):
+    """
+    Срок исполнения в виде datetime для сортировки и выборок по диапазону.
+    Понимает те же форматы, что parse_date_to_dmy, и дату внутри текста (берется последняя).
+    Для периодических сроков ("Постоянно", "Ежеквартально") возвращает None
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+
+    value = str(value).strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+
+    dates = []
+    for day, month, year in DATE_IN_TEXT.findall(value):
+        try:
+            dates.append(datetime(int(year), int(month), int(day)))
+        except ValueError:
+            continue
+    return max(dates) if dates else None
+
+
+def reliability_key(name, date):
+    """
+    Ключ уникальности мероприятия по надежности: наименование и срок без учета
+    регистра, ё/е, лишних пробелов и точки в конце
+    """
+    def normalize(value):
+        value = ' '.join(str(value or '').lower().replace('ё', 'е').split())
+        return value.rstrip('.')
+    return f'{normalize(name)}|{normalize(date)}'
+
+
+class InvalidQueryParam(ValueError):
+    """Некорректный параметр запроса списка (курсор, размер страницы, дата) - ответ 400"""
+
+
+def encode_cursor(value, object_id):
+    """Формирует непрозрачный курсор keyset-пагинации по паре (значение сортировки, _id)"""
+    if isinstance(value, datetime):
+        value = ['dt', value.isoformat()]
+    else:
+        value = ['v', value]
+    raw = json.dumps([value, str(object_id)], ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Разбирает курсор пагинации, возвращает (значение сортировки, ObjectId).
+    Для поврежденного курсора - InvalidQueryParam
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        (kind, value), object_id = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if kind == 'dt':
+            value = datetime.fromisoformat(value)
+        return value, ObjectId(object_id)
+    except (ValueError, TypeError, binascii.Error, InvalidId) as e:
+        raise InvalidQueryParam('Некорректный курсор пагинации') from e
+
+
+def keyset_filter(field, value, object_id, direction):
+    """
+    Условие выборки документов после курсора при сортировке [(field, direction), (_id, direction)].
+    Учитывает документы без значения поля: в MongoDB они идут первыми при сортировке по возрастанию
+    """
+    op = '$lt' if direction == -1 else '$gt'
+    if value is None:
+        if direction == -1:
+            return {field: None, '_id': {op: object_id}}
+        return {'$or': [{field: {'$ne': None}}, {field: None, '_id': {op: object_id}}]}
+    conditions = [{field: {op: value}}, {field: value, '_id': {op: object_id}}]
+    if direction == -1:
+        conditions.append({field: None})
+    return {'$or': conditions}
+
+
+def paginate(collection, query, projection, sort_field, direction, cursor=None, page_size=None):
+    """
+    Keyset-пагинация: возвращает (документы, курсор следующей страницы, есть ли продолжение).
+    Без page_size возвращает всю выборку
+    """
+    if cursor:
+        value, object_id = decode_cursor(cursor)
+        query = {'$and': [query, keyset_filter(sort_field, value, object_id, direction)]}
+
+    # Поле сортировки нужно для курсора; пустая проекция означает документ целиком,
+    # проекция-исключение поле сортировки и так оставляет
+    if projection:
+        if any(projection.values()):
+            projection = dict(projection, **{sort_field: 1})
+    else:
+        projection = None
+    items = collection.find(query, projection).sort([(sort_field, direction), ('_id', direction)])
+    if not page_size:
+        return list(items), None, False
+
+    items = list(items.limit(page_size + 1))
+    has_more = len(items) > page_size
+    items = items[:page_size]
+    next_cursor = encode_cursor(items[-1].get(sort_field), items[-1]['_id']) if has_more else None
+    return items, next_cursor, has_more
+
+
+def completion_entries(departments, done=None):
+    """
+    Отметки выполнения в индексируемом виде: [{'department', 'done_at'}] по каждой
+    назначенной службе, done_at=None - служба еще не выполнила.
+    Хранится рядом со словарем done, который остается для отображения
+    """
+    done = done or {}
+    return [{'department': department, 'done_at': done.get(department)} for department in departments]
+
+
+def mark_done_operations(query, service, done_date, many=False):
+    """
+    Операции отметки выполнения службой: в словаре done и в массиве completion.
+    Массив обновляется отдельной операцией только там, где он есть: у документа без
+    completion (до migrate_completion) $[entry] вызвал бы ошибку и отметка не записалась бы
+    """
+    operation = UpdateMany if many else UpdateOne
+    return [
+        operation(query, {'$set': {f'done.{service}': done_date}}),
+        operation({**query, 'completion': {'$exists': True}},
+                  {'$set': {'completion.$[entry].done_at': done_date}},
+                  array_filters=[{'entry.department': service}]),
+    ]
+
+
+def list_filters(params, date_field, department_field, done_field):
+    """
+    Фильтры списков мероприятий из параметров запроса:
+    department, done (done/not_done), date_from, date_to (ГГГГ-ММ-ДД).
+    Для faults done_field='is_done', для остальных выполнение проверяется по completion
+    """
+    query = {}
+    department = params.get('department')
+    if department:
+        query[department_field] = department
+
+    done = params.get('done')
+    if done in ('done', 'not_done'):
+        if done_field == 'is_done':
+            query['is_done'] = done == 'done'
+        elif department:
+            # Отметка службы в массиве completion - запрос идет по мультиключевому индексу
+            done_at = None if done == 'not_done' else {'$ne': None}
+            query['completion'] = {'$elemMatch': {'department': department, 'done_at': done_at}}
+        else:
+            # Выполнено всеми службами: в completion нет ни одной невыполненной отметки
+            pending = {'$elemMatch': {'done_at': None}}
+            query['completion'] = pending if done == 'not_done' else {'$not': pending}
+
+    date_range = {}
+    try:
+        if params.get('date_from'):
+            date_range['$gte'] = datetime.strptime(params['date_from'], '%Y-%m-%d')
+        if params.get('date_to'):
+            date_range['$lt'] = datetime.strptime(params['date_to'], '%Y-%m-%d') + timedelta(days=1)
+    except ValueError as e:
+        raise InvalidQueryParam('Некорректная дата, ожидается ГГГГ-ММ-ДД') from e
+    if date_range:
+        query[date_field] = date_range
+    return query
+
+
+def page_size_param(params, maximum=200):
+    """Размер страницы из параметра page_size (None - без пагинации)"""
+    if not params.get('page_size'):
+        return None
+    try:
+        page_size = int(params['page_size'])
+    except ValueError as e:
+        raise InvalidQueryParam('Некорректный размер страницы') from e
+    return max(1, min(page_size, maximum))
+
+
+def encode_report_cursor(report):
+    """Формирует курсор пагинации по паре (datetime, _id) отчета"""
+    return encode_cursor(report['datetime'], report['_id'])
+
+
+def decode_report_cursor(cursor):
+    """Разбирает курсор пагинации отчетов, возвращает (datetime, ObjectId)"""
+    return decode_cursor(cursor)
+
+
+def report_count_cache_key(service, report_type=None):
+    """
+    Ключ кэша для количества отчетов службы. Содержит версию отчетов службы: кэш у каждого
+    процесса свой, а версия в базе общая - запись в любом процессе сбрасывает кэш во всех
+    """
+    version = get_version(f'reports:{service}')['version']
+    return f'reports_count:{service}:{report_type or "all"}:{version}'
+
+
+def invalidate_report_counts(services):
+    """Сбрасывает кэш количества отчетов служб"""
+    bump_version(*{f'reports:{service}' for service in services})
+
+
+def conditional_list(name=None):
+    """
+    Условный GET для списков: ETag и Last-Modified строятся по версии списка
+    (одно чтение документа версии), при совпадении отдается 304 без запроса данных.
+    Без name имя списка берется из аргумента kind представления
+    """
+    def list_version(request, kwargs):
+        # Версию читаем один раз на запрос - она нужна и для ETag, и для Last-Modified
+        if not hasattr(request, '_list_version'):
+            request._list_version = get_version(name or kwargs['kind'])
+        return request._list_version
+
+    def etag(request, *args, **kwargs):
+        version = list_version(request, kwargs)
+        # Фильтры и курсор входят в ETag: разные выборки одного списка - разные ответы
+        query = hashlib.md5(request.get_full_path().encode()).hexdigest()[:16]
+        return f"{version['_id']}-{version['version']}-{query}"
+
+    def last_modified(request, *args, **kwargs):
+        return list_version(request, kwargs)['updated_at']
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                # Браузер хранит ответ, но каждый раз сверяет его с сервером
+                patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
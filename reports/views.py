@@ -1,38 +1,72 @@
+import csv
 import json
+import tempfile
 from bson import ObjectId
-from datetime import datetime
-from django.http import JsonResponse, HttpResponseBadRequest
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (JsonResponse, HttpResponseBadRequest,
+                         StreamingHttpResponse, FileResponse)
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import render
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from report_webapp.jobs import enqueue, notify_worker, queue_stats
+from report_webapp.events import broadcaster, publish_change, RESET
 from report_webapp.utils import (reports, plans, kss, remarks,
                                  leaks, protocols, orders, authenticate_user,
-                                 users, faults, reliability)
+                                 users, faults, reliability,
+                                 protocols_archive, orders_archive,
+                                 faults_archive, reliability_archive,
+                                 run_in_transaction, bulk_write_all, increment_operations,
+                                 run_concurrently, move_documents,
+                                 bump_version, get_version, jobs)
 from django.http import JsonResponse
-from openpyxl import load_workbook
+from openpyxl import Workbook
 from openpyxl.utils import get_column_letter
 
-from reports.utils import parse_date_to_dmy, parse_departments
-
-
-# Добавим mapping для преобразования названий служб
-DEPARTMENT_MAPPING = {
-    'начальник гкс': ['ГКС'],
-    'начальники кс': ['КС-1,4', 'КС-2,3', 'КС-5,6', 'КС-7,8', 'КС-9,10'],
-    'начальник кс-1,4': ['КС-1,4'],
-    'начальник кс-2,3': ['КС-2,3'],
-    'начальник кс-5,6': ['КС-5,6'],
-    'начальник кс-7,8': ['КС-7,8'],
-    'начальник кс-9,10': ['КС-9,10'],
-    'начальник службы аимо': ['АиМО'],
-    'начальник службы эвс': ['ЭВС'],
-    'начальник службы лэс': ['ЛЭС'],
-    'начальник службы сзк': ['СЗК'],
-    'начальник службы связь': ['Связь'],
-    'начальник службы впо': ['ВПО'],
-    'инженера по ремонту': ['ГКС'],
-    'инженер эого (техдиагностика)': ['ГКС'],
-    'инженер по ремонту': ['ГКС'],
-}
+from reports.search import search_items, SEARCH_PAGE_SIZE, SEARCH_PAGE_MAX
+from reports.analytics import (TREND_UNITS, METRIC_PATHS, get_trends, get_fault_stats,
+                               invalidate_trends, format_bucket)
+from reports.rollups import rollup_operations, get_rollup
+from reports.excel_import import IMPORTERS, DUPLICATE_KEY_ERROR, save_upload, existing_reliability_keys
+from reports.utils import (REPORT_CATEGORIES, paginate, list_filters, page_size_param,
+                           InvalidQueryParam, encode_report_cursor, decode_report_cursor,
+                           report_count_cache_key, invalidate_report_counts, conditional_list,
+                           completion_entries, mark_done_operations, parse_deadline,
+                           reliability_key, parse_client_datetime)
+
+
+# Службы, подающие отчеты
+SERVICES = [
+    'КС-1,4', 'КС-2,3', 'КС-5,6', 'КС-7,8', 'КС-9,10',
+    'ГКС', 'АиМО', 'ЭВС', 'ЛЭС', 'СЗК', 'Связь', 'ВПО'
+]
+
+# Максимальный размер окна предзагрузки отчетов за один запрос
+REPORTS_PAGE_MAX = 50
+# Время жизни кэшированного количества отчетов (секунды)
+REPORTS_COUNT_CACHE_TIMEOUT = 600
+# Максимальное количество отчетов в одной пакетной загрузке
+BULK_REPORTS_MAX = 5000
+# Размер пакета серверного курсора при выгрузке отчетов
+EXPORT_BATCH_SIZE = 500
+# Время жизни кэша сводных данных службы (секунды)
+DASHBOARD_CACHE_TIMEOUT = 300
+# Размер страницы архива по умолчанию
+ARCHIVE_PAGE_SIZE = 50
+# Записей каждого типа на странице списка просроченных
+OVERDUE_PAGE_SIZE = 50
+# Записей каждого типа на странице списка невыполненных
+PENDING_PAGE_SIZE = 50
+# Максимум записей в одном групповом запросе отметки выполнения или архивирования
+BULK_ITEMS_MAX = 500
+# Сколько номеров отклоненных строк показывать в сообщении об импорте
+IMPORT_REJECTED_SHOWN = 10
+# Показатели динамики по умолчанию
+DEFAULT_TREND_METRICS = ['apk_total', 'apk_done', 'apk2_total', 'apk2_done', 'leak_total', 'leak_done',
+                         'ozp_done', 'gaz_done', 'ros_done', 'apk4_done']
 
 
 # Словарь для преобразования технических имен в читаемые
@@ -82,85 +116,87 @@ FIELD_NAMES_MAPPING = {
 }
 
 
-@csrf_exempt
-def handle_report(request):
-    if request.method == 'POST':
-        try:
-            data = json.loads(request.body)
-            current_year = datetime.now().year
-            service = data.get('service')
-
-            # Подготовка данных для сохранения
-            report_data = {
-                'department': service,
-                'type': data.get('type'),
-                'datetime': datetime.now(),
-                'data': {}
-            }
-
-            # Удаляем служебные поля
-            data.pop('service', None)
-            data.pop('type', None)
-
-            # Группируем данные по категориям
-            categories = {
-                'apk': ['apk_total', 'apk_done', 'apk_undone', 'apk_reason_undone'],
-                'apk2': ['apk2_total', 'apk2_done', 'apk2_undone', 'apk2_reason_undone'],
-                'leak': ['leak_total', 'leak_done'],
-                'apk4': ['apk4_done', 'apk4_undone', 'apk4_reason_undone'],
-                'ozp': ['ozp_done', 'ozp_undone', 'ozp_reason_undone'],
-                'gaz': ['gaz_done', 'gaz_undone', 'gaz_reason_undone'],
-                'ros': ['ros_done', 'ros_undone', 'ros_reason_undone'],
-                'rp': ['rp_done', 'rp_inwork'],
-                'pat': ['pat_done'],
-                'tu': ['tu_done'],
-                'kss': ['kss_done']
-            }
+def build_report_data(data, report_datetime=None):
+    """
+    Формирует документ отчета из данных формы с приведением типов по категориям.
+    Возвращает (report_data, protocol_ids) - отчет и отмеченные выполненными протоколы
+    """
+    data = dict(data)
+    report_type = data.get('type')
+    if not data.get('service'):
+        raise ValueError('Не указана служба')
+    if report_type not in ('daily', 'weekly'):
+        raise ValueError(f'Неверный тип отчета: {report_type}')
+
+    # Подготовка данных для сохранения
+    report_data = {
+        'department': data.get('service'),
+        'type': report_type,
+        'datetime': report_datetime or datetime.now(),
+        'data': {}
+    }
+
+    # Удаляем служебные поля
+    data.pop('service', None)
+    data.pop('type', None)
+
+    # Основные поля
+    report_data['data']['tasks'] = data.get('task', '')
+    report_data['data']['faults'] = data.get('faults', '')
+
+    # Обрабатываем категории
+    for category, fields in REPORT_CATEGORIES.items():
+        category_data = {}
+        for field in fields:
+            if field in data:
+                value = data[field]
+                # Для полей с причинами оставляем текст как есть
+                if 'reason' in field:
+                    category_data[field] = str(value) if value is not None else ''
+                # Для числовых полей преобразуем в int
+                elif any(x in field for x in ['total', 'done', 'undone', 'inwork']):
+                    try:
+                        category_data[field] = int(value) if value else 0
+                    except (ValueError, TypeError):
+                        category_data[field] = 0
+                # Все остальные поля оставляем как есть
+                else:
+                    category_data[field] = value
 
-            # Основные поля
-            report_data['data']['tasks'] = data.get('task', '')
-            report_data['data']['faults'] = data.get('faults', '')
-
-            # Обрабатываем категории
-            for category, fields in categories.items():
-                category_data = {}
-                for field in fields:
-                    if field in data:
-                        value = data[field]
-                        # Для полей с причинами оставляем текст как есть
-                        if 'reason' in field:
-                            category_data[field] = str(value) if value is not None else ''
-                        # Для числовых полей преобразуем в int
-                        elif any(x in field for x in ['total', 'done', 'undone', 'inwork']):
-                            try:
-                                category_data[field] = int(value) if value else 0
-                            except (ValueError, TypeError):
-                                category_data[field] = 0
-                        # Все остальные поля оставляем как есть
-                        else:
-                            category_data[field] = value
+        if category_data:  # Добавляем только если есть данные
+            report_data['data'][category] = category_data
 
-                if category_data:  # Добавляем только если есть данные
-                    report_data['data'][category] = category_data
+    protocol_ids = [ObjectId(key.replace('protocol_', '')) for key, value in data.items()
+                    if key.startswith('protocol_') and value == 'on']
+    return report_data, protocol_ids
 
-            # Сохраняем в MongoDB
-            reports.insert_one(report_data)
 
-            # Обновляем дополнительные коллекции
-            update_related_collections(report_data, current_year)
+def protocol_done_operations(service, protocol_ids, done_date):
+    """Операции отметки выполнения протоколов службой"""
+    return mark_done_operations({'_id': {'$in': protocol_ids}}, service, done_date, many=True)
 
-            protocol_updates = {}
-            for key, value in data.items():
-                if key.startswith('protocol_') and value == 'on':
-                    protocol_id = key.replace('protocol_', '')
-                    protocol_updates[protocol_id] = datetime.now()
 
-            if protocol_updates:
-                for protocol_id, done_date in protocol_updates.items():
-                    protocols.update_one(
-                        {'_id': ObjectId(protocol_id)},
-                        {'$set': {f'done.{service}': done_date}}
-                    )
+@csrf_exempt
+def handle_report(request):
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            report_data, protocol_ids = build_report_data(data)
+            service = report_data['department']
+
+            # Отчет подтверждается сразу, связанные коллекции и протоколы
+            # обновляются фоновой задачей, поставленной в той же транзакции
+            def write_report(session):
+                reports.insert_one(report_data, session=session)
+                enqueue('report_side_effects', {
+                    'report_ids': [report_data['_id']],
+                    'protocols': [{'service': service, 'ids': protocol_ids, 'done_date': datetime.now()}],
+                }, session=session)
+
+            run_in_transaction(write_report)
+            notify_worker('report_side_effects')
+            invalidate_report_counts([service])
+            invalidate_trends([report_data])
 
             return JsonResponse({'status': 'success', 'message': 'Данные успешно сохранены'})
         except Exception as e:
@@ -170,34 +206,69 @@ def handle_report(request):
         try:
             service = request.GET.get('service')
             report_type = request.GET.get('type')  # daily или weekly
-            limit = int(request.GET.get('limit', 1))  # Количество отчетов для загрузки
-            skip = int(request.GET.get('skip', 0))  # Пропустить первые N отчетов
+            limit = int(request.GET.get('limit', 1))  # Размер окна предзагрузки
+            after = request.GET.get('after')  # Курсор: отчеты старше указанного
+            before = request.GET.get('before')  # Курсор: отчеты новее указанного
+            with_count = request.GET.get('count') in ('1', 'true')
 
             if not service:
                 return JsonResponse({'status': 'error', 'message': 'Не указана служба'}, status=400)
+            limit = max(1, min(limit, REPORTS_PAGE_MAX))
 
             query = {'department': service}
             if report_type:
                 query['type'] = report_type
 
-            # Получаем отчеты с пагинацией
-            reports_cursor = reports.find(
-                query,
-                {'_id': 0, 'data': 1, 'datetime': 1, 'type': 1}
-            ).sort('datetime', -1).skip(skip).limit(limit)
+            # Keyset-пагинация по (datetime, _id): стоимость не зависит от глубины истории
+            if after or before:
+                try:
+                    cursor_date, cursor_id = decode_report_cursor(after or before)
+                except ValueError as e:
+                    return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+            page_query = dict(query)
+            sort_direction = -1
+            if after:
+                page_query['$or'] = [
+                    {'datetime': {'$lt': cursor_date}},
+                    {'datetime': cursor_date, '_id': {'$lt': cursor_id}},
+                ]
+            elif before:
+                page_query['$or'] = [
+                    {'datetime': {'$gt': cursor_date}},
+                    {'datetime': cursor_date, '_id': {'$gt': cursor_id}},
+                ]
+                sort_direction = 1
+
+            # Запрашиваем на один отчет больше, чтобы узнать, есть ли продолжение
+            reports_list = list(reports.find(
+                page_query,
+                {'_id': 1, 'data': 1, 'datetime': 1, 'type': 1}
+            ).sort([('datetime', sort_direction), ('_id', sort_direction)]).limit(limit + 1))
+
+            has_more = len(reports_list) > limit
+            reports_list = reports_list[:limit]
+            if sort_direction == 1:
+                reports_list.reverse()
 
-            reports_list = list(reports_cursor)
             for report in reports_list:
+                report['cursor'] = encode_report_cursor(report)
                 report['datetime'] = report['datetime'].isoformat()
+                del report['_id']
 
-            # Получаем общее количество отчетов для навигации
-            total_count = reports.count_documents(query)
+            # Точное количество считаем только по запросу, иначе отдаем кэшированное значение
+            count_key = report_count_cache_key(service, report_type)
+            if with_count:
+                total_count = reports.count_documents(query)
+                cache.set(count_key, total_count, REPORTS_COUNT_CACHE_TIMEOUT)
+            else:
+                total_count = cache.get(count_key)
 
             return JsonResponse({
                 'status': 'success',
                 'reports': reports_list,
                 'total_count': total_count,
-                'skip': skip,
+                'has_more': has_more,
                 'limit': limit
             })
         except Exception as e:
@@ -206,58 +277,267 @@ def handle_report(request):
     return HttpResponseBadRequest(json.dumps({'status': 'error', 'message': 'Неверный метод запроса'}))
 
 
-def update_related_collections(report_data, year):
-    """Обновление связанных коллекций (замечания, утечки, КСС)"""
-    department = report_data['department']
-    now = datetime.now()
+@csrf_exempt
+def bulk_reports(request):
+    """
+    Пакетная загрузка отчетов: JSON-массив или NDJSON (по отчету в строке).
+    Каждая запись - те же поля, что и у формы отчета, плюс необязательный
+    datetime (ISO) для загрузки истории. Возвращает статус по каждой записи.
+    """
+    if request.method != 'POST':
+        return HttpResponseBadRequest(json.dumps({'status': 'error', 'message': 'Неверный метод запроса'}))
+
+    try:
+        body = request.body.decode('utf-8').strip()
+        if body.startswith('['):
+            records = [(index, item, None) for index, item in enumerate(json.loads(body))]
+        else:
+            records = []
+            for index, line in enumerate(body.splitlines()):
+                if not line.strip():
+                    continue
+                try:
+                    records.append((index, json.loads(line), None))
+                except ValueError as e:
+                    records.append((index, None, f'Ошибка разбора JSON: {e}'))
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': f'Ошибка разбора JSON: {e}'}, status=400)
+
+    if len(records) > BULK_REPORTS_MAX:
+        return JsonResponse({
+            'status': 'error',
+            'message': f'Слишком много записей: {len(records)}, максимум {BULK_REPORTS_MAX}'
+        }, status=400)
+
+    # Проверка и приведение типов теми же правилами, что и для одиночного отчета
+    results = []
+    documents = []
+    protocol_updates = []
+    for index, item, error in records:
+        if error is None:
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError('Запись должна быть JSON-объектом')
+                report_datetime = None
+                if item.get('datetime'):
+                    report_datetime = parse_client_datetime(item['datetime'])
+                report_data, protocol_ids = build_report_data(item, report_datetime)
+                documents.append((index, report_data, protocol_ids))
+                continue
+            except Exception as e:
+                error = str(e)
+        results.append({'index': index, 'status': 'error', 'message': error})
+
+    # Вставка без остановки на ошибочных записях
+    failed = {}
+    if documents:
+        try:
+            reports.insert_many([report_data for _, report_data, _ in documents], ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get('writeErrors', []):
+                failed[write_error['index']] = write_error.get('errmsg', 'Ошибка записи')
+        except Exception as e:
+            # Сбой без сведений по записям (нет связи с базой и т.п.): ни одна запись не подтверждена
+            failed = {position: f'Ошибка записи: {e}' for position in range(len(documents))}
+
+    inserted = []
+    for position, (index, report_data, protocol_ids) in enumerate(documents):
+        if position in failed:
+            results.append({'index': index, 'status': 'error', 'message': failed[position]})
+            continue
+        inserted.append(report_data)
+        if protocol_ids:
+            protocol_updates.append({'service': report_data['department'], 'ids': protocol_ids,
+                                     'done_date': report_data['datetime']})
+        results.append({'index': index, 'status': 'created', 'id': str(report_data['_id'])})
+
+    # Побочные эффекты всей пачки - одной фоновой задачей, как и для одиночного отчета:
+    # приращения суммируются по службе/году и защищены от повтора задачи
+    if inserted:
+        enqueue('report_side_effects', {
+            'report_ids': [report_data['_id'] for report_data in inserted],
+            'protocols': protocol_updates,
+        })
+        invalidate_report_counts(report_data['department'] for report_data in inserted)
+        invalidate_trends(inserted)
+
+    results.sort(key=lambda result: result['index'])
+    return JsonResponse({
+        'status': 'success' if len(inserted) == len(records) else 'partial',
+        'created': len(inserted),
+        'failed': len(records) - len(inserted),
+        'results': results
+    })
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: возвращает записанную строку вместо хранения"""
+    def write(self, value):
+        return value
+
+
+def export_columns():
+    """Колонки выгрузки отчетов: (категория, поле, заголовок)"""
+    columns = [(None, 'tasks', FIELD_NAMES_MAPPING['tasks']),
+               (None, 'faults', FIELD_NAMES_MAPPING['faults'])]
+    for category, fields in REPORT_CATEGORIES.items():
+        for field in fields:
+            columns.append((category, field, FIELD_NAMES_MAPPING.get(field, field)))
+    return columns
+
+
+def export_rows(cursor, columns):
+    """Строки выгрузки: заголовок и по строке на каждый отчет курсора"""
+    yield ['Служба', 'Тип отчета', 'Дата'] + [title for _, _, title in columns]
+    for report in cursor:
+        data = report.get('data', {})
+        row = [
+            report.get('department', ''),
+            'Ежедневный' if report.get('type') == 'daily' else 'Еженедельный',
+            report['datetime'].strftime('%d.%m.%Y %H:%M'),
+        ]
+        for category, field, _ in columns:
+            source = data if category is None else data.get(category, {})
+            value = source.get(field, '')
+            row.append('' if value is None else value)
+        yield row
+
+
+def export_reports(request):
+    """
+    Потоковая выгрузка истории отчетов в CSV или XLSX.
+    Параметры: department (можно несколько), type, date_from, date_to (ГГГГ-ММ-ДД), format
+    """
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in ('csv', 'xlsx'):
+        return JsonResponse({'status': 'error', 'message': 'Формат должен быть csv или xlsx'}, status=400)
 
-    # Обработка утечек
-    if 'leak' in report_data['data']:
-        leak_total = report_data['data']['leak'].get('leak_total', 0)
-        leak_done = report_data['data']['leak'].get('leak_done', 0)
-        leaks.update_one(
+    try:
+        query = {}
+        departments = request.GET.getlist('department')
+        if departments:
+            query['department'] = {'$in': departments}
+        if request.GET.get('type'):
+            query['type'] = request.GET['type']
+        date_range = {}
+        if request.GET.get('date_from'):
+            date_range['$gte'] = datetime.strptime(request.GET['date_from'], '%Y-%m-%d')
+        if request.GET.get('date_to'):
+            date_range['$lt'] = datetime.strptime(request.GET['date_to'], '%Y-%m-%d') + timedelta(days=1)
+        if date_range:
+            query['datetime'] = date_range
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    # Серверный курсор: документы читаются пакетами, весь результат в память не загружается
+    cursor = reports.find(
+        query,
+        {'_id': 0, 'department': 1, 'type': 1, 'datetime': 1, 'data': 1},
+        batch_size=EXPORT_BATCH_SIZE
+    ).sort([('department', 1), ('datetime', 1)])
+    rows = export_rows(cursor, export_columns())
+    filename = f"reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+
+    if export_format == 'csv':
+        writer = csv.writer(Echo(), delimiter=';')
+
+        def stream():
+            yield '\ufeff'  # BOM, чтобы Excel открыл файл в UTF-8
+            for row in rows:
+                yield writer.writerow(row)
+
+        response = StreamingHttpResponse(stream(), content_type='text/csv; charset=utf-8')
+    else:
+        # Write-only книга сбрасывает строки во временный файл по мере добавления
+        wb = Workbook(write_only=True)
+        sheet = wb.create_sheet('Отчеты')
+        for row in rows:
+            sheet.append(row)
+        tmp = tempfile.TemporaryFile()
+        wb.save(tmp)
+        tmp.seek(0)
+        response = FileResponse(
+            tmp,
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def related_collection_operations(report_list, applied_key=None):
+    """
+    Формирует операции обновления связанных коллекций (замечания, утечки, КСС)
+    в виде [(коллекция, [операции]), ...] для bulk_write.
+    Приращения нескольких отчетов суммируются по службе и году.
+    С applied_key (_id задачи) повторное применение тех же приращений пропускается
+    """
+    now = datetime.now()
+    leak_increments = {}
+    kss_increments = {}
+    remark_increments = {}
+
+    for report_data in report_list:
+        department = report_data['department']
+        year = report_data['datetime'].year
+
+        # Обработка утечек
+        if 'leak' in report_data['data']:
+            increment = leak_increments.setdefault((year, department), {'total': 0, 'done': 0})
+            increment['total'] += report_data['data']['leak'].get('leak_total', 0)
+            increment['done'] += report_data['data']['leak'].get('leak_done', 0)
+
+        # Обработка КСС
+        if 'kss' in report_data['data']:
+            kss_done = report_data['data']['kss'].get('kss_done', 0)
+            if kss_done > 0:
+                kss_increments[year] = kss_increments.get(year, 0) + kss_done
+
+        # Обработка замечаний (ОЗП, Газнадзор, Ростехнадзор)
+        for remark_type in ['ozp', 'gaz', 'ros', 'apk4']:
+            if remark_type in report_data['data']:
+                remark_done = report_data['data'][remark_type].get(f'{remark_type}_done', 0)
+                if remark_done > 0:
+                    key = (year, remark_type, department)
+                    remark_increments[key] = remark_increments.get(key, 0) + remark_done
+
+    operations = []
+    operations += increment_operations(leaks, [
+        (
             {'year': year, 'department': department},
             {
-                '$inc': {'total': leak_total, 'done': leak_done},
+                '$inc': {'total': increment['total'], 'done': increment['done']},
+                '$setOnInsert': {'datetime': now}
+            }
+        )
+        for (year, department), increment in leak_increments.items()
+    ], applied_key, upsert=True)
+    operations += increment_operations(kss, [
+        (
+            {'year': year},
+            {
+                '$inc': {'total': kss_done},
                 '$setOnInsert': {'datetime': now}
-            },
-            upsert=True
+            }
         )
+        for year, kss_done in kss_increments.items()
+    ], applied_key, upsert=True)
+    # Обновляем только существующую запись (план на год задается в планировании),
+    # поэтому без upsert - условие поиска заменяет предварительный find_one
+    operations += increment_operations(remarks, [
+        ({'year': year, 'value': remark_type, 'department': department}, {'$inc': {'done': remark_done}})
+        for (year, remark_type, department), remark_done in remark_increments.items()
+    ], applied_key)
 
-    # Обработка КСС
-    if 'kss' in report_data['data']:
-        kss_done = report_data['data']['kss'].get('kss_done', 0)
-        if kss_done > 0:
-            kss.update_one(
-                {'year': year},
-                {
-                    '$inc': {'total': kss_done},
-                    '$setOnInsert': {'datetime': now}
-                },
-                upsert=True
-            )
+    # Квартальные сводки по всем числовым показателям отчетов
+    operations += rollup_operations(report_list, applied_key)
 
-    # Обработка замечаний (ОЗП, Газнадзор, Ростехнадзор)
-    for remark_type in ['ozp', 'gaz', 'ros', 'apk4']:
-        if remark_type in report_data['data']:
-            remark_done = report_data['data'][remark_type].get(f'{remark_type}_done', 0)
-            if remark_done > 0:
-                # Проверяем, есть ли запись для текущего года
-                existing_remark = remarks.find_one({
-                    'year': year,
-                    'value': remark_type,
-                    'department': department
-                })
-                if existing_remark:
-                    # Обновляем существующую запись
-                    remarks.update_one(
-                        {'year': year, 'value': remark_type, 'department': department},
-                        {
-                            '$inc': {'done': remark_done},
-                            '$setOnInsert': {'datetime': now}
-                        },
-                        upsert=True
-                    )
+    return operations
+
+
+def update_related_collections(report_list, session=None):
+    """Обновление связанных коллекций (замечания, утечки, КСС, сводки)"""
+    bulk_write_all(related_collection_operations(report_list), session=session)
 
 
 @csrf_exempt
@@ -311,6 +591,7 @@ def handle_planning(request):
                         plan_data,
                         upsert=True
                     )
+            bump_version(dashboard_version(department, year))
             return JsonResponse({'status': 'success', 'message': 'Данные планирования успешно сохранены'})
         except Exception as e:
             return HttpResponseBadRequest(json.dumps({'status': 'error', 'message': str(e)}))
@@ -318,35 +599,66 @@ def handle_planning(request):
 
 
 def get_reports(request):
-    """Получение отчетов для отображения"""
-    service = request.GET.get('service')
-    if not service:
+    """
+    Получение последних отчетов каждого типа и количества отчетов по типам
+    для одной или нескольких служб (запросы выполняются параллельно)
+    """
+    services = request.GET.getlist('service')
+    if len(services) == 1 and ',' in services[0]:
+        services = [item for item in services[0].split(',') if item]
+    if not services:
         return JsonResponse({'status': 'error', 'message': 'Не указана служба'}, status=400)
 
     try:
-        # Получаем последний ежедневный отчет
-        daily_report = reports.find_one(
-            {'department': service, 'type': 'daily'},
-            {'_id': 0, 'data': 1, 'datetime': 1, 'type': 1},
-            sort=[('datetime', -1)]
-        )
-
-        # Получаем последний еженедельный отчет
-        weekly_report = reports.find_one(
-            {'department': service, 'type': 'weekly'},
-            {'_id': 0, 'data': 1, 'datetime': 1, 'type': 1},
-            sort=[('datetime', -1)]
-        )
+        # Последний отчет каждого типа - find_one по индексу department_type_datetime,
+        # количества - $group только по полям индекса, без чтения данных отчетов
+        pairs = [(service, report_type) for service in services for report_type in ('daily', 'weekly')]
+
+        def latest_report(service, report_type):
+            return lambda: reports.find_one(
+                {'department': service, 'type': report_type},
+                {'_id': 1, 'data': 1, 'datetime': 1, 'type': 1},
+                sort=[('datetime', -1), ('_id', -1)]
+            )
 
+        queries = {f'latest_{index}': latest_report(*pair) for index, pair in enumerate(pairs)}
+        queries['totals'] = lambda: list(reports.aggregate([
+            {'$match': {'department': {'$in': services}}},
+            {'$group': {
+                '_id': {'department': '$department', 'type': '$type'},
+                'count': {'$sum': 1}
+            }},
+        ]))
+        result = run_concurrently(**queries)
+
+        latest = {service: {} for service in services}
+        totals = {service: {'daily': 0, 'weekly': 0} for service in services}
+        for index, (service, report_type) in enumerate(pairs):
+            report = result[f'latest_{index}']
+            if report is None:
+                continue
+            report['cursor'] = encode_report_cursor(report)
+            report['datetime'] = report['datetime'].isoformat()
+            del report['_id']
+            latest[service][report_type] = report
+        for item in result['totals']:
+            department, report_type = item['_id']['department'], item['_id']['type']
+            totals[department][report_type] = item['count']
+            cache.set(report_count_cache_key(department, report_type), item['count'],
+                      REPORTS_COUNT_CACHE_TIMEOUT)
+
+        # Плоский список сохраняем для совместимости с прежним форматом ответа
         reports_list = []
-        if daily_report:
-            daily_report['datetime'] = daily_report['datetime'].isoformat()
-            reports_list.append(daily_report)
-        if weekly_report:
-            weekly_report['datetime'] = weekly_report['datetime'].isoformat()
-            reports_list.append(weekly_report)
-
-        return JsonResponse({'status': 'success', 'reports': reports_list})
+        for report_type in ('daily', 'weekly'):
+            if report_type in latest[services[0]]:
+                reports_list.append(latest[services[0]][report_type])
+
+        return JsonResponse({
+            'status': 'success',
+            'reports': reports_list,
+            'latest': latest,
+            'totals': totals
+        })
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
@@ -357,11 +669,7 @@ def index(request):
 
 def view_data(request):
     """Страница просмотра данных"""
-    services = [
-        'КС-1,4', 'КС-2,3', 'КС-5,6', 'КС-7,8', 'КС-9,10',
-        'ГКС', 'АиМО', 'ЭВС', 'ЛЭС', 'СЗК', 'Связь', 'ВПО'
-    ]
-    return render(request, 'report_webapp/index.html', {'services': services})
+    return render(request, 'report_webapp/index.html', {'services': SERVICES})
 
 
 @csrf_exempt
@@ -374,6 +682,7 @@ def get_leaks(request):
             {'department': department, 'year': int(year)},
             {'_id': 0, 'total': 1, 'done': 1}
         )
+        leaks_data = leaks_data or {}
         return JsonResponse({'status': 'success', 'total': leaks_data.get('total', 0), 'done': leaks_data.get('done', 0)})
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
@@ -388,6 +697,7 @@ def get_kss(request):
             {'year': int(year)},
             {'_id': 0, 'total': 1}
         )
+        kss_data = kss_data or {}
         return JsonResponse({'status': 'success', 'total': kss_data.get('total', 0)})
     except Exception as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
@@ -411,6 +721,147 @@ def get_remarks(request):
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
 
+def dashboard_version(department, year):
+    """Имя версии сводных данных службы за год"""
+    return f'dashboard:{department}:{year}'
+
+
+def dashboard_cache_key(department, year):
+    """
+    Ключ кэша сводных данных службы за год. Версия хранится в базе, поэтому сброс
+    из обработчика задач или другого процесса виден всем процессам
+    """
+    version = get_version(dashboard_version(department, year))['version']
+    return f'dashboard:{department}:{year}:{version}'
+
+
+def invalidate_dashboards(report_list):
+    """Сбрасывает кэш сводных данных служб, затронутых отчетами"""
+    names = set()
+    for report_data in report_list:
+        year = report_data['datetime'].year
+        names.add(dashboard_version(report_data['department'], year))
+        # КСС учитываются за год без разбивки по службам
+        if report_data['data'].get('kss', {}).get('kss_done', 0) > 0:
+            names.update(dashboard_version(service, year) for service in SERVICES)
+    bump_version(*names)
+
+
+def load_dashboard(department, year):
+    """Планы, утечки, замечания и КСС службы за год с нулевыми значениями по умолчанию"""
+    result = run_concurrently(
+        plans=lambda: list(plans.find(
+            {'department': department, 'year': year},
+            {'_id': 0, 'value': 1, 'total': 1, 'quarters': 1}
+        )),
+        leaks=lambda: leaks.find_one(
+            {'department': department, 'year': year},
+            {'_id': 0, 'total': 1, 'done': 1}
+        ),
+        remarks=lambda: list(remarks.find(
+            {'department': department, 'year': year},
+            {'_id': 0, 'value': 1, 'total': 1, 'done': 1}
+        )),
+        kss=lambda: kss.find_one({'year': year}, {'_id': 0, 'total': 1}),
+    )
+
+    plans_by_value = {plan['value']: plan for plan in result['plans']}
+    remarks_by_value = {remark['value']: remark for remark in result['remarks']}
+    leaks_data = result['leaks'] or {}
+    kss_data = result['kss'] or {}
+    return {
+        'plans': [
+            plans_by_value.get(value, {'value': value, 'total': 0,
+                                       'quarters': {'1': 0, '2': 0, '3': 0, '4': 0}})
+            for value in ('rp', 'pat', 'tu')
+        ],
+        'leaks': {'total': leaks_data.get('total', 0), 'done': leaks_data.get('done', 0)},
+        'remarks': [
+            remarks_by_value.get(value, {'value': value, 'total': 0, 'done': 0})
+            for value in ('ozp', 'gaz', 'ros', 'apk4')
+        ],
+        'kss': {'total': kss_data.get('total', 0)},
+    }
+
+
+def get_dashboard(request):
+    """Сводные данные службы за год (планы, утечки, замечания, КСС) одним запросом"""
+    department = request.GET.get('department')
+    year = request.GET.get('year')
+    if not department or not year:
+        return JsonResponse({'status': 'error', 'message': 'Не указаны служба или год'}, status=400)
+
+    try:
+        year = int(year)
+        key = dashboard_cache_key(department, year)
+        dashboard = cache.get(key)
+        if dashboard is None:
+            dashboard = load_dashboard(department, year)
+            cache.set(key, dashboard, DASHBOARD_CACHE_TIMEOUT)
+        return JsonResponse({'status': 'success', 'department': department, 'year': year, **dashboard})
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
+def get_analytics_trends(request):
+    """
+    Динамика показателей отчетов по периодам.
+    Параметры: unit (day/week/month), department (можно несколько),
+    metric (можно несколько), date_from, date_to (ГГГГ-ММ-ДД)
+    """
+    unit = request.GET.get('unit', 'month')
+    if unit not in TREND_UNITS:
+        return JsonResponse({'status': 'error', 'message': 'unit должен быть day, week или month'}, status=400)
+
+    metrics = request.GET.getlist('metric') or DEFAULT_TREND_METRICS
+    unknown = [metric for metric in metrics if metric not in METRIC_PATHS and metric != 'reports']
+    if unknown:
+        return JsonResponse({'status': 'error', 'message': f'Неизвестные показатели: {", ".join(unknown)}'}, status=400)
+
+    try:
+        date_from = request.GET.get('date_from')
+        date_to = request.GET.get('date_to')
+        date_from = datetime.strptime(date_from, '%Y-%m-%d') if date_from else None
+        date_to = datetime.strptime(date_to, '%Y-%m-%d') if date_to else None
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Даты должны быть в формате ГГГГ-ММ-ДД'}, status=400)
+
+    try:
+        series = get_trends(unit, date_from=date_from, date_to=date_to,
+                            departments=request.GET.getlist('department'))
+        result = {}
+        for department, buckets in series.items():
+            result[department] = [
+                {'date': format_bucket(bucket), **{metric: buckets[bucket][metric] for metric in metrics}}
+                for bucket in sorted(buckets)
+            ]
+
+        return JsonResponse({'status': 'success', 'unit': unit, 'metrics': metrics, 'series': result})
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
+def get_jobs_stats(request):
+    """Состояние очереди фоновых задач: глубина и отставание"""
+    try:
+        return JsonResponse({'status': 'success', **queue_stats()})
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
+def get_rollups(request):
+    """Квартальные и годовая сводки показателей отчетов службы"""
+    department = request.GET.get('department')
+    year = request.GET.get('year')
+    if not department or not year:
+        return JsonResponse({'status': 'error', 'message': 'Не указаны служба или год'}, status=400)
+
+    try:
+        return JsonResponse({'status': 'success', 'rollup': get_rollup(department, int(year))})
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
 @csrf_exempt
 def get_plans(request):
     try:
@@ -437,15 +888,19 @@ def get_plans(request):
 
 
 @csrf_exempt
+@conditional_list('protocols')
 def handle_protocols(request):
     if request.method == 'GET':
         try:
-            # Получаем только неархивированные протоколы
-            queryset = list(protocols.find(
-                {'archived': {'$ne': True}},
+            # Получаем активные протоколы (архив хранится отдельно) с фильтрами и пагинацией на стороне MongoDB
+            queryset, next_cursor, has_more = paginate(
+                protocols,
+                list_filters(request.GET, 'issue_date', 'departments', 'done'),
                 {'_id': 1, 'date': 1, 'text': 1, 'archived': 1, 'done': 1,
-                 'departments': 1, 'issue_date': 1, 'protocol_num': 1, 'protocol_name': 1, 'deadline': 1}
-            ).sort('issue_date', -1))  # Сортируем по дате выхода (новые сверху)
+                 'departments': 1, 'issue_date': 1, 'protocol_num': 1, 'protocol_name': 1, 'deadline': 1, 'deadline_at': 1},
+                'issue_date', -1,  # Сортируем по дате выхода (новые сверху)
+                request.GET.get('cursor'), page_size_param(request.GET)
+            )
 
             # Преобразуем ObjectId в строку и форматируем даты
             formatted_protocols = []
@@ -456,6 +911,7 @@ def handle_protocols(request):
                     'protocol_name': protocol.get('protocol_name', ''),
                     'issue_date': protocol['issue_date'].isoformat() if 'issue_date' in protocol else '',
                     'deadline': protocol.get('deadline', ''),  # Текстовое поле
+                    'deadline_at': protocol['deadline_at'].isoformat() if protocol.get('deadline_at') else None,
                     'departments': protocol['departments'],
                     'text': protocol['text'],
                     'done': {}
@@ -474,8 +930,12 @@ def handle_protocols(request):
 
             return JsonResponse({
                 'status': 'success',
-                'protocols': formatted_protocols
+                'protocols': formatted_protocols,
+                'next_cursor': next_cursor,
+                'has_more': has_more
             })
+        except InvalidQueryParam as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
@@ -487,13 +947,16 @@ def handle_protocols(request):
                 'protocol_num': data['protocol_num'],  # Номер протокола
                 'protocol_name': data['protocol_name'],  # Название протокола
                 'deadline': data['deadline'],  # Текстовый срок исполнения
+                'deadline_at': parse_deadline(data['deadline']),  # Срок датой (None для периодических)
                 'text': data['text'],
                 'departments': data['departments'],
+                'completion': completion_entries(data['departments']),
                 'archived': False,
                 'created_at': datetime.now()
             }
 
             result = protocols.insert_one(protocol_data)
+            item_changed('protocols', 'created', [result.inserted_id], protocol_data)
             return JsonResponse({
                 'status': 'success',
                 'message': 'Протокол успешно добавлен',
@@ -510,14 +973,21 @@ def handle_protocols(request):
                 'protocol_name': data.get('protocol_name'),
                 'issue_date': datetime.fromisoformat(data.get('issue_date')),
                 'deadline': data.get('deadline'),
+                'deadline_at': parse_deadline(data.get('deadline')),
                 'text': data.get('text'),
                 'departments': data.get('departments')
             }
+            # Состав служб мог измениться - пересобираем completion с сохранением отметок
+            existing = protocols.find_one({'_id': ObjectId(protocol_id)}, {'done': 1})
+            if existing is None:
+                return JsonResponse({'status': 'error', 'message': 'Not found'}, status=404)
+            update_data['completion'] = completion_entries(update_data['departments'] or [], existing.get('done'))
             result = protocols.update_one(
                 {'_id': ObjectId(protocol_id)},
                 {'$set': update_data}
             )
             if result.modified_count:
+                item_changed('protocols', 'updated', [protocol_id], update_data)
                 return JsonResponse({'status': 'success'})
             return JsonResponse({'status': 'error', 'message': 'Not found'}, status=404)
         except Exception as e:
@@ -527,15 +997,10 @@ def handle_protocols(request):
 
 @csrf_exempt
 def archive_protocol(request, protocol_id):
-    print(protocols.find_one({'_id': ObjectId(protocol_id)}))
     if request.method == 'POST':
         try:
-            result = protocols.update_one(
-                {'_id': ObjectId(protocol_id)},
-                {'$set': {'archived': True, 'archived_at': datetime.now()}}
-            )
-
-            if result.modified_count == 1:
+            moved = archive_items('protocols', [ObjectId(protocol_id)])
+            if moved:
                 return JsonResponse({'status': 'success', 'message': 'Протокол архивирован'})
             else:
                 return JsonResponse({'status': 'error', 'message': 'Протокол не найден'}, status=404)
@@ -551,14 +1016,12 @@ def mark_protocol_done(request, protocol_id):
         try:
             data = json.loads(request.body)
             service = data.get('service')
-            done_date = datetime.fromisoformat(data.get('done_date').replace('Z', '+00:00'))
+            done_date = parse_client_datetime(data.get('done_date'))
 
-            result = protocols.update_one(
-                {'_id': ObjectId(protocol_id)},
-                {'$set': {f'done.{service}': done_date}}
-            )
+            result = protocols.bulk_write(mark_done_operations({'_id': ObjectId(protocol_id)}, service, done_date))
 
-            if result.modified_count == 1:
+            if result.matched_count:
+                item_changed('protocols', 'done', [protocol_id], {'done': {service: done_date}})
                 return JsonResponse({'status': 'success', 'message': 'Протокол обновлен'})
             else:
                 return JsonResponse({'status': 'error', 'message': 'Протокол не найден'}, status=404)
@@ -569,14 +1032,18 @@ def mark_protocol_done(request, protocol_id):
 
 
 @csrf_exempt
+@conditional_list('orders')
 def handle_orders(request):
     if request.method == 'GET':
         try:
-            # Получаем только неархивированные распоряжения
-            queryset = list(orders.find(
-                {'archived': {'$ne': True}},
-                {'_id': 1, 'date': 1, 'text': 1, 'archived': 1, 'done': 1, 'num': 1, 'departments': 1, 'issue_date': 1, 'deadline': 1}
-            ).sort('issue_date', -1))  # Сортируем по дате выхода (новые сверху)
+            # Получаем активные распоряжения (архив хранится отдельно) с фильтрами и пагинацией на стороне MongoDB
+            queryset, next_cursor, has_more = paginate(
+                orders,
+                list_filters(request.GET, 'issue_date', 'departments', 'done'),
+                {'_id': 1, 'date': 1, 'text': 1, 'archived': 1, 'done': 1, 'num': 1, 'departments': 1, 'issue_date': 1, 'deadline': 1, 'deadline_at': 1},
+                'issue_date', -1,  # Сортируем по дате выхода (новые сверху)
+                request.GET.get('cursor'), page_size_param(request.GET)
+            )
 
             # Преобразуем ObjectId в строку и форматируем даты
             formatted_orders = []
@@ -586,6 +1053,7 @@ def handle_orders(request):
                     'num': order['num'],
                     'issue_date': order['issue_date'].isoformat() if 'issue_date' in order else '',
                     'deadline': order.get('deadline', ''),  # Текстовое поле
+                    'deadline_at': order['deadline_at'].isoformat() if order.get('deadline_at') else None,
                     'departments': order['departments'],
                     'text': order['text'],
                     'done': {}
@@ -600,8 +1068,12 @@ def handle_orders(request):
                 formatted_orders.append(formatted)
             return JsonResponse({
                 'status': 'success',
-                'orders': formatted_orders
+                'orders': formatted_orders,
+                'next_cursor': next_cursor,
+                'has_more': has_more
             })
+        except InvalidQueryParam as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
@@ -611,13 +1083,16 @@ def handle_orders(request):
             order_data = {
                 'issue_date': datetime.fromisoformat(data['issue_date']),  # Новая дата выхода
                 'deadline': data['deadline'],  # Текстовый срок исполнения
+                'deadline_at': parse_deadline(data['deadline']),  # Срок датой (None для периодических)
                 'text': data['text'],
                 'num': data['num'],
                 'departments': data['departments'],
+                'completion': completion_entries(data['departments']),
                 'archived': False,
                 'created_at': datetime.now()
             }
             result = orders.insert_one(order_data)
+            item_changed('orders', 'created', [result.inserted_id], order_data)
             return JsonResponse({
                 'status': 'success',
                 'message': 'Распоряжение (приказ) успешно добавлено',
@@ -632,11 +1107,8 @@ def handle_orders(request):
 def archive_order(request, order_id):
     if request.method == 'POST':
         try:
-            result = orders.update_one(
-                {'_id': ObjectId(order_id)},
-                {'$set': {'archived': True, 'archived_at': datetime.now()}}
-            )
-            if result.modified_count == 1:
+            moved = archive_items('orders', [ObjectId(order_id)])
+            if moved:
                 return JsonResponse({'status': 'success', 'message': 'Распоряжение архивировано'})
             else:
                 return JsonResponse({'status': 'error', 'message': 'Распоряжение не найдено'}, status=404)
@@ -651,12 +1123,10 @@ def mark_order_done(request, order_id):
         try:
             data = json.loads(request.body)
             service = data.get('service')
-            done_date = datetime.fromisoformat(data.get('done_date').replace('Z', '+00:00'))
-            result = orders.update_one(
-                {'_id': ObjectId(order_id)},
-                {'$set': {f'done.{service}': done_date}}
-            )
-            if result.modified_count == 1:
+            done_date = parse_client_datetime(data.get('done_date'))
+            result = orders.bulk_write(mark_done_operations({'_id': ObjectId(order_id)}, service, done_date))
+            if result.matched_count:
+                item_changed('orders', 'done', [order_id], {'done': {service: done_date}})
                 return JsonResponse({'status': 'success', 'message': 'Протокол обновлен'})
             else:
                 return JsonResponse({'status': 'error', 'message': 'Протокол не найден'}, status=404)
@@ -684,14 +1154,18 @@ def departments_list(request):
 
 
 @csrf_exempt
+@conditional_list('faults')
 def handle_faults(request):
     if request.method == 'GET':
         try:
-            # Получаем только неархивированные распоряжения
-            queryset = list(faults.find(
-                {'archived': {'$ne': True}},
-                {'_id': 1, 'date': 1, 'text': 1, 'archived': 1, 'is_done': 1, 'num': 1, 'department': 1, 'type': 1, 'date_done': 1}
-            ).sort('date', 1))
+            # Получаем активные замечания (архив хранится отдельно) с фильтрами и пагинацией на стороне MongoDB
+            queryset, next_cursor, has_more = paginate(
+                faults,
+                list_filters(request.GET, 'date', 'department', 'is_done'),
+                {'_id': 1, 'date': 1, 'text': 1, 'archived': 1, 'is_done': 1, 'num': 1, 'department': 1, 'type': 1, 'date_done': 1},
+                'date', 1,
+                request.GET.get('cursor'), page_size_param(request.GET)
+            )
             # Преобразуем ObjectId в строку и форматируем даты
             formatted_faults = []
             for fault in queryset:
@@ -707,8 +1181,12 @@ def handle_faults(request):
                 formatted_faults.append(formatted)
             return JsonResponse({
                 'status': 'success',
-                'faults': formatted_faults
+                'faults': formatted_faults,
+                'next_cursor': next_cursor,
+                'has_more': has_more
             })
+        except InvalidQueryParam as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
     elif request.method == 'POST':
@@ -725,6 +1203,7 @@ def handle_faults(request):
                 'date_done': datetime.now(),
             }
             result = faults.insert_one(fault_data)
+            item_changed('faults', 'created', [result.inserted_id], fault_data)
             return JsonResponse({
                 'status': 'success',
                 'message': 'Замечание успешно добавлено',
@@ -739,11 +1218,8 @@ def handle_faults(request):
 def archive_fault(request, fault_id):
     if request.method == 'POST':
         try:
-            result = faults.update_one(
-                {'_id': ObjectId(fault_id)},
-                {'$set': {'archived': True, 'archived_at': datetime.now()}}
-            )
-            if result.modified_count == 1:
+            moved = archive_items('faults', [ObjectId(fault_id)])
+            if moved:
                 return JsonResponse({'status': 'success', 'message': 'Распоряжение архивировано'})
             else:
                 return JsonResponse({'status': 'error', 'message': 'Распоряжение не найдено'}, status=404)
@@ -758,12 +1234,13 @@ def mark_fault_done(request, fault_id):
         try:
             data = json.loads(request.body)
             service = data.get('service')
-            done_date = datetime.fromisoformat(data.get('done_date').replace('Z', '+00:00'))
+            done_date = parse_client_datetime(data.get('done_date'))
             result = faults.update_one(
                 {'_id': ObjectId(fault_id)},
                 {'$set': {f'is_done': True, 'date_done': done_date}}
             )
             if result.modified_count == 1:
+                item_changed('faults', 'done', [fault_id], {'is_done': True, 'date_done': done_date})
                 return JsonResponse({'status': 'success', 'message': 'Замечание обновлено'})
             else:
                 return JsonResponse({'status': 'error', 'message': 'Замечание не найдено'}, status=404)
@@ -772,16 +1249,33 @@ def mark_fault_done(request, fault_id):
     return HttpResponseBadRequest(json.dumps({'status': 'error', 'message': 'Неверный метод запроса'}))
 
 
+def get_faults_stats(request):
+    """
+    Открытые, просроченные и закрытые замечания по службам и типам,
+    среднее время устранения в днях (от создания до date_done)
+    """
+    try:
+        stats = get_fault_stats(request.GET.get('department'))
+        totals = {field: sum(row[field] for row in stats) for field in ('open', 'overdue', 'closed')}
+        return JsonResponse({'status': 'success', 'stats': stats, 'totals': totals})
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
 @csrf_exempt
+@conditional_list('reliability')
 def handle_reliability(request):
     if request.method == 'GET':
         try:
-            # Получаем только неархивированные мероприятия
-            queryset = list(reliability.find(
-                {'archived': {'$ne': True}},
-                {'_id': 1, 'name': 1, 'date': 1, 'departments': 1,
-                 'note': 1, 'archived': 1, 'done': 1}
-            ).sort('deadline', 1))
+            # Получаем активные мероприятия (архив хранится отдельно) с фильтрами и пагинацией на стороне MongoDB
+            queryset, next_cursor, has_more = paginate(
+                reliability,
+                list_filters(request.GET, 'deadline_at', 'departments', 'done'),
+                {'_id': 1, 'name': 1, 'date': 1, 'deadline_at': 1, 'departments': 1,
+                 'note': 1, 'archived': 1, 'done': 1},
+                'deadline_at', 1,  # По сроку реализации (периодические - первыми)
+                request.GET.get('cursor'), page_size_param(request.GET)
+            )
 
             formatted_items = []
             for item in queryset:
@@ -789,6 +1283,7 @@ def handle_reliability(request):
                     '_id': str(item['_id']),
                     'name': item['name'],
                     'date': item['date'],
+                    'deadline_at': item['deadline_at'].isoformat() if item.get('deadline_at') else None,
                     'departments': item['departments'],
                     'note': item.get('note', ''),
                     'done': {}
@@ -805,8 +1300,12 @@ def handle_reliability(request):
 
             return JsonResponse({
                 'status': 'success',
-                'items': formatted_items
+                'items': formatted_items,
+                'next_cursor': next_cursor,
+                'has_more': has_more
             })
+        except InvalidQueryParam as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
@@ -816,14 +1315,29 @@ def handle_reliability(request):
             reliability_data = {
                 'name': data['name'],
                 'date': data['date'],
+                'deadline_at': parse_deadline(data['date']),
                 'departments': data['departments'],
+                'completion': completion_entries(data['departments']),
                 'note': data.get('note', ''),
+                'dedup_key': reliability_key(data['name'], data['date']),
                 'archived': False,
                 'created_at': datetime.now(),
                 'done': {}
             }
 
-            result = reliability.insert_one(reliability_data)
+            # Архив уникальным индексом не защищен - повтор архивной записи проверяется отдельно
+            duplicate = bool(existing_reliability_keys([reliability_data['dedup_key']]))
+            if not duplicate:
+                try:
+                    result = reliability.insert_one(reliability_data)
+                except DuplicateKeyError:
+                    duplicate = True
+            if duplicate:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'Мероприятие с таким наименованием и сроком уже есть (в списке или в архиве)'
+                }, status=409)
+            item_changed('reliability', 'created', [result.inserted_id], reliability_data)
             return JsonResponse({
                 'status': 'success',
                 'message': 'Мероприятие успешно добавлено',
@@ -837,12 +1351,8 @@ def handle_reliability(request):
 def archive_reliability(request, item_id):
     if request.method == 'POST':
         try:
-            result = reliability.update_one(
-                {'_id': ObjectId(item_id)},
-                {'$set': {'archived': True, 'archived_at': datetime.now()}}
-            )
-
-            if result.modified_count == 1:
+            moved = archive_items('reliability', [ObjectId(item_id)])
+            if moved:
                 return JsonResponse({'status': 'success', 'message': 'Мероприятие архивировано'})
             else:
                 return JsonResponse({'status': 'error', 'message': 'Мероприятие не найдено'}, status=404)
@@ -856,14 +1366,12 @@ def mark_reliability_done(request, item_id):
         try:
             data = json.loads(request.body)
             service = data.get('service')
-            done_date = datetime.fromisoformat(data.get('done_date').replace('Z', '+00:00'))
+            done_date = parse_client_datetime(data.get('done_date'))
 
-            result = reliability.update_one(
-                {'_id': ObjectId(item_id)},
-                {'$set': {f'done.{service}': done_date}}
-            )
+            result = reliability.bulk_write(mark_done_operations({'_id': ObjectId(item_id)}, service, done_date))
 
-            if result.modified_count == 1:
+            if result.matched_count:
+                item_changed('reliability', 'done', [item_id], {'done': {service: done_date}})
                 return JsonResponse({'status': 'success', 'message': 'Мероприятие обновлено'})
             else:
                 return JsonResponse({'status': 'error', 'message': 'Мероприятие не найдено'}, status=404)
@@ -873,126 +1381,508 @@ def mark_reliability_done(request, item_id):
 
 @csrf_exempt
 def upload_reliability_excel(request):
-    if request.method == 'POST':
+    return upload_excel(request, 'reliability')
+
+
+@csrf_exempt
+def upload_excel(request, kind):
+    """
+    Загрузка файла Excel: файл сохраняется, импорт выполняется фоновой задачей.
+    Параметр sheets - имена листов через запятую (по умолчанию все листы).
+    Ход выполнения - GET /api/import-jobs/<job_id>/
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Неверный метод запроса'}, status=400)
+    if kind not in IMPORTERS:
+        return JsonResponse({'status': 'error', 'message': 'Импорт для этого типа записей не поддерживается'},
+                            status=404)
+    if 'excel_file' not in request.FILES:
+        return JsonResponse({'status': 'error', 'message': 'Файл не найден'}, status=400)
+
+    try:
+        excel_file = request.FILES['excel_file']
+        sheets = [name.strip() for name in request.POST.get('sheets', '').split(',') if name.strip()]
+        path = save_upload(excel_file)
+        # Повтор после сбоя задвоил бы отчет о дубликатах - ошибка показывается пользователю
+        job_id = enqueue('excel_import', {'kind': kind, 'path': path, 'filename': excel_file.name,
+                                          'sheets': sheets or None},
+                         max_attempts=1)
+        return JsonResponse({
+            'status': 'success',
+            'message': 'Файл принят, импорт выполняется',
+            'job_id': str(job_id)
+        }, status=202)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': f'Ошибка сохранения файла: {str(e)}'}, status=500)
+
+
+def import_message(counts, rejected, sheets=()):
+    """Итог импорта для уведомления пользователя"""
+    message = (f"Успешно импортировано {counts['imported']} записей, "
+               f"дубликатов {counts['duplicate']}, отклонено {counts['rejected']}")
+    if rejected:
+        # Номер строки с именем листа, если в файле импортировано несколько листов
+        several = len({item['sheet'] for item in rejected}) > 1 or len(sheets) > 1
+        rows = ', '.join(f"{item['sheet']}:{item['row']}" if several else str(item['row'])
+                         for item in rejected[:IMPORT_REJECTED_SHOWN])
+        if counts['rejected'] > IMPORT_REJECTED_SHOWN:
+            rows += ', ...'
+        message += f' (строки {rows})'
+    return message
+
+
+def get_import_job(request, job_id):
+    """
+    Ход фонового импорта: статус задачи, обработанные строки, отклоненные строки
+    и оценка оставшегося времени (eta_seconds) по средней скорости обработки
+    """
+    try:
+        job = jobs.find_one({'_id': ObjectId(job_id), 'type': 'excel_import'})
+    except Exception:
+        job = None
+    if job is None:
+        return JsonResponse({'status': 'error', 'message': 'Задача импорта не найдена'}, status=404)
+
+    progress = job.get('progress', {})
+    response = {
+        'status': 'success',
+        'job_status': job['status'],
+        'kind': job['payload']['kind'],
+        'filename': job['payload'].get('filename'),
+        'rows_processed': progress.get('row', 0),
+        'total_rows': progress.get('total'),
+        'counts': progress.get('counts', {'imported': 0, 'duplicate': 0, 'rejected': 0}),
+        'errors': progress.get('errors', []),
+        'eta_seconds': None,
+        'created_at': job['created_at'].isoformat(),
+        'finished_at': job['finished_at'].isoformat() if job.get('finished_at') else None,
+    }
+
+    if job['status'] == 'done':
+        result = job.get('result', {})
+        response['counts'] = result.get('counts', response['counts'])
+        response['rows'] = result.get('rows')
+        response['errors'] = result.get('rows', {}).get('rejected', [])
+        response['eta_seconds'] = 0
+        response['sheets'] = result.get('rows', {}).get('sheets', [])
+        response['message'] = import_message(response['counts'], response['errors'], response['sheets'])
+        skipped = [sheet['sheet'] for sheet in response['sheets'] if sheet['error']]
+        if skipped:
+            response['message'] += f". Листы без таблицы плана: {', '.join(skipped)}"
+    elif job['status'] == 'failed':
+        response['message'] = job.get('error', {}).get('message', 'Ошибка импорта')
+    elif job['status'] == 'running' and progress.get('row') and progress.get('total'):
+        # Скорость - по времени от начала задачи до последнего отчета о ходе выполнения
+        elapsed = (progress['updated_at'] - job['started_at']).total_seconds()
+        remaining = max(progress['total'] - progress['row'], 0)
+        since_report = (datetime.now() - progress['updated_at']).total_seconds()
+        response['eta_seconds'] = round(max(elapsed / progress['row'] * remaining - since_report, 0))
+
+    return JsonResponse(response)
+
+
+# Основная и архивная коллекции для каждого типа мероприятий
+ITEM_COLLECTIONS = {
+    'protocols': (protocols, protocols_archive),
+    'orders': (orders, orders_archive),
+    'faults': (faults, faults_archive),
+    'reliability': (reliability, reliability_archive),
+}
+
+
+def item_changed(kind, action, item_ids, fields=None):
+    """Новая версия списка (для условных GET) и события изменения для подключенных клиентов"""
+    bump_version(kind)
+    for item_id in item_ids:
+        publish_change(kind, action, str(item_id), fields)
+
+
+def archive_items(kind, ids):
+    """Переносит записи в архивную коллекцию, возвращает _id перенесенных"""
+    collection, archive = ITEM_COLLECTIONS[kind]
+    moved = move_documents(collection, archive, {'_id': {'$in': ids}},
+                           set_fields={'archived': True, 'archived_at': datetime.now()})
+    if moved:
+        item_changed(kind, 'archived', moved)
+    return moved
+
+
+def restore_items(kind, ids):
+    """Возвращает записи из архива в основную коллекцию, возвращает _id перенесенных"""
+    collection, archive = ITEM_COLLECTIONS[kind]
+    moved = move_documents(archive, collection, {'_id': {'$in': ids}},
+                           set_fields={'archived': False}, unset_fields=['archived_at'])
+    if moved:
+        bump_version(kind)
+        # Клиентам нужна запись целиком, чтобы вернуть ее в список
+        for document in collection.find({'_id': {'$in': moved}}):
+            publish_change(kind, 'restored', str(document['_id']), document)
+    return moved
+
+
+def serialize_document(value):
+    """Приводит документ MongoDB к виду, пригодному для JSON"""
+    if isinstance(value, dict):
+        return {key: serialize_document(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [serialize_document(item) for item in value]
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+@conditional_list()
+def browse_archive(request, kind):
+    """
+    Просмотр архива мероприятий с пагинацией (новые в архиве сверху).
+    Параметры: department, date_from, date_to (по дате архивирования), page_size, cursor
+    """
+    if kind not in ITEM_COLLECTIONS:
+        return JsonResponse({'status': 'error', 'message': 'Неизвестный тип записей'}, status=404)
+
+    try:
+        department_field = 'department' if kind == 'faults' else 'departments'
+        query = list_filters(request.GET, 'archived_at', department_field,
+                             'is_done' if kind == 'faults' else 'done')
+        items, next_cursor, has_more = paginate(
+            ITEM_COLLECTIONS[kind][1], query, {}, 'archived_at', -1,
+            request.GET.get('cursor'), page_size_param(request.GET) or ARCHIVE_PAGE_SIZE
+        )
+        return JsonResponse({
+            'status': 'success',
+            'items': [serialize_document(item) for item in items],
+            'next_cursor': next_cursor,
+            'has_more': has_more
+        })
+    except InvalidQueryParam as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
+@csrf_exempt
+def restore_from_archive(request, kind, item_id):
+    """Возврат записи из архива"""
+    if request.method != 'POST':
+        return HttpResponseBadRequest(json.dumps({'status': 'error', 'message': 'Неверный метод запроса'}))
+    if kind not in ITEM_COLLECTIONS:
+        return JsonResponse({'status': 'error', 'message': 'Неизвестный тип записей'}, status=404)
+
+    try:
+        if restore_items(kind, [ObjectId(item_id)]):
+            return JsonResponse({'status': 'success', 'message': 'Запись возвращена из архива'})
+        return JsonResponse({'status': 'error', 'message': 'Запись не найдена в архиве'}, status=404)
+    except BulkWriteError as e:
+        # Пока запись была в архиве, в основной список добавили такую же (уникальный dedup_key);
+        # перенос не выполнен - запись остается в архиве
+        if all(error['code'] == DUPLICATE_KEY_ERROR for error in e.details.get('writeErrors', [])):
+            return JsonResponse({
+                'status': 'error',
+                'message': 'В списке уже есть такая запись (то же наименование и срок)'
+            }, status=409)
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+
+async def events_stream(request):
+    """
+    Поток событий изменений списков (Server-Sent Events), работает только под ASGI.
+    Параметр kinds - список типов через запятую (по умолчанию все), check=1 - только
+    проверка доступности потока без подписки.
+    События: change {kind, action, id, fields} и reset (события потеряны - перезагрузить списки)
+    """
+    if request.method != 'GET':
+        return HttpResponseBadRequest(json.dumps({'status': 'error', 'message': 'Неверный метод запроса'}))
+    # Под WSGI асинхронный поток буферизуется до конца, то есть навсегда занимает обработчик
+    # и ничего не отдает клиенту - клиент без потока обновляет списки по своим действиям
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({
+            'status': 'error',
+            'message': 'Поток событий доступен только при запуске под ASGI'
+        }, status=501)
+    if request.GET.get('check'):
+        return JsonResponse({'status': 'success', 'supported': True})
+
+    kinds = set(filter(None, request.GET.get('kinds', '').split(','))) or set(ITEM_COLLECTIONS)
+    last_event_id = request.headers.get('Last-Event-ID')
+    last_event_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+
+    async def stream():
+        subscription = broadcaster.subscribe(last_event_id)
         try:
-            if 'excel_file' not in request.FILES:
-                return JsonResponse({'status': 'error', 'message': 'Файл не найден'}, status=400)
-
-            excel_file = request.FILES['excel_file']
-
-            # Загружаем Excel файл
-            wb = load_workbook(excel_file, data_only=True)
-            sheet = wb.active
-
-            # Функция для поиска строки с заголовками
-            def find_header_row(sheet):
-                header_patterns = [
-                    'наименование мероприятия',
-                    'сроки реализации',
-                    'ответственные',
-                    'примечание',
-                    'оборудование'
-                ]
+            yield f'retry: {settings.EVENTS_RETRY}\n\n'
+            while True:
+                event = await subscription.get(settings.EVENTS_HEARTBEAT)
+                if event is None:
+                    # Комментарий SSE удерживает соединение через прокси
+                    yield ': ping\n\n'
+                elif event is RESET:
+                    yield 'event: reset\ndata: {}\n\n'
+                elif event[1] in kinds:
+                    event_id, kind, data = event
+                    yield f'id: {event_id}\nevent: change\ndata: {data}\n\n'
+        finally:
+            subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# Списки с отметками выполнения по службам: тип -> (коллекция, поле даты для сортировки)
+PENDING_SOURCES = {
+    'protocols': (protocols, 'issue_date'),
+    'orders': (orders, 'issue_date'),
+    'reliability': (reliability, 'created_at'),
+}
 
-                for row in range(1, sheet.max_row + 1):
-                    for col in range(1, sheet.max_column + 1):
-                        cell_value = sheet.cell(row=row, column=col).value
-                        if cell_value and any(pattern in str(cell_value).lower() for pattern in header_patterns):
-                            return row
-                return None
 
-            # Находим строку с заголовками
-            header_row = find_header_row(sheet)
-            if not header_row:
-                return JsonResponse({
-                    'status': 'error',
-                    'message': 'Не удалось найти заголовки таблицы в файле'
-                }, status=400)
-
-            # Определяем столбцы по заголовкам
-            headers = {}
-            for col in range(1, sheet.max_column + 1):
-                cell_value = sheet.cell(row=header_row, column=col).value
-                if cell_value:
-                    header = str(cell_value).lower().strip()
-                    if 'наименование мероприятия' in header:
-                        headers['name'] = col
-                    elif 'наименование/тип оборудования' in header or 'оборудование' in header:
-                        headers['equipment'] = col
-                    elif 'сроки реализации' in header or 'периодичность выполнения' in header:
-                        headers['date'] = col
-                    elif 'ответственные' in header:
-                        headers['departments'] = col
-                    elif 'примечание' in header:
-                        headers['note'] = col
-
-            if not all(key in headers for key in ['name', 'date', 'departments']):
-                return JsonResponse({
-                    'status': 'error',
-                    'message': 'Не найдены необходимые столбцы: Наименование мероприятия, Сроки реализации, Ответственные'
-                }, status=400)
-
-            imported_count = 0
-            skipped_count = 0
-
-            # Обрабатываем строки начиная со следующей после заголовков
-            for row in range(header_row + 1, sheet.max_row + 1):
-                name = sheet.cell(row=row, column=headers['name']).value
-                equipment = sheet.cell(row=row, column=headers.get('equipment')).value if headers.get('equipment') else None
-                date = sheet.cell(row=row, column=headers['date']).value
-                departments_text = sheet.cell(row=row, column=headers['departments']).value
-                note = sheet.cell(row=row, column=headers.get('note')).value if headers.get('note') else None
-
-                # Пропускаем пустые строки (где нет названия мероприятия)
-                if not name:
-                    continue
+def get_pending(request):
+    """
+    Невыполненные службой протоколы, распоряжения и мероприятия по надежности (новые сверху).
+    Каждый тип - отдельным списком по page_size записей (по умолчанию PENDING_PAGE_SIZE);
+    следующая страница одного типа - параметры kind и cursor из next_cursor[kind]
+    """
+    department = request.GET.get('department')
+    if department not in SERVICES:
+        return JsonResponse({'status': 'error', 'message': 'Неизвестная служба'}, status=400)
 
-                # Формируем полное название мероприятия
-                full_name = str(name)
-                if equipment:
-                    full_name = f"{equipment}. {full_name}"
+    sources = PENDING_SOURCES
+    kind = request.GET.get('kind')
+    cursor = request.GET.get('cursor')
+    try:
+        if kind:
+            if kind not in sources:
+                raise ValueError('Неизвестный тип записей')
+            sources = {kind: sources[kind]}
+        elif cursor:
+            raise ValueError('Для курсора нужен тип записей (kind)')
+        page_size = page_size_param(request.GET) or PENDING_PAGE_SIZE
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    # Условие на один элемент completion - обе границы индекса по службе и отметке
+    query = {'completion': {'$elemMatch': {'department': department, 'done_at': None}}}
+    queries = {}
+    for name, (collection, date_field) in sources.items():
+        queries[name] = (lambda collection=collection, date_field=date_field:
+                         paginate(collection, query, {'completion': 0}, date_field, -1, cursor, page_size))
+        queries[f'count_{name}'] = lambda collection=collection: collection.count_documents(query)
 
-                # Преобразуем дату в строку в формате ДД.ММ.ГГГГ
-                date_str = parse_date_to_dmy(date)
+    try:
+        result = run_concurrently(**queries)
+    except ValueError as e:
+        # Некорректный курсор
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
-                # Парсим ответственные службы
-                departments = parse_departments(str(departments_text) if departments_text else '')
+    return JsonResponse({
+        'status': 'success',
+        'department': department,
+        'counts': {name: result[f'count_{name}'] for name in sources},
+        **{name: [serialize_document(item) for item in result[name][0]] for name in sources},
+        'next_cursor': {name: result[name][1] for name in sources},
+        'has_more': {name: result[name][2] for name in sources},
+    })
+
+
+def parse_bulk_items(items):
+    """
+    Разбирает список [{'kind', 'id'}, ...] группового запроса.
+    Возвращает ({тип: [ObjectId]}, {(тип, id): результат}) - результаты заполнены для ошибочных записей
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError('Не передан список записей')
+    if len(items) > BULK_ITEMS_MAX:
+        raise ValueError(f'Слишком много записей: {len(items)}, максимум {BULK_ITEMS_MAX}')
+
+    ids_by_kind = {}
+    results = {}
+    for item in items:
+        kind, item_id = str(item.get('kind')), str(item.get('id'))
+        if kind not in ITEM_COLLECTIONS or not ObjectId.is_valid(item_id):
+            results[(kind, item_id)] = 'invalid'
+        else:
+            ids_by_kind.setdefault(kind, []).append(ObjectId(item_id))
+    return ids_by_kind, results
 
-                # Пропускаем если нет ответственных служб
-                if not departments:
-                    skipped_count += 1
-                    continue
 
-                # Создаем запись мероприятия
-                reliability_data = {
-                    'name': full_name,
-                    'date': date_str,
-                    'departments': departments,
-                    'note': str(note) if note else '',
-                    'archived': False,
-                    'created_at': datetime.now(),
-                    'done': {},
-                    'source': 'excel_import'
-                }
+def bulk_response(items, results, status_ok):
+    """Ответ группового запроса с результатом по каждой записи в порядке запроса"""
+    per_item = [
+        {'kind': str(item.get('kind')), 'id': str(item.get('id')),
+         'status': results.get((str(item.get('kind')), str(item.get('id'))), 'not_found')}
+        for item in items
+    ]
+    succeeded = sum(1 for result in per_item if result['status'] == status_ok)
+    return JsonResponse({
+        'status': 'success' if succeeded == len(per_item) else 'partial',
+        status_ok: succeeded,
+        'failed': len(per_item) - succeeded,
+        'results': per_item
+    })
 
-                # Проверяем, нет ли уже такого мероприятия
-                existing = reliability.find_one({
-                    'name': reliability_data['name'],
-                    'date': reliability_data['date']
-                })
 
-                if not existing:
-                    reliability.insert_one(reliability_data)
-                    imported_count += 1
-                else:
-                    skipped_count += 1
+@csrf_exempt
+def bulk_mark_done(request):
+    """
+    Групповая отметка выполнения: {'items': [{'kind', 'id'}, ...], 'service', 'done_date'}.
+    Типы можно смешивать; на каждую коллекцию - один bulk_write
+    """
+    if request.method != 'POST':
+        return HttpResponseBadRequest(json.dumps({'status': 'error', 'message': 'Неверный метод запроса'}))
 
-            return JsonResponse({
-                'status': 'success',
-                'message': f'Успешно импортировано {imported_count} мероприятий, пропущено {skipped_count} (дубликаты или без служб)'
-            })
+    try:
+        data = json.loads(request.body)
+        items = data.get('items')
+        ids_by_kind, results = parse_bulk_items(items)
+        service = data.get('service')
+        if any(kind != 'faults' for kind in ids_by_kind) and service not in SERVICES:
+            raise ValueError('Неизвестная служба')
+        done_date = parse_client_datetime(data['done_date']) if data.get('done_date') else datetime.now()
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
-        except Exception as e:
-            return JsonResponse({'status': 'error', 'message': f'Ошибка обработки файла: {str(e)}'}, status=500)
+    try:
+        operations = []
+        for kind, ids in ids_by_kind.items():
+            collection = ITEM_COLLECTIONS[kind][0]
+            # Отсутствующие (в том числе уже архивированные) записи отмечаются в ответе
+            found = [item['_id'] for item in collection.find({'_id': {'$in': ids}}, {'_id': 1})]
+            for item_id in found:
+                results[(kind, str(item_id))] = 'done'
+            if kind == 'faults':
+                requests = [UpdateOne({'_id': item_id}, {'$set': {'is_done': True, 'date_done': done_date}})
+                            for item_id in found]
+            else:
+                requests = mark_done_operations({'_id': {'$in': found}}, service, done_date, many=True) if found else []
+            operations.append((collection, requests))
+            ids_by_kind[kind] = found
+
+        run_in_transaction(lambda session: bulk_write_all(operations, session=session))
+
+        for kind, ids in ids_by_kind.items():
+            if ids:
+                fields = {'is_done': True, 'date_done': done_date} if kind == 'faults' \
+                    else {'done': {service: done_date}}
+                item_changed(kind, 'done', ids, fields)
+        return bulk_response(items, results, 'done')
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
+@csrf_exempt
+def bulk_archive(request):
+    """Групповое архивирование: {'items': [{'kind', 'id'}, ...]}, типы можно смешивать"""
+    if request.method != 'POST':
+        return HttpResponseBadRequest(json.dumps({'status': 'error', 'message': 'Неверный метод запроса'}))
+
+    try:
+        items = json.loads(request.body).get('items')
+        ids_by_kind, results = parse_bulk_items(items)
+    except (ValueError, TypeError, AttributeError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    try:
+        # Перенос в архив - один bulk_write в архивную коллекцию и одно удаление на тип
+        for kind, ids in ids_by_kind.items():
+            for item_id in archive_items(kind, ids):
+                results[(kind, str(item_id))] = 'archived'
+        return bulk_response(items, results, 'archived')
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
+def search(request):
+    """
+    Полнотекстовый поиск по всем спискам мероприятий.
+    Параметры: q, archived (1 - искать и в архиве), department, kinds (через запятую),
+    page_size, cursor (из next_cursor предыдущей страницы)
+    """
+    text = request.GET.get('q', '').strip()
+    if not text:
+        return JsonResponse({'status': 'error', 'message': 'Не задан текст поиска'}, status=400)
+
+    try:
+        kinds = set(filter(None, request.GET.get('kinds', '').split(','))) or None
+        page_size = page_size_param(request.GET, SEARCH_PAGE_MAX) or SEARCH_PAGE_SIZE
+        # Курсор поиска - смещение в общем списке, отсортированном по релевантности
+        offset = int(request.GET.get('cursor') or 0)
+        items, has_more = search_items(
+            text, include_archived=request.GET.get('archived') == '1',
+            department=request.GET.get('department'), kinds=kinds,
+            offset=offset, page_size=page_size
+        )
+        return JsonResponse({
+            'status': 'success',
+            'items': [serialize_document(item) for item in items],
+            'next_cursor': str(offset + page_size) if has_more else None,
+            'has_more': has_more
+        })
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
+def get_overdue(request):
+    """
+    Просроченные службой записи: срок (deadline_at, у замечаний - date) прошел,
+    а отметки выполнения службы нет. Периодические записи без срока не попадают.
+    Каждый тип - отдельным списком по page_size записей (по умолчанию OVERDUE_PAGE_SIZE);
+    следующая страница одного типа - параметры kind и cursor из next_cursor[kind]
+    """
+    department = request.GET.get('department')
+    if department not in SERVICES:
+        return JsonResponse({'status': 'error', 'message': 'Неизвестная служба'}, status=400)
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    # Индекс (completion.department, completion.done_at, deadline_at) покрывает все три условия
+    query = {
+        'completion': {'$elemMatch': {'department': department, 'done_at': None}},
+        'deadline_at': {'$lt': today},
+    }
+    sources = {kind: (collection, query, 'deadline_at') for kind, (collection, _) in PENDING_SOURCES.items()}
+    sources['faults'] = (faults, {'department': department, 'is_done': False, 'date': {'$lt': today}}, 'date')
+
+    kind = request.GET.get('kind')
+    cursor = request.GET.get('cursor')
+    try:
+        if kind:
+            if kind not in sources:
+                raise ValueError('Неизвестный тип записей')
+            sources = {kind: sources[kind]}
+        elif cursor:
+            raise ValueError('Для курсора нужен тип записей (kind)')
+        page_size = page_size_param(request.GET) or OVERDUE_PAGE_SIZE
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    queries = {}
+    for name, (collection, kind_query, sort_field) in sources.items():
+        queries[name] = (lambda collection=collection, kind_query=kind_query, sort_field=sort_field:
+                         paginate(collection, kind_query, {'completion': 0}, sort_field, 1, cursor, page_size))
+        queries[f'count_{name}'] = (lambda collection=collection, kind_query=kind_query:
+                                    collection.count_documents(kind_query))
+
+    try:
+        result = run_concurrently(**queries)
+    except ValueError as e:
+        # Некорректный курсор
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
-    return JsonResponse({'status': 'error', 'message': 'Неверный метод запроса'}, status=400)
+    return JsonResponse({
+        'status': 'success',
+        'department': department,
+        'counts': {name: result[f'count_{name}'] for name in sources},
+        **{name: [serialize_document(item) for item in result[name][0]] for name in sources},
+        'next_cursor': {name: result[name][1] for name in sources},
+        'has_more': {name: result[name][2] for name in sources},
+    })